@@ -0,0 +1,287 @@
+# backend/admission.py
+"""Controle de admissão por memória para os endpoints de processamento.
+
+Cada requisição pesada tem seu custo de memória estimado a partir dos
+arquivos enviados (dimensão declarada das abas escolhidas em `abas` da
+planilha .xlsx, ou do Parquet, ou, na falta dela, tamanho do upload) e só é
+executada quando cabe no orçamento de memória.
+As demais aguardam em fila por um tempo limitado; com a fila cheia ou o
+tempo esgotado a resposta é `429` com `Retry-After`.
+
+O orçamento é compartilhado por todos os workers do gunicorn (estado em
+memória compartilhada criado antes do fork) e deve ficar abaixo da memória
+disponível no contêiner.
+"""
+import html
+import multiprocessing
+import os
+import re
+import time
+import zipfile
+from functools import wraps
+from typing import Callable, Dict, Optional
+
+from flask import Response, jsonify, request
+
+from .core.config import settings
+from .core.logging import get_logger
+from .readers import selecionar_abas
+from .uploads import arquivos_referenciados
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # sem pyarrow, Parquet usa o tamanho do upload
+    pq = None
+
+logger = get_logger()
+
+MB = 1024 * 1024
+# Pico por célula: leitura (openpyxl/pandas) + cópias feitas durante o processamento
+BYTES_PER_CELL = 250
+# Sem dimensão conhecida (.xls, .docx, CSV, xlsx sem <dimension>): múltiplo do tamanho do upload
+BYTES_PER_UPLOAD_BYTE = 50
+# Custo fixo de qualquer requisição admitida (parsing do form, respostas, buffers)
+BASE_COST = 8 * MB
+
+_DIMENSION_RE = re.compile(rb'<dimension ref="[A-Z]+\d+:([A-Z]+)(\d+)"')
+_SHEET_TAG_RE = re.compile(r'<sheet\b[^>]*>')
+_REL_TAG_RE = re.compile(r'<Relationship\b[^>]*>')
+_ATTR_RE = re.compile(r'\b([\w:]+)="([^"]*)"')
+
+
+def _column_number(letters: bytes) -> int:
+    n = 0
+    for ch in letters.decode("ascii"):
+        n = n * 26 + (ord(ch) - 64)
+    return n
+
+
+def _xlsx_sheet_parts(zf: zipfile.ZipFile) -> Dict[str, str]:
+    """Nome da aba -> parte XML da planilha, na ordem da pasta de trabalho."""
+    rels = {}
+    for tag in _REL_TAG_RE.findall(zf.read("xl/_rels/workbook.xml.rels").decode("utf-8")):
+        attrs = dict(_ATTR_RE.findall(tag))
+        target = attrs.get("Target", "")
+        rels[attrs.get("Id")] = target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+    parts = {}
+    for tag in _SHEET_TAG_RE.findall(zf.read("xl/workbook.xml").decode("utf-8")):
+        attrs = dict(_ATTR_RE.findall(tag))
+        rel_id = next((v for k, v in attrs.items() if k.endswith(":id")), None)
+        if rel_id in rels:
+            parts[html.unescape(attrs.get("name", ""))] = rels[rel_id]
+    return parts
+
+
+def _xlsx_cells(stream, abas: Optional[str] = None) -> Optional[int]:
+    """Células declaradas (<dimension>) nas abas de um .xlsx escolhidas por `abas`, sem ler as células.
+
+    Sem `abas`, só a primeira aba (como a leitura); com várias, a soma de
+    todas as escolhidas. None se alguma não declara a dimensão.
+    """
+    try:
+        with zipfile.ZipFile(stream) as zf:
+            parts = _xlsx_sheet_parts(zf)
+            try:
+                nomes = selecionar_abas(list(parts), abas)
+            except ValueError:
+                nomes = list(parts)[:1]  # a própria rota responde 400
+            if not nomes:
+                return None
+            total = 0
+            for nome in nomes:
+                with zf.open(parts[nome]) as f:
+                    head = f.read(4096)
+                m = _DIMENSION_RE.search(head)
+                if not m:
+                    return None
+                total += int(m.group(2)) * _column_number(m.group(1))
+        return total
+    except (zipfile.BadZipFile, KeyError, OSError, ValueError):
+        return None
+
+
+def _parquet_cells(stream) -> Optional[int]:
+    """Células (linhas × colunas) de um Parquet, lidas do rodapé (metadados) do arquivo."""
+    if pq is None:
+        return None
+    try:
+        meta = pq.ParquetFile(stream).metadata
+        return meta.num_rows * meta.num_columns
+    except Exception:
+        return None
+
+
+def estimate_file_cost(file_storage, abas: Optional[str] = None) -> int:
+    """Memória estimada (bytes) para processar um arquivo enviado (`abas`: campo do formulário)."""
+    stream = file_storage.stream
+    try:
+        pos = stream.tell()
+        stream.seek(0, 2)
+        size = stream.tell()
+        stream.seek(0)
+        filename = (file_storage.filename or "").lower()
+        cells = (_xlsx_cells(stream, abas) if filename.endswith(".xlsx")
+                 else _parquet_cells(stream) if filename.endswith(".parquet") else None)
+        stream.seek(pos)
+    except (AttributeError, OSError):
+        return 0
+    if cells:
+        return max(cells * BYTES_PER_CELL, size * 2)
+    return size * BYTES_PER_UPLOAD_BYTE
+
+
+def estimate_request_cost(req) -> int:
+    """Custo estimado de uma requisição: custo fixo + custo de cada arquivo enviado.
+
+    Inclui os uploads em blocos referenciados por `*_upload_id`; ids inválidos
+    ficam de fora aqui e são recusados pelo próprio endpoint.
+    """
+    files = list(req.files.values())
+    try:
+        files += arquivos_referenciados()
+    except ValueError:
+        pass
+    abas = req.form.get("abas")
+    return BASE_COST + sum(estimate_file_cost(f, abas) for f in files)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Admite requisições contra um orçamento de memória, com fila limitada.
+
+    O estado fica em memória compartilhada (`multiprocessing`): criado no
+    master antes do fork (`preload_app`), é o mesmo para todos os workers do
+    gunicorn, e o orçamento passa a valer para o contêiner inteiro. Cada
+    reserva ocupa uma vaga (pid, custo); `release_pid` libera as vagas de um
+    worker que morreu no meio de uma requisição.
+    """
+
+    def __init__(self, budget_bytes: int, max_queue: int, queue_timeout: float, slots: int = 256):
+        self.budget = budget_bytes
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._cond = multiprocessing.Condition()
+        self._pids = multiprocessing.RawArray("q", slots)
+        self._costs = multiprocessing.RawArray("q", slots)
+        # queued, admitted_total, rejected_total
+        self._counters = multiprocessing.RawArray("q", 3)
+
+    def _usage(self) -> tuple:
+        in_flight = sum(1 for pid in self._pids if pid)
+        return in_flight, sum(self._costs)
+
+    def _fits(self, cost: int) -> bool:
+        in_flight, in_flight_bytes = self._usage()
+        # Uma requisição maior que o orçamento inteiro roda sozinha em vez de nunca rodar
+        return in_flight == 0 or in_flight_bytes + cost <= self.budget
+
+    def _retry_after(self) -> int:
+        return max(1, int(round(self.queue_timeout)))
+
+    def _reject(self, message: str) -> AdmissionRejected:
+        self._counters[2] += 1
+        return AdmissionRejected(message, self._retry_after())
+
+    def acquire(self, cost: int) -> int:
+        """Reserva `cost` bytes do orçamento, aguardando na fila se necessário.
+
+        Retorna a vaga reservada, que deve ser devolvida em `release`.
+        """
+        with self._cond:
+            if not self._fits(cost):
+                if self._counters[0] >= self.max_queue:
+                    raise self._reject("Servidor ocupado: fila de processamento cheia.")
+                self._counters[0] += 1
+                deadline = time.monotonic() + self.queue_timeout
+                try:
+                    while not self._fits(cost):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise self._reject("Servidor ocupado: tempo de espera na fila esgotado.")
+                        self._cond.wait(remaining)
+                finally:
+                    self._counters[0] -= 1
+            slot = next((i for i, pid in enumerate(self._pids) if not pid), None)
+            if slot is None:
+                raise self._reject("Servidor ocupado: limite de requisições simultâneas atingido.")
+            self._pids[slot] = os.getpid()
+            self._costs[slot] = cost
+            self._counters[1] += 1
+            return slot
+
+    def release(self, slot: int) -> None:
+        with self._cond:
+            self._pids[slot] = 0
+            self._costs[slot] = 0
+            self._cond.notify_all()
+
+    def release_pid(self, pid: int) -> None:
+        """Libera as reservas de um processo encerrado (hook `child_exit` do gunicorn)."""
+        with self._cond:
+            for i, owner in enumerate(self._pids):
+                if owner == pid:
+                    self._pids[i] = 0
+                    self._costs[i] = 0
+            self._cond.notify_all()
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._cond:
+            in_flight, in_flight_bytes = self._usage()
+            return {
+                "budget_mb": round(self.budget / MB, 1),
+                "in_flight": in_flight,
+                "in_flight_mb": round(in_flight_bytes / MB, 1),
+                "queue_depth": self._counters[0],
+                "max_queue": self.max_queue,
+                "admitted_total": self._counters[1],
+                "rejected_total": self._counters[2],
+            }
+
+
+admission = AdmissionController(
+    budget_bytes=settings.ADMISSION_MEMORY_BUDGET_MB * MB,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+)
+
+
+def admission_required(view=None, *, custo_extra: Optional[Callable[[], int]] = None):
+    """Decorador para endpoints pesados: estima o custo, admite ou responde 429.
+
+    `custo_extra()` soma ao custo o que a requisição lê sem upload (ex.:
+    versões de base registradas); uso: `@admission_required(custo_extra=...)`.
+    """
+    if view is None:
+        return lambda v: admission_required(v, custo_extra=custo_extra)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not settings.ADMISSION_ENABLED:
+            return view(*args, **kwargs)
+        cost = estimate_request_cost(request) + (custo_extra() if custo_extra else 0)
+        try:
+            slot = admission.acquire(cost)
+        except AdmissionRejected as rej:
+            logger.warning("%s: requisição recusada (%.0f MB estimados): %s", request.path, cost / MB, rej)
+            response = jsonify({"error": str(rej), "retry_after": rej.retry_after})
+            response.status_code = 429
+            response.headers["Retry-After"] = str(rej.retry_after)
+            return response
+        try:
+            response = view(*args, **kwargs)
+        except BaseException:
+            admission.release(slot)
+            raise
+        if isinstance(response, Response) and response.is_streamed and not response.direct_passthrough:
+            # gerador (ex.: NDJSON): o trabalho continua enquanto o corpo é enviado,
+            # então a reserva vale até o fim do stream (arquivos prontos liberam já)
+            response.call_on_close(lambda: admission.release(slot))
+        else:
+            admission.release(slot)
+        return response
+    return wrapper
@@ -3,3 +3,6 @@ from .frontend import frontend_bp      # noqa: F401
 from .cadastro import cadastro_bp      # noqa: F401
 from .health import health_bp          # noqa: F401
 from .aprovacao import aprovacao_bp    # noqa: F401
+from .bases import bases_bp            # noqa: F401
+from .analise import analise_bp        # noqa: F401
+from .uploads import uploads_bp        # noqa: F401
@@ -0,0 +1,84 @@
+import os
+import time
+from flask import Blueprint, request, jsonify
+from backend.admission import admission_required
+from backend.core.config import settings
+from backend.core.logging import get_logger
+from backend.profiling import janela_linhas, perfil_store, perfilar_frame
+from backend.readers import ler_planilha_filtrada, memoria_frame
+from backend.uploads import arquivo_enviado
+from backend.utils import validar_extensao_arquivo, gerar_nome_arquivo_temporario
+
+logger = get_logger()
+
+analise_bp = Blueprint('analise', __name__, url_prefix='/api/analise')
+
+
+def _janela_args(args) -> tuple:
+    """(offset, limit, busca) da query string, com limit limitado a ANALISE_PAGE_MAX."""
+    try:
+        offset = max(0, int(args.get("offset", 0)))
+        limit = min(settings.ANALISE_PAGE_MAX, max(1, int(args.get("limit", 100))))
+    except (TypeError, ValueError):
+        raise ValueError("offset e limit devem ser inteiros.")
+    return offset, limit, (args.get("q") or "").strip()
+
+
+@analise_bp.route('/profile', methods=['POST'])
+@admission_required
+def api_analise_profile():
+    """Lê a planilha no servidor e devolve o perfil das colunas e a primeira janela de linhas."""
+    path = None
+    try:
+        file = arquivo_enviado("file")
+        if not file:
+            return jsonify({"error": "Envie a planilha no campo 'file'"}), 400
+        is_valid, error_msg = validar_extensao_arquivo(file.filename)
+        if not is_valid:
+            return jsonify({"error": error_msg}), 400
+        offset, limit, busca = _janela_args(request.args)
+
+        path = gerar_nome_arquivo_temporario(file.filename, settings.UPLOAD_FOLDER)
+        file.save(path)
+        t0 = time.perf_counter()
+        df, _ = ler_planilha_filtrada(path, compacto=True)
+        t_leitura = time.perf_counter() - t0
+        perfil = perfilar_frame(df)
+        t_perfil = time.perf_counter() - t0 - t_leitura
+        token = perfil_store.save(df)
+        logger.info("Análise %s: %d linhas x %d colunas (leitura %.2fs, perfil %.2fs)",
+                    token, len(df), len(df.columns), t_leitura, t_perfil)
+        return jsonify({
+            "token": token,
+            "arquivo": file.filename,
+            "memoria_mb": round(memoria_frame(df) / (1024 * 1024), 1),
+            "tempos": {"leitura_s": round(t_leitura, 3), "perfil_s": round(t_perfil, 3)},
+            "perfil": perfil,
+            "janela": janela_linhas(df, offset, limit, busca),
+        }), 200
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        logger.exception("Erro em /api/analise/profile")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        try:
+            if path and os.path.exists(path):
+                os.remove(path)
+        except Exception:
+            logger.warning("Falha ao remover temporário %s", path)
+
+
+@analise_bp.route('/profile/<token>/linhas', methods=['GET'])
+@admission_required
+def api_analise_linhas(token):
+    """Janela de linhas de uma planilha já perfilada (?offset=&limit=&q=)."""
+    try:
+        offset, limit, busca = _janela_args(request.args)
+        df = perfil_store.load(token)
+        return jsonify({"token": token, **janela_linhas(df, offset, limit, busca)}), 200
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        logger.exception("Erro em /api/analise/profile/<token>/linhas")
+        return jsonify({"error": str(e)}), 500
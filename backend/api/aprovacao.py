@@ -1,4 +1,5 @@
 import io
+import json
 import os
 import re
 import uuid
@@ -7,9 +8,15 @@ from typing import Any, Dict, List, Optional, Set, Tuple
 import pandas as pd
 from flask import Blueprint, jsonify, request, send_file
 
+from backend.admission import admission_required
 from backend.core.config import settings
 from backend.core.logging import get_logger
-from backend.utils import format_cpf_for_output, limpar_cpf_raw, upper_no_accents, validar_extensao_arquivo, gerar_nome_arquivo_temporario
+from backend.readers import ler_abas, ler_tabela
+from backend.result_cache import cached_file_response, result_cache
+from backend.schema import resolve_columns
+from backend.uploads import arquivo_enviado
+from backend.user_index import user_index
+from backend.utils import cpf_valido, format_cpf_for_output, limpar_cpf_raw, validar_extensao_arquivo, gerar_nome_arquivo_temporario
 
 
 logger = get_logger()
@@ -30,91 +37,120 @@ def _normalize_cpf_input(raw_cpf: Optional[str]) -> Tuple[str, str]:
     digits = limpar_cpf_raw(raw_cpf)
     if len(digits) != 11:
         raise ValueError("CPF inválido. Informe 11 dígitos.")
+    if not cpf_valido(digits):
+        raise ValueError("CPF inválido: dígitos verificadores não conferem.")
 
     formatted = format_cpf_for_output(digits)
     return digits, formatted
 
 
-def _load_users_and_find_approver(users_path: str, cpf_digits: str) -> Tuple[pd.DataFrame, str]:
-    """Carrega base de usuários e retorna o nome completo do aprovador.
-
-    Lança ValueError se CPF não existir na base.
-    """
-
+def _ler_usuarios(users_path: str, abas: Optional[str] = None) -> Tuple[pd.DataFrame, List[dict]]:
+    """Lê a base de usuários (abas escolhidas ou só a primeira); retorna (base, tempos por aba)."""
+    tempos: List[dict] = []
     try:
-        df_users = pd.read_excel(users_path, dtype=str).fillna("")
+        if abas:
+            df_users, _, tempos = ler_abas(users_path, abas)
+        else:
+            df_users = ler_tabela(users_path)
+    except ValueError:
+        raise
     except Exception as exc:  # pragma: no cover - erro de IO
         raise ValueError(f"Falha ao ler base de usuários: {exc}") from exc
+    return df_users, tempos
+
+
+def _nome_do_usuario(row) -> str:
+    nome_completo = str(row.get("NomeCompleto") or "").strip()
+    if not nome_completo:
+        primeiro = str(row.get("Nome") or "").strip()
+        sobrenome = str(row.get("SobreNome") or "").strip()
+        nome_completo = f"{primeiro} {sobrenome}".strip()
+    return nome_completo
+
+
+def _load_users_and_find_approver(users_path: str, cpf_digits: str,
+                                  abas: Optional[str] = None) -> Tuple[pd.DataFrame, str, List[dict]]:
+    """Carrega base de usuários e retorna (base, nome completo do aprovador, tempos por aba).
+
+    Com `abas` (ver `readers.selecionar_abas`) as abas escolhidas são lidas e
+    juntas; sem ela, só a primeira aba. Lança ValueError se CPF não existir na base.
+    """
+
+    df_users, tempos = _ler_usuarios(users_path, abas)
 
     if "CPF" not in df_users.columns:
         raise ValueError("Base de usuários não contém coluna 'CPF'.")
 
-    df_users = df_users.copy()
-    df_users["CPFdigits"] = df_users["CPF"].apply(limpar_cpf_raw)
-    matches = df_users[df_users["CPFdigits"] == cpf_digits]
+    matches = df_users[df_users["CPF"].map(limpar_cpf_raw) == cpf_digits]
     if matches.empty:
         raise ValueError("CPF não encontrado na base de usuários.")
 
-    row = matches.iloc[0]
-    nome_completo = str(row.get("NomeCompleto", "")).strip()
-    if not nome_completo:
-        primeiro = str(row.get("Nome", "")).strip()
-        sobrenome = str(row.get("SobreNome", "")).strip()
-        nome_completo = f"{primeiro} {sobrenome}".strip()
+    return df_users, _nome_do_usuario(matches.iloc[0]), tempos
+
+
+def _find_approver(users_file, users_indice: str, cpf_digits: str,
+                   abas: Optional[str] = None) -> Tuple[str, List[dict], Optional[str]]:
+    """Localiza o aprovador; retorna (nome completo, tempos por aba, id do índice usado).
+
+    Com o índice SQLite (backend/user_index.py) a base de usuários é lida nas
+    duas primeiras vezes que o arquivo é enviado (na segunda, o índice é
+    construído); depois o CPF é uma consulta pontual. Sem arquivo,
+    `users_indice` aponta um índice já construído.
+    """
+    if users_file is None:
+        if user_index is None:
+            raise ValueError("Índice de bases desativado (USER_INDEX_ENABLED); envie 'users_file'.")
+        indice = user_index.abrir(users_indice)
+    else:
+        users_path: Optional[str] = None
+
+        def salvar() -> str:
+            nonlocal users_path
+            users_path = gerar_nome_arquivo_temporario(users_file.filename or "users.xlsx", settings.UPLOAD_FOLDER)
+            users_file.save(users_path)
+            return users_path
+
+        try:
+            indice = None
+            if user_index is not None:
+                indice = user_index.obter(users_file, "aprovacao", abas, lambda: _ler_usuarios(salvar(), abas),
+                                          cpf_col="CPF")
+            if indice is None:
+                _, nome, tempos = _load_users_and_find_approver(salvar(), cpf_digits, abas)
+                return nome, tempos, None
+        finally:
+            try:
+                if users_path and os.path.exists(users_path):
+                    os.remove(users_path)
+            except Exception as cleanup_exc:  # pragma: no cover
+                logger.warning("Falha ao remover temporário %s: %s", users_path, cleanup_exc)
 
-    return df_users, nome_completo
+    if "CPF" not in indice.meta.get("colunas", []):
+        raise ValueError("Base de usuários não contém coluna 'CPF'.")
+    registro = indice.registro_por_cpf(cpf_digits)
+    if registro is None:
+        raise ValueError("CPF não encontrado na base de usuários.")
+    return _nome_do_usuario(registro), indice.tempos, indice.id
 
 
 def _detect_approval_columns(df: pd.DataFrame) -> Dict[str, Any]:
     """Detecta colunas relevantes da base de carga de aprovação.
 
-    Usa nomes esperados, mas de forma case-insensitive.
+    Usa o esquema "aprovacao" (backend/schema.py), de forma case-insensitive.
     Detecta dinamicamente LoginAprovador_1..100.
     """
 
-    col_map: Dict[str, str] = {}
-    for col in df.columns:
-        key = upper_no_accents(str(col)).replace(" ", "").replace("-", "").replace("_", "")
-        col_map[key] = col
-
-    def pick(*candidates: str) -> Optional[str]:
-        for cand in candidates:
-            key = upper_no_accents(cand).replace(" ", "").replace("-", "").replace("_", "")
-            if key in col_map:
-                return col_map[key]
-        return None
-
-    aprovacao_id = pick("AprovacaoId")
-    aprovacao_por = pick("AprovacaoPor")
-    aprovacao = pick("Aprovacao")
-    tipo = pick("Tipo")
-    valor = pick("Valor")
-    desc_ccusto = pick("DescricaoCCusto", "DescricaoCentroDeCusto", "DescricaoCCustoEmpresa")
-    cod_ccusto = pick("CodigoCCusto", "CodigoCentroDeCusto", "CodigoCCustoEmpresa")
-    login_segundo = pick("LoginAprovador_SEGUNDO_NIVEL", "LoginAprovadorSegundoNivel")
-    segundo_master = pick("SegundoNivelMaster")
-    traveler_name_col = pick("NomeViajante", "NomeCompletoViajante", "NomeCompleto")
-
-    approver_cols: List[str] = []
-    for col in df.columns:
-        m = re.match(r"(?i)^LoginAprovador_(\d+)$", str(col))
-        if m:
-            approver_cols.append(col)
-    approver_cols.sort(key=lambda c: int(re.search(r"(\d+)$", str(c)).group(1)))
-
-    return {
-        "aprovacao_id": aprovacao_id,
-        "aprovacao_por": aprovacao_por,
-        "aprovacao": aprovacao,
-        "tipo": tipo,
-        "valor": valor,
-        "desc_ccusto": desc_ccusto,
-        "cod_ccusto": cod_ccusto,
-        "login_segundo": login_segundo,
-        "segundo_master": segundo_master,
-        "traveler_name_col": traveler_name_col,
-        "approver_cols": approver_cols,
+    schema = resolve_columns(df.columns, "aprovacao")
+    cols: Dict[str, Any] = {
+        name: schema.get(name)
+        for name in (
+            "aprovacao_id", "aprovacao_por", "aprovacao", "tipo", "valor", "desc_ccusto",
+            "cod_ccusto", "login_segundo", "segundo_master", "traveler_name_col",
+        )
     }
+    cols["approver_cols"] = list(schema.get("approver_cols") or [])
+    cols["schema"] = schema.report()
+    return cols
 
 
 def _get_or_create_structure(
@@ -384,14 +420,17 @@ def _remove_cpf_and_compact(
     if not aprov_id_col or not approver_cols:
         return df_base, {"structures_updated": 0, "occurrences_removed": 0}
 
-    df_out = df_base.copy()
+    # Cópia rasa: com Copy-on-Write só as colunas alteradas deixam de ser compartilhadas com df_base
+    df_out = df_base.copy(deep=False)
     login_segundo_col = cols.get("login_segundo")
     segundo_master_col = cols.get("segundo_master")
 
     structures_updated: Set[str] = set()
     occurrences_removed = 0
 
-    for idx, row in df_out.iterrows():
+    # Só as linhas das estruturas alvo podem mudar
+    alvo = df_out[aprov_id_col].astype(str).str.strip().isin(target_ids)
+    for idx, row in df_out[alvo.to_numpy()].iterrows():
         aprov_id = str(row.get(aprov_id_col, "")).strip()
         if not aprov_id or aprov_id not in target_ids:
             continue
@@ -450,12 +489,12 @@ def _remove_cpf_and_compact(
 
 
 @aprovacao_bp.route("/remover/preview", methods=["POST"])
+@admission_required
 def aprovacao_remover_preview():
-    users_path: Optional[str] = None
     base_path: Optional[str] = None
     try:
-        users_file = request.files.get("users_file")
-        base_file = request.files.get("base_file")
+        users_file = arquivo_enviado("users_file")
+        base_file = arquivo_enviado("base_file")
         form = request.form or {}
         raw_json = request.get_json(silent=True) if request.is_json else None
         cpf_raw = form.get("cpf") or (raw_json or {}).get("cpf")
@@ -469,13 +508,15 @@ def aprovacao_remover_preview():
         else:
             remove_second_level = str(remove_second_level_raw or "").lower() in {"1", "true", "yes", "on"}
 
-        if not users_file or not base_file:
-            return jsonify({"error": "Envie 'users_file' e 'base_file' (arquivos Excel)."}), 400
+        users_indice = (form.get("users_indice") or (raw_json or {}).get("users_indice") or "").strip()
+        if not (users_file or users_indice) or not base_file:
+            return jsonify({"error": "Envie 'users_file' (ou 'users_indice') e 'base_file' (arquivos Excel)."}), 400
 
         # Validar extensões dos arquivos
-        is_valid, error_msg = validar_extensao_arquivo(users_file.filename)
-        if not is_valid:
-            return jsonify({"error": f"users_file: {error_msg}"}), 400
+        if users_file:
+            is_valid, error_msg = validar_extensao_arquivo(users_file.filename)
+            if not is_valid:
+                return jsonify({"error": f"users_file: {error_msg}"}), 400
         
         is_valid, error_msg = validar_extensao_arquivo(base_file.filename)
         if not is_valid:
@@ -483,15 +524,14 @@ def aprovacao_remover_preview():
 
         cpf_digits, cpf_formatted = _normalize_cpf_input(cpf_raw)
 
-        # Salvar temporários
-        users_path = gerar_nome_arquivo_temporario(users_file.filename or "users.xlsx", settings.UPLOAD_FOLDER)
+        abas = (form.get("abas") or (raw_json or {}).get("abas") or "").strip()
+        approver_name, tempos_abas, indice_id = _find_approver(users_file, users_indice, cpf_digits, abas)
+
+        # Salvar temporário
         base_path = gerar_nome_arquivo_temporario(base_file.filename or "base.xlsx", settings.UPLOAD_FOLDER)
-        users_file.save(users_path)
         base_file.save(base_path)
 
-        _, approver_name = _load_users_and_find_approver(users_path, cpf_digits)
-
-        df_base = pd.read_excel(base_path, dtype=str).fillna("")
+        df_base = ler_tabela(base_path)
         cols = _detect_approval_columns(df_base)
 
         preview = _build_preview_for_cpf(
@@ -561,30 +601,34 @@ def aprovacao_remover_preview():
             "alertas": {
                 "estruturasSemAprovador": structures_without_approvers,
             },
+            "schema": cols.get("schema"),
         }
+        if indice_id:
+            response["usersIndice"] = indice_id
+        if abas:
+            response["abas"] = tempos_abas
         return jsonify(response), 200
     except ValueError as ve:
-        logger.warning(f"Preview aprovacao remover - erro de validação: {ve}")
+        logger.warning("Preview aprovacao remover - erro de validação: %s", ve)
         return jsonify({"error": str(ve)}), 400
     except Exception as exc:  # pragma: no cover - proteção extra
         logger.exception("Erro em /api/aprovacao/remover/preview")
         return jsonify({"error": str(exc)}), 500
     finally:
-        for path in [users_path, base_path]:
-            try:
-                if path and os.path.exists(path):
-                    os.remove(path)
-            except Exception as cleanup_exc:  # pragma: no cover
-                logger.warning(f"Falha ao remover temporário {path}: {cleanup_exc}")
+        try:
+            if base_path and os.path.exists(base_path):
+                os.remove(base_path)
+        except Exception as cleanup_exc:  # pragma: no cover
+            logger.warning("Falha ao remover temporário %s: %s", base_path, cleanup_exc)
 
 
 @aprovacao_bp.route("/remover/export", methods=["POST"])
+@admission_required
 def aprovacao_remover_export():
-    users_path: Optional[str] = None
     base_path: Optional[str] = None
     try:
-        users_file = request.files.get("users_file")
-        base_file = request.files.get("base_file")
+        users_file = arquivo_enviado("users_file")
+        base_file = arquivo_enviado("base_file")
         form = request.form or {}
 
         raw_json = request.get_json(silent=True) if request.is_json else None
@@ -614,30 +658,51 @@ def aprovacao_remover_export():
         else:
             ignore_empty_warning = str(ignore_empty_warning_raw or "").lower() in {"1", "true", "yes", "on"}
 
-        if not users_file or not base_file:
-            return jsonify({"error": "Envie 'users_file' e 'base_file' (arquivos Excel)."}), 400
+        users_indice = (form.get("users_indice") or (raw_json or {}).get("users_indice") or "").strip()
+        if not (users_file or users_indice) or not base_file:
+            return jsonify({"error": "Envie 'users_file' (ou 'users_indice') e 'base_file' (arquivos Excel)."}), 400
 
         # Validar extensões dos arquivos
-        is_valid, error_msg = validar_extensao_arquivo(users_file.filename)
-        if not is_valid:
-            return jsonify({"error": f"users_file: {error_msg}"}), 400
+        if users_file:
+            is_valid, error_msg = validar_extensao_arquivo(users_file.filename)
+            if not is_valid:
+                return jsonify({"error": f"users_file: {error_msg}"}), 400
         
         is_valid, error_msg = validar_extensao_arquivo(base_file.filename)
         if not is_valid:
             return jsonify({"error": f"base_file: {error_msg}"}), 400
 
         cpf_digits, cpf_formatted = _normalize_cpf_input(cpf_raw)
+        abas = (form.get("abas") or (raw_json or {}).get("abas") or "").strip()
+
+        cache_key = None
+        if result_cache is not None:
+            cache_key = result_cache.key(
+                "aprovacao_export",
+                {"users_file": users_file, "base_file": base_file},
+                {
+                    "cpf": cpf_digits,
+                    "mode": mode,
+                    "selected_ids": sorted(selected_ids) if mode == "selected" else [],
+                    "remove_second_level": remove_second_level,
+                    "ignore_empty_warning": ignore_empty_warning,
+                    "abas": abas,
+                    "users_indice": "" if users_file else users_indice,
+                },
+            )
+            cached = result_cache.get(cache_key)
+            if cached:
+                logger.info("Export aprovacao remover servido do cache de resultados")
+                return cached_file_response(*cached)
 
-        # Salvar temporários
-        users_path = gerar_nome_arquivo_temporario(users_file.filename or "users.xlsx", settings.UPLOAD_FOLDER)
+        # Garante que o CPF existe na base de usuários (e obtém nome apenas para validação/coerência)
+        _, tempos_abas, indice_id = _find_approver(users_file, users_indice, cpf_digits, abas)
+
+        # Salvar temporário
         base_path = gerar_nome_arquivo_temporario(base_file.filename or "base.xlsx", settings.UPLOAD_FOLDER)
-        users_file.save(users_path)
         base_file.save(base_path)
 
-        # Garante que o CPF existe na base de usuários (e obtém nome apenas para validação/coerência)
-        _, _ = _load_users_and_find_approver(users_path, cpf_digits)
-
-        df_base = pd.read_excel(base_path, dtype=str).fillna("")
+        df_base = ler_tabela(base_path)
         cols = _detect_approval_columns(df_base)
 
         preview = _build_preview_for_cpf(
@@ -683,9 +748,9 @@ def aprovacao_remover_export():
         # Filtrar apenas as estruturas que foram alteradas para reduzir tamanho e tempo
         aprovacao_id_col = cols.get("aprovacao_id")
         if aprovacao_id_col and aprovacao_id_col in df_updated.columns:
-            df_export = df_updated[df_updated[aprovacao_id_col].astype(str).isin(target_ids)].copy()
+            df_export = df_updated[df_updated[aprovacao_id_col].astype(str).isin(target_ids)]
         else:
-            df_export = df_updated.copy()
+            df_export = df_updated
 
         # Adicionar/atualizar coluna Operacao com valor UPDATE em todas as linhas (como primeira coluna)
         if "Operacao" in df_export.columns:
@@ -745,22 +810,34 @@ def aprovacao_remover_export():
             len(df_base),
         )
 
-        return send_file(
+        mimetype = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        if cache_key:
+            result_cache.put(cache_key, output.getvalue(), {
+                "filename": filename,
+                "mimetype": mimetype,
+                "stats": {**stats, "exported_rows": len(df_export), "total_rows": len(df_base)},
+            })
+
+        response = send_file(
             output,
             download_name=filename,
             as_attachment=True,
-            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            mimetype=mimetype,
         )
+        if indice_id:
+            response.headers["X-Users-Indice"] = indice_id
+        if abas:
+            response.headers["X-Abas"] = json.dumps(tempos_abas)
+        return response
     except ValueError as ve:
-        logger.warning(f"Export aprovacao remover - erro de validação: {ve}")
+        logger.warning("Export aprovacao remover - erro de validação: %s", ve)
         return jsonify({"error": str(ve)}), 400
     except Exception as exc:  # pragma: no cover - proteção extra
         logger.exception("Erro em /api/aprovacao/remover/export")
         return jsonify({"error": str(exc)}), 500
     finally:
-        for path in [users_path, base_path]:
-            try:
-                if path and os.path.exists(path):
-                    os.remove(path)
-            except Exception as cleanup_exc:  # pragma: no cover
-                logger.warning(f"Falha ao remover temporário {path}: {cleanup_exc}")
+        try:
+            if base_path and os.path.exists(base_path):
+                os.remove(base_path)
+        except Exception as cleanup_exc:  # pragma: no cover
+            logger.warning("Falha ao remover temporário %s: %s", base_path, cleanup_exc)
@@ -0,0 +1,124 @@
+import io
+import os
+import pandas as pd
+from flask import Blueprint, request, jsonify, send_file
+from backend.admission import BYTES_PER_CELL, admission_required
+from backend.core.config import settings
+from backend.core.logging import get_logger
+from backend.base_versions import base_store
+from backend.readers import ler_planilha
+from backend.uploads import arquivo_enviado
+from backend.utils import validar_extensao_arquivo, gerar_nome_arquivo_temporario
+
+logger = get_logger()
+
+bases_bp = Blueprint('bases', __name__, url_prefix='/api/bases')
+
+DELTA_SHEETS = [
+    ("adicionados", "Adicionados"),
+    ("removidos", "Removidos"),
+    ("alterados", "Alterados"),
+    ("status_inativados", "StatusInativados"),
+]
+
+
+def _custo_versoes(*metas) -> int:
+    return sum(m["linhas"] * max(1, len(m["colunas"])) for m in metas) * BYTES_PER_CELL
+
+
+def _custo_registro() -> int:
+    """Memória da versão anterior, comparada com a nova ao registrar (a nova é o upload)."""
+    try:
+        versoes = base_store.list_versions(request.view_args["cliente"])
+    except ValueError:
+        return 0
+    return _custo_versoes(versoes[-1]) if versoes else 0
+
+
+def _custo_delta() -> int:
+    """Memória das duas versões carregadas e comparadas (linhas × colunas registradas)."""
+    try:
+        de, para = base_store.delta_versions(request.view_args["cliente"], request.args.get("de") or None,
+                                             request.args.get("para") or None)
+    except ValueError:
+        return 0  # a própria rota responde 400
+    return _custo_versoes(de, para)
+
+
+@bases_bp.route('/<cliente>/versoes', methods=['GET'])
+def api_listar_versoes(cliente):
+    try:
+        return jsonify({"cliente": cliente, "versoes": base_store.list_versions(cliente)}), 200
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+
+
+@bases_bp.route('/<cliente>/versoes', methods=['POST'])
+@admission_required(custo_extra=_custo_registro)
+def api_registrar_versao(cliente):
+    base_path = None
+    try:
+        base_file = arquivo_enviado("base")
+        if not base_file:
+            return jsonify({"error": "Envie a base (arquivo Excel)"}), 400
+
+        is_valid, error_msg = validar_extensao_arquivo(base_file.filename)
+        if not is_valid:
+            return jsonify({"error": error_msg}), 400
+
+        base_path = gerar_nome_arquivo_temporario(base_file.filename, settings.UPLOAD_FOLDER)
+        base_file.save(base_path)
+        df_base = ler_planilha(base_path, compacto=True)
+
+        meta = base_store.register(cliente, df_base, source_name=base_file.filename)
+        response = {"versao": meta, "delta": None}
+        if base_store.previous_id(cliente, meta["id"]):
+            info, _, stats = base_store.delta(cliente, to_id=meta["id"])
+            response["delta"] = {**info, "stats": stats}
+        return jsonify(response), 201
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        logger.exception("Erro em /api/bases/<cliente>/versoes")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        try:
+            if base_path and os.path.exists(base_path):
+                os.remove(base_path)
+        except Exception:
+            logger.warning("Falha ao remover temporário %s", base_path)
+
+
+@bases_bp.route('/<cliente>/delta', methods=['GET'])
+@admission_required(custo_extra=_custo_delta)
+def api_delta(cliente):
+    try:
+        info, frames, stats = base_store.delta(
+            cliente,
+            from_id=request.args.get("de") or None,
+            to_id=request.args.get("para") or None,
+        )
+        if (request.args.get("formato") or "json").lower() != "xlsx":
+            return jsonify({**info, "stats": stats}), 200
+
+        output = io.BytesIO()
+        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+            linhas = [{"Indicador": k, "Valor": v} for k, v in stats.items()]
+            linhas += [{"Indicador": f"{k} (nomes)", "Valor": ", ".join(info[k])}
+                       for k in ("colunas_adicionadas", "colunas_removidas") if info[k]]
+            resumo = pd.DataFrame(linhas)
+            resumo.to_excel(writer, sheet_name='Resumo', index=False)
+            for key, sheet_name in DELTA_SHEETS:
+                frames[key].to_excel(writer, sheet_name=sheet_name, index=False)
+            for ws in writer.sheets.values():
+                ws.freeze_panes = 'A2'
+        output.seek(0)
+        return send_file(output,
+                         download_name=f"delta_{cliente}_{info['de']}_{info['para']}.xlsx",
+                         as_attachment=True,
+                         mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        logger.exception("Erro em /api/bases/<cliente>/delta")
+        return jsonify({"error": str(e)}), 500
@@ -1,10 +1,17 @@
 import os
 import io
-from flask import Blueprint, request, jsonify, send_file
+import json
+from flask import Blueprint, Response, request, jsonify, send_file, stream_with_context
 import pandas as pd
+from backend.admission import admission_required
+from backend.base_versions import base_store
 from backend.core.config import settings
-from backend.core.logging import get_logger
-from backend.processor import processar_registros_from_files
+from backend.core.logging import finalizar_contadores, get_logger, iniciar_contadores
+from backend.output_parts import parametros_partes, resposta_zip
+from backend.processor import (processar_cadastro_contra_base, processar_registros_from_files,
+                               validar_registros_from_files)
+from backend.readers import ler_abas
+from backend.uploads import arquivo_enviado, arquivos_enviados
 from backend.utils import validar_extensao_arquivo, gerar_nome_arquivo_temporario
 
 logger = get_logger()
@@ -12,11 +19,79 @@ logger = get_logger()
 cadastro_bp = Blueprint('cadastro', __name__, url_prefix='/api')
 
 
+def _write_sheet(writer, df: pd.DataFrame, sheet_name: str) -> None:
+    """Escreve `df` na aba com cabeçalho destacado, larguras ajustadas e filtro."""
+    from openpyxl.styles import Font, Alignment, PatternFill
+    from openpyxl.utils import get_column_letter
+
+    df.to_excel(writer, sheet_name=sheet_name, index=False)
+    ws = writer.sheets[sheet_name]
+
+    header_fill = PatternFill(start_color='FFDCE6F1', end_color='FFDCE6F1', fill_type='solid')
+    for cell in list(ws[1]):
+        cell.font = Font(bold=True)
+        cell.alignment = Alignment(horizontal='center', vertical='center')
+        cell.fill = header_fill
+
+    for idx, col in enumerate(df.columns, 1):
+        series = df[col].astype(str).fillna("")
+        max_len = max(series.map(len).max() if len(series) else 0, len(str(col))) + 2
+        max_len = min(max_len, 60)
+        ws.column_dimensions[get_column_letter(idx)].width = max_len
+
+    ws.freeze_panes = 'A2'
+    try:
+        ws.auto_filter.ref = ws.dimensions
+    except Exception:
+        pass
+
+
+def _xlsx_parte(df: pd.DataFrame, sheet_name: str) -> bytes:
+    """Uma parte da saída dividida (`max_rows_per_file`): pasta com uma só aba."""
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        _write_sheet(writer, df, sheet_name)
+    return output.getvalue()
+
+
+def _load_cadastro_base(paths: list, tempos_abas: list):
+    """Base do cliente para checar existentes: arquivo `base` ou versão registrada.
+
+    Retorna None quando nenhuma das duas foi informada.
+    """
+    base_file = arquivo_enviado('base')
+    if base_file:
+        is_valid, error_msg = validar_extensao_arquivo(base_file.filename)
+        if not is_valid:
+            raise ValueError(error_msg)
+        base_path = gerar_nome_arquivo_temporario(base_file.filename, settings.UPLOAD_FOLDER)
+        base_file.save(base_path)
+        paths.append(base_path)
+        df_base, _, tempos = ler_abas(base_path, request.form.get('abas'), compacto=True)
+        tempos_abas.extend(tempos)
+        return df_base
+    cliente = (request.form.get('base_cliente') or '').strip()
+    if cliente:
+        _, df_base = base_store.load(cliente, (request.form.get('base_versao') or '').strip() or None)
+        return df_base
+    return None
+
+
+def _remover_temporarios(paths: list) -> None:
+    for p in paths:
+        try:
+            if os.path.exists(p):
+                os.remove(p)
+        except Exception:
+            logger.warning("Falha ao remover temporário %s", p)
+
+
 @cadastro_bp.route('/process_cadastro', methods=['POST'])
+@admission_required
 def api_process_cadastro():
     paths = []
     try:
-        uploaded = request.files.getlist('files[]') or request.files.getlist('files')
+        uploaded = arquivos_enviados('files[]') or arquivos_enviados('files')
         if not uploaded:
             return jsonify({"error": "Nenhum arquivo enviado"}), 400
 
@@ -25,65 +100,145 @@ def api_process_cadastro():
             is_valid, error_msg = validar_extensao_arquivo(f.filename)
             if not is_valid:
                 return jsonify({"error": error_msg}), 400
+        partes = parametros_partes(request.form)
 
         for f in uploaded:
             p = gerar_nome_arquivo_temporario(f.filename, settings.UPLOAD_FOLDER)
             f.save(p)
             paths.append(p)
+        ficha_paths = list(paths)
 
         login_choice = request.form.get('login_choice', 'CPF')
         fluxo = request.form.get('fluxo', 'SELF')
+        modo_existentes = (request.form.get('existentes') or 'update').strip().lower()
+        if modo_existentes not in ('update', 'skip'):
+            return jsonify({"error": "Parâmetro 'existentes' deve ser 'update' ou 'skip'"}), 400
 
-        errors, df_final = processar_registros_from_files(paths, login_choice=login_choice, fluxo=fluxo)
-
-        if df_final.empty:
+        # tempos de leitura de cada aba (abas escolhidas no campo 'abas')
+        abas = request.form.get('abas')
+        tempos_abas = {"fichas": [], "base": []}
+        try:
+            df_base = _load_cadastro_base(paths, tempos_abas["base"])
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+
+        df_existentes, stats = None, None
+        if df_base is None:
+            errors, df_final = processar_registros_from_files(ficha_paths, login_choice=login_choice, fluxo=fluxo,
+                                                              abas=abas, tempos_abas=tempos_abas["fichas"])
+        else:
+            errors, df_final, df_existentes, stats = processar_cadastro_contra_base(
+                ficha_paths, df_base, login_choice=login_choice, fluxo=fluxo, modo_existentes=modo_existentes,
+                abas=abas, tempos_abas=tempos_abas["fichas"]
+            )
+            logger.info("Cadastro contra base: %s", stats)
+
+        if df_final.empty and (df_existentes is None or df_existentes.empty):
             return jsonify({"error": "Nenhum registro processado", "errors": errors}), 400
 
-        output = io.BytesIO()
-        try:
-            import openpyxl  # noqa: F401
-            from openpyxl.styles import Font, Alignment, PatternFill
-
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df_final.to_excel(writer, sheet_name='Cadastro', index=False)
-                ws = writer.sheets['Cadastro']
-
-                header_fill = PatternFill(start_color='FFDCE6F1', end_color='FFDCE6F1', fill_type='solid')
-                for cell in list(ws[1]):
-                    cell.font = Font(bold=True)
-                    cell.alignment = Alignment(horizontal='center', vertical='center')
-                    cell.fill = header_fill
-
-                from openpyxl.utils import get_column_letter
-                for idx, col in enumerate(df_final.columns, 1):
-                    series = df_final[col].astype(str).fillna("")
-                    max_len = max(series.map(len).max(), len(str(col))) + 2
-                    max_len = min(max_len, 60)
-                    ws.column_dimensions[get_column_letter(idx)].width = max_len
-
-                ws.freeze_panes = 'A2'
-                try:
-                    ws.auto_filter.ref = ws.dimensions
-                except Exception:
-                    pass
-
-            output.seek(0)
-        except Exception:
+        aba_existentes = 'Atualizacao' if modo_existentes == 'update' else 'Ignorados'
+        if partes:
+            # ZIP com as partes, enviado à medida que cada uma fica pronta
+            max_linhas, formato = partes
+            grupos = [("saida_cadastro", df_final, 'Cadastro')]
+            if df_existentes is not None:
+                grupos.append((f"saida_cadastro_{aba_existentes.lower()}", df_existentes, aba_existentes))
+            response = resposta_zip(grupos, max_linhas, formato, _xlsx_parte, "saida_cadastro.zip")
+        else:
             output = io.BytesIO()
-            df_final.to_excel(output, index=False)
-            output.seek(0)
+            try:
+                import openpyxl  # noqa: F401
 
-        return send_file(output,
-                         download_name="saida_cadastro.xlsx",
-                         as_attachment=True,
-                         mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+                with pd.ExcelWriter(output, engine='openpyxl') as writer:
+                    _write_sheet(writer, df_final, 'Cadastro')
+                    if df_existentes is not None:
+                        _write_sheet(writer, df_existentes, aba_existentes)
+
+                output.seek(0)
+            except Exception:
+                output = io.BytesIO()
+                df_final.to_excel(output, index=False)
+                output.seek(0)
+
+            response = send_file(output,
+                                 download_name="saida_cadastro.xlsx",
+                                 as_attachment=True,
+                                 mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        if stats is not None:
+            response.headers['X-Cadastro-Stats'] = json.dumps(stats)
+        if abas:
+            response.headers['X-Abas'] = json.dumps(tempos_abas)
+        return response
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
     except Exception as e:
         logger.exception("Erro em /api/process_cadastro")
         return jsonify({"error": str(e)}), 500
     finally:
-        for p in paths:
+        _remover_temporarios(paths)
+
+
+@cadastro_bp.route('/process_cadastro/validar', methods=['POST'])
+@admission_required
+def api_validar_cadastro():
+    """Só valida o cadastro (sem gerar a planilha), com os mesmos campos de `/process_cadastro`.
+
+    A resposta é NDJSON (um evento JSON por linha, ver
+    `processor.validar_registros_from_files`), enviado enquanto a validação
+    avança. `max_erros` encerra a validação depois de tantos registros com erro.
+    """
+    paths = []
+    streaming = False
+    try:
+        uploaded = arquivos_enviados('files[]') or arquivos_enviados('files')
+        if not uploaded:
+            return jsonify({"error": "Nenhum arquivo enviado"}), 400
+        for f in uploaded:
+            is_valid, error_msg = validar_extensao_arquivo(f.filename)
+            if not is_valid:
+                return jsonify({"error": error_msg}), 400
+        max_erros_raw = (request.form.get('max_erros') or '').strip()
+        if max_erros_raw and (not max_erros_raw.isdigit() or int(max_erros_raw) < 1):
+            return jsonify({"error": "Parâmetro 'max_erros' deve ser um inteiro positivo"}), 400
+
+        nomes = {}
+        for f in uploaded:
+            p = gerar_nome_arquivo_temporario(f.filename, settings.UPLOAD_FOLDER)
+            f.save(p)
+            paths.append(p)
+            nomes[p] = f.filename
+
+        eventos = validar_registros_from_files(
+            list(paths), login_choice=request.form.get('login_choice', 'CPF'),
+            fluxo=request.form.get('fluxo', 'SELF'), abas=request.form.get('abas'),
+            max_erros=int(max_erros_raw) if max_erros_raw else None,
+        )
+
+        def gerar():
+            # A validação roda enquanto o corpo é enviado, fora dos contadores abertos
+            # no before_request: o gerador abre os seus e registra o resumo ao terminar
+            contadores = iniciar_contadores()
             try:
-                if os.path.exists(p):
-                    os.remove(p)
-            except Exception:
-                logger.warning(f"Falha ao remover temporário {p}")
+                for evento in eventos:
+                    if "arquivo" in evento:
+                        evento["arquivo"] = nomes.get(evento["arquivo"], evento["arquivo"])
+                    yield json.dumps(evento, ensure_ascii=False) + "\n"
+            except Exception as e:
+                logger.exception("Erro em /api/process_cadastro/validar")
+                yield json.dumps({"tipo": "falha", "erro": str(e)}, ensure_ascii=False) + "\n"
+            finally:
+                finalizar_contadores(contadores, request.path)
+                _remover_temporarios(paths)
+
+        streaming = True
+        # X-Accel-Buffering: proxies (nginx) repassam cada linha assim que ela sai
+        return Response(stream_with_context(gerar()), mimetype='application/x-ndjson',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        logger.exception("Erro em /api/process_cadastro/validar")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if not streaming:
+            _remover_temporarios(paths)
@@ -1,24 +1,24 @@
-import os
-from flask import Blueprint, send_from_directory, abort, jsonify, request
-from backend.core.config import settings
+from flask import Blueprint, abort, jsonify, request
 from backend.core.logging import get_logger
+from backend.static_assets import INDEX, asset_manifest, asset_response
 
 logger = get_logger()
 
 frontend_bp = Blueprint('frontend', __name__)
 
 
-@frontend_bp.route('/', defaults={'path': 'index.html'})
+@frontend_bp.route('/', defaults={'path': INDEX})
 @frontend_bp.route('/<path:path>')
 def serve_frontend(path):
-    frontend_dir = settings.FRONTEND_DIR
-    full_path = os.path.join(frontend_dir, path)
-    if os.path.exists(full_path) and os.path.isfile(full_path):
-        return send_from_directory(frontend_dir, path)
-    index_path = os.path.join(frontend_dir, 'index.html')
-    if os.path.exists(index_path):
-        return send_from_directory(frontend_dir, 'index.html')
-    abort(404)
+    found = asset_manifest.get(path)
+    if found is None:
+        # Arquivo estático inexistente é 404; outras rotas caem no index.html (SPA)
+        if path.startswith('static/'):
+            abort(404)
+        found = asset_manifest.get(INDEX)
+        if found is None:
+            abort(404)
+    return asset_response(*found)
 
 
 @frontend_bp.route('/health', methods=['GET', 'HEAD'])
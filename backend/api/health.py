@@ -1,5 +1,8 @@
 from flask import Blueprint, jsonify, request
 
+from backend.admission import admission
+from backend.result_cache import result_cache
+
 health_bp = Blueprint('health', __name__, url_prefix='/api')
 
 
@@ -7,4 +10,12 @@ health_bp = Blueprint('health', __name__, url_prefix='/api')
 def api_health():
     if request.method == 'HEAD':
         return ('', 204)
-    return jsonify({'status': 'OK', 'message': 'Servidor rodando'}), 200
\ No newline at end of file
+    return jsonify({'status': 'OK', 'message': 'Servidor rodando', 'admission': admission.snapshot()}), 200
+
+
+@health_bp.route('/metrics', methods=['GET'])
+def api_metrics():
+    return jsonify({
+        'admission': admission.snapshot(),
+        'result_cache': result_cache.stats() if result_cache is not None else None,
+    }), 200
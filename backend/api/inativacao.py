@@ -1,15 +1,26 @@
 import os
 import re
 import io
+import json
 import uuid
 import pandas as pd
 from flask import Blueprint, request, jsonify, send_file
 
 # Use absolute imports to be robust to direct script execution
+from backend.admission import admission_required
 from backend.core.config import settings
 from backend.core.logging import get_logger
-from backend.processor import processar_inativacao_from_paths, processar_registros_from_files, MODEL_COLS
-from backend.utils import upper_no_accents, validar_extensao_arquivo, gerar_nome_arquivo_temporario
+from backend.base_versions import base_store
+from backend.output_parts import parametros_partes, resposta_zip
+from backend.processor import (buscar_itens, buscar_itens_indice, colunas_base_inativacao, colunas_chave_base,
+                               filtro_base_ativa, processar_inativacao_from_paths, processar_registros_from_files,
+                               projecao_base_inativacao, MODEL_COLS)
+from backend.readers import HEADER_SAMPLE_ROWS, ler_abas, ler_planilha
+from backend.result_cache import cached_file_response, result_cache
+from backend.schema import resolve_columns
+from backend.uploads import arquivo_enviado
+from backend.user_index import user_index
+from backend.utils import validar_extensao_arquivo, gerar_nome_arquivo_temporario
 
 logger = get_logger()
 
@@ -22,62 +33,163 @@ def _normalize_lista_columns(df_lista: pd.DataFrame) -> pd.DataFrame:
     Reutilizável entre preview e process.
     """
     try:
-        import re as _re
-        norm_map = {_re.sub(r"\s+", " ", str(c)).strip().upper(): c for c in df_lista.columns}
+        schema = resolve_columns(df_lista.columns, "lista")
 
         # CPF: procurar qualquer coluna que contenha 'CPF'
-        cpf_src = next((v for k, v in norm_map.items() if 'CPF' in k), None)
+        cpf_src = schema.get('cpf')
         if 'CPF' not in df_lista.columns:
             df_lista['CPF'] = df_lista[cpf_src] if cpf_src else ''
 
         # NomeCompleto: procurar combinação de Nome + Sobrenome, ou coluna Nome Completo
-        nome_src = next((v for k, v in norm_map.items() if 'NOME COMPLETO' in k or 'NOMECOMPLETO' in k), None)
+        nome_src = schema.get('nome_completo')
         if 'NomeCompleto' not in df_lista.columns:
             if nome_src:
                 df_lista['NomeCompleto'] = df_lista[nome_src]
             else:
-                nome = next((v for k, v in norm_map.items() if k == 'NOME' or k.endswith(' NOME')), None)
-                sobrenome = next((v for k, v in norm_map.items() if 'SOBRENOME' in k), None)
+                nome = schema.get('nome')
+                sobrenome = schema.get('sobrenome')
                 if nome and sobrenome:
                     df_lista['NomeCompleto'] = (df_lista[nome].astype(str).fillna('') + ' ' + df_lista[sobrenome].astype(str).fillna('')).str.strip()
                 elif nome:
                     df_lista['NomeCompleto'] = df_lista[nome]
                 else:
-                    any_nome = next((v for k, v in norm_map.items() if 'NOME' in k), None)
+                    any_nome = schema.get('nome_qualquer')
                     df_lista['NomeCompleto'] = df_lista[any_nome] if any_nome else ''
 
         for c in ['CPF', 'NomeCompleto']:
             if c in df_lista.columns:
                 df_lista[c] = df_lista[c].astype(str).fillna('')
         # Email: detectar qualquer coluna que contenha 'EMAIL'
-        email_src = next((v for k, v in norm_map.items() if 'EMAIL' in k), None)
+        email_src = schema.get('email')
         if 'Email' not in df_lista.columns:
             df_lista['Email'] = df_lista[email_src] if email_src else ''
         if 'Email' in df_lista.columns:
             df_lista['Email'] = df_lista['Email'].astype(str).fillna('').str.strip()
     except Exception as e:
-        logger.warning(f"Normalização de colunas da lista falhou: {e}")
+        logger.warning("Normalização de colunas da lista falhou: %s", e)
 
     return df_lista
 
 
+def _load_registered_base(form):
+    """Carrega uma base registrada (`base_cliente`/`base_versao`) em vez de um upload.
+
+    Com `escopo=delta`, retorna apenas as linhas adicionadas ou alteradas em
+    relação à versão anterior. Retorna None quando nenhum cliente foi informado.
+    """
+    cliente = (form.get("base_cliente") or "").strip()
+    if not cliente:
+        return None
+    versao = (form.get("base_versao") or "").strip() or None
+    if (form.get("escopo") or "").strip().lower() == "delta":
+        _, frames, stats = base_store.delta(cliente, to_id=versao)
+        logger.info("Inativação sobre o delta de %s: %s", cliente, stats)
+        return pd.concat([frames["adicionados"], frames["alterados"]], ignore_index=True)
+    _, df_base = base_store.load(cliente, versao)
+    return df_base
+
+
+def _inativacao_cache_key(form, files: dict):
+    """Chave do cache de resultado: conteúdo dos arquivos + parâmetros do formulário.
+
+    Com base registrada sem versão explícita, a versão mais recente do cliente
+    entra na chave (um novo registro invalida o resultado anterior).
+    """
+    if result_cache is None:
+        return None
+    params = {f"{name}_ext": os.path.splitext(f.filename or "")[1].lower() for name, f in files.items() if f}
+    for field in ("lista_text", "base_cliente", "base_versao", "escopo", "use_fuzzy", "fuzzy_cutoff", "abas"):
+        params[field] = (form.get(field) or "").strip()
+    if params["base_cliente"] and not files.get("base") and not params["base_versao"]:
+        versions = base_store.list_versions(params["base_cliente"])
+        params["base_versao"] = versions[-1]["id"] if versions else ""
+    return result_cache.key("inativacao", files, params)
+
+
+def _planilha_inativacao(out_df: pd.DataFrame) -> io.BytesIO:
+    """Planilha de inativação (aba 'Inativacao') com cabeçalho destacado, larguras ajustadas e filtro."""
+    output = io.BytesIO()
+    try:
+        import openpyxl
+        from openpyxl.styles import Font, Alignment, PatternFill
+        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+            out_df.to_excel(writer, sheet_name='Inativacao', index=False)
+            ws = writer.sheets['Inativacao']
+            header_fill = PatternFill(start_color='FFDCE6F1', end_color='FFDCE6F1', fill_type='solid')
+            for cell in list(ws[1]):
+                cell.font = Font(bold=True)
+                cell.alignment = Alignment(horizontal='center', vertical='center')
+                cell.fill = header_fill
+            from openpyxl.utils import get_column_letter
+            for idx, col in enumerate(out_df.columns, 1):
+                series = out_df[col].astype(str).fillna("")
+                max_len = max(series.map(len).max(), len(str(col))) + 2
+                max_len = min(max_len, 60)
+                ws.column_dimensions[get_column_letter(idx)].width = max_len
+            ws.freeze_panes = 'A2'
+            try:
+                ws.auto_filter.ref = ws.dimensions
+            except Exception:
+                pass
+        output.seek(0)
+    except Exception:
+        output = io.BytesIO()
+        out_df.to_excel(output, index=False)
+        output.seek(0)
+    return output
+
+
+@inativacao_bp.route("/inativacao/colunas", methods=["POST"])
+def api_inativacao_colunas():
+    """Colunas da base usadas na inativação, para o navegador enviar só elas.
+
+    Recebe JSON `{"amostra": [[...], ...]}` com as primeiras linhas da aba
+    (como texto) e devolve a linha de cabeçalho e as posições das colunas a
+    manter (`processor.projecao_base_inativacao`).
+    """
+    data = request.get_json(silent=True) or {}
+    amostra = data.get("amostra")
+    if not isinstance(amostra, list) or not amostra or not all(isinstance(row, list) for row in amostra):
+        return jsonify({"error": "Envie 'amostra' com as primeiras linhas da planilha (lista de linhas)"}), 400
+    amostra = [["" if v is None else str(v) for v in row] for row in amostra[:HEADER_SAMPLE_ROWS]]
+    return jsonify(projecao_base_inativacao(amostra))
+
+
 @inativacao_bp.route("/inativacao/buscar", methods=["POST"])
+@admission_required
 def api_inativacao_buscar():
     base_path = None
     lista_path = None
     try:
-        base_file = request.files.get("base")
-        if not base_file:
+        base_file = arquivo_enviado("base")
+        base_indice = (request.form.get("base_indice") or "").strip()
+        if not base_file and not base_indice:
             return jsonify({"error": "Envie a base (arquivo Excel)"}), 400
-        
-        # Validar extensão do arquivo
-        is_valid, error_msg = validar_extensao_arquivo(base_file.filename)
-        if not is_valid:
-            return jsonify({"error": error_msg}), 400
-        
-        base_path = gerar_nome_arquivo_temporario(base_file.filename, settings.UPLOAD_FOLDER)
-        base_file.save(base_path)
-        df_base = pd.read_excel(base_path, dtype=str).fillna("")
+        abas = request.form.get("abas")
+
+        def carregar_base():
+            nonlocal base_path
+            base_path = gerar_nome_arquivo_temporario(base_file.filename, settings.UPLOAD_FOLDER)
+            base_file.save(base_path)
+            df, _, tempos = ler_abas(base_path, abas)
+            return df, tempos
+
+        # Com o índice SQLite (user_index), um arquivo reenviado é consultado sem ler a planilha;
+        # na primeira vez a busca segue pelo DataFrame
+        indice = None
+        if base_file:
+            # Validar extensão do arquivo
+            is_valid, error_msg = validar_extensao_arquivo(base_file.filename)
+            if not is_valid:
+                return jsonify({"error": error_msg}), 400
+            if user_index is not None:
+                indice = user_index.obter(base_file, "busca", abas, carregar_base)
+            if indice is None:
+                df_base, tempos_abas = carregar_base()
+        elif user_index is None:
+            return jsonify({"error": "Índice de bases desativado (USER_INDEX_ENABLED); envie o arquivo."}), 400
+        else:
+            indice = user_index.abrir(base_indice)
 
         # Extrair itens (CPFs ou nomes)
         itens = []
@@ -96,7 +208,7 @@ def api_inativacao_buscar():
                 except Exception:
                     itens = []
         if not itens:
-            lista_file = request.files.get("lista")
+            lista_file = arquivo_enviado("lista")
             lista_text = request.form.get("lista_text", "")
             if lista_file:
                 # Validar extensão do arquivo
@@ -107,7 +219,7 @@ def api_inativacao_buscar():
                 lista_path = gerar_nome_arquivo_temporario(lista_file.filename, settings.UPLOAD_FOLDER)
                 lista_file.save(lista_path)
                 try:
-                    df_lista = pd.read_excel(lista_path, dtype=str).fillna("")
+                    df_lista = ler_planilha(lista_path)
                     df_lista = _normalize_lista_columns(df_lista)
                     if 'CPF' in df_lista.columns:
                         itens = [str(x) for x in df_lista['CPF'].tolist() if str(x).strip()]
@@ -117,147 +229,17 @@ def api_inativacao_buscar():
                 itens = [line.strip() for line in lista_text.split('\n') if line.strip()]
 
         raw_items = [str(x).strip() for x in (itens or [])]
-        cpfs_digits = [re.sub(r"\D", "", x) for x in raw_items]
-        valid_cpfs = [x for x in cpfs_digits if len(x) == 11]
-
-        # Detectar emails (simples) que não sejam já classificados como CPF
-        email_pat = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$", re.IGNORECASE)
-        valid_emails = [x for x in raw_items if email_pat.match(x) and re.sub(r"\D", "", x) not in valid_cpfs]
-
-        def is_valid_fullname(s: str) -> bool:
-            s = upper_no_accents(str(s)).strip()
-            parts = s.split()
-            return len(parts) >= 2 and len(s) >= 3
-
-        valid_names_raw = [x for x in raw_items if re.sub(r"\D", "", x) not in valid_cpfs and x not in valid_emails and is_valid_fullname(x)]
-        valid_names_norm = [upper_no_accents(x).strip() for x in valid_names_raw]
-
-        seen = set()
-        duplicates = []
-        for c in valid_cpfs:
-            if c in seen and c not in duplicates:
-                duplicates.append(c)
-            seen.add(c)
-
-        def _detect_base_cols(df_base: pd.DataFrame):
-            col_map = {upper_no_accents(str(c)).strip(): c for c in df_base.columns}
-            cpf_col = next((v for k, v in col_map.items() if "CPF" in k), None)
-            nome_col = next((v for k, v in col_map.items() if "NOMECOMPLETO" in k or "NOME COMPLETO" in k or k == 'NOME COMPLETO'), None)
-            email_col = next((v for k, v in col_map.items() if "EMAIL" in k), None)
-            status_col = next((v for k, v in col_map.items() if "STATUS" in k), None)
-            userid_col = next((v for k, v in col_map.items() if "USERID" in k or "IDUSUARIO" in k or k.endswith(' USERID')), None)
-            return cpf_col, nome_col, email_col, status_col, userid_col
-
-        cpf_col, nome_col, email_col, status_col, userid_col = _detect_base_cols(df_base)
-
-        df_base = df_base.copy()
-        if cpf_col:
-            df_base['CPFdigits'] = df_base[cpf_col].apply(lambda v: re.sub(r"\D", "", str(v)))
-        else:
-            df_base['CPFdigits'] = ""
-        if nome_col:
-            df_base['NomeNorm'] = df_base[nome_col].apply(lambda v: upper_no_accents(str(v)).strip())
+        if indice is not None:
+            payload = buscar_itens_indice(indice, raw_items)
+            payload["indice"] = indice.id
+            tempos_abas = indice.tempos
         else:
-            df_base['NomeNorm'] = ""
-
-        results = []
-        found_cpfs = set()
-        found_emails = set()
-        if valid_cpfs and cpf_col:
-            matches = df_base[df_base['CPFdigits'].isin(valid_cpfs)].copy()
-            for _, row in matches.iterrows():
-                cpf = row.get('CPFdigits', '')
-                found_cpfs.add(cpf)
-                item = {
-                    "id": str(row.get(userid_col, "")) if userid_col and row.get(userid_col, "") != "" else None,
-                    "nome": str(row.get(nome_col, "")) if nome_col else str(row.get('NomeCompleto', "")),
-                    "cpf": cpf,
-                    "email": str(row.get(email_col, "")) if email_col else str(row.get('Email', "")),
-                    "status_atual": str(row.get(status_col, "")) if status_col else str(row.get('Status', "")),
-                    "found": True,
-                }
-                results.append(item)
-
-        found_name_norms = set()
-        if valid_names_norm and nome_col:
-            name_matches = df_base[df_base['NomeNorm'].isin(valid_names_norm)].copy()
-            for _, row in name_matches.iterrows():
-                cpf = row.get('CPFdigits', '')
-                name_norm = row.get('NomeNorm', '')
-                if cpf and cpf in found_cpfs:
-                    found_name_norms.add(name_norm)
-                    continue
-                found_name_norms.add(name_norm)
-                item = {
-                    "id": str(row.get(userid_col, "")) if userid_col and row.get(userid_col, "") != "" else None,
-                    "nome": str(row.get(nome_col, "")) if nome_col else str(row.get('NomeCompleto', "")),
-                    "cpf": cpf,
-                    "email": str(row.get(email_col, "")) if email_col else str(row.get('Email', "")),
-                    "status_atual": str(row.get(status_col, "")) if status_col else str(row.get('Status', "")),
-                    "found": True,
-                }
-                results.append(item)
-
-        # Email matches (case-insensitive)
-        if valid_emails and email_col:
-            base_email_series = df_base[email_col].astype(str).fillna('')
-            base_email_norm = base_email_series.str.strip().str.lower()
-            target_emails_norm = [e.strip().lower() for e in valid_emails]
-            email_matches = df_base[base_email_norm.isin(target_emails_norm)].copy()
-            for _, row in email_matches.iterrows():
-                email_val = str(row.get(email_col, '')).strip()
-                found_emails.add(email_val.lower())
-                item = {
-                    "id": str(row.get(userid_col, "")) if userid_col and row.get(userid_col, "") != "" else None,
-                    "nome": str(row.get(nome_col, "")) if nome_col else str(row.get('NomeCompleto', "")),
-                    "cpf": str(row.get('CPFdigits', '')),
-                    "email": email_val,
-                    "status_atual": str(row.get(status_col, "")) if status_col else str(row.get('Status', "")),
-                    "found": True,
-                }
-                results.append(item)
-
-        not_found_cpfs = [c for c in valid_cpfs if c not in found_cpfs]
-        for cpf in not_found_cpfs:
-            results.append({
-                "id": None,
-                "nome": "",
-                "cpf": cpf,
-                "email": "",
-                "status_atual": "Não localizado",
-                "found": False,
-            })
-        not_found_names = [n for n in valid_names_norm if n not in found_name_norms]
-        for n in not_found_names:
-            results.append({
-                "id": None,
-                "nome": n,
-                "cpf": "",
-                "email": "",
-                "status_atual": "Não localizado",
-                "found": False,
-            })
-        not_found_emails = [e for e in valid_emails if e.strip().lower() not in found_emails]
-        for e in not_found_emails:
-            results.append({
-                "id": None,
-                "nome": "",
-                "cpf": "",
-                "email": e,
-                "status_atual": "Não localizado",
-                "found": False,
-            })
-
-        def sort_key(it):
-            return (0 if it.get('found') else 1, it.get('nome') or '', it.get('cpf') or '')
-        results = sorted(results, key=sort_key)
-
-        return jsonify({
-            "items": results,
-            "total": len(results),
-            "duplicates": duplicates,  # pode conter CPFs duplicados; emails duplicados não são listados separadamente
-            "not_found": not_found_cpfs + valid_names_raw + not_found_emails,
-        }), 200
+            payload = buscar_itens(df_base, raw_items)
+        if abas:
+            payload["abas"] = tempos_abas
+        return jsonify(payload), 200
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
     except Exception as e:
         logger.exception("Erro em /api/inativacao/buscar")
         return jsonify({"error": str(e)}), 500
@@ -301,15 +283,20 @@ def api_inativacao_executar():
 
 
 @inativacao_bp.route("/process_inativacao", methods=["POST"])
+@admission_required
 def api_process_inativacao():
     base_path = None
     lista_path = None
     try:
-        base_file = request.files.get("base")
-        lista_file = request.files.get("lista")
+        base_file = arquivo_enviado("base")
+        lista_file = arquivo_enviado("lista")
         lista_text = request.form.get("lista_text", "").strip()
 
-        if not base_file:
+        try:
+            df_registered = None if base_file else _load_registered_base(request.form)
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+        if not base_file and df_registered is None:
             logger.error("Nenhum arquivo 'base' enviado")
             return jsonify({"error": "Envie a base"}), 400
 
@@ -317,14 +304,22 @@ def api_process_inativacao():
             logger.error("Nenhum arquivo 'lista' ou texto enviado")
             return jsonify({"error": "Envie a lista ou insira os nomes/CPFs"}), 400
 
-        # Validar extensão do arquivo base
-        is_valid, error_msg = validar_extensao_arquivo(base_file.filename)
-        if not is_valid:
-            return jsonify({"error": error_msg}), 400
+        partes = parametros_partes(request.form)
+        cache_key = None if partes else _inativacao_cache_key(request.form, {"base": base_file, "lista": lista_file})
+        cached = result_cache.get(cache_key) if cache_key else None
+        if cached:
+            logger.info("Inativação servida do cache de resultados")
+            return cached_file_response(*cached)
 
-        base_path = gerar_nome_arquivo_temporario(base_file.filename, settings.UPLOAD_FOLDER)
-        base_file.save(base_path)
-        logger.info(f"Arquivo base salvo em: {base_path}")
+        if base_file:
+            # Validar extensão do arquivo base
+            is_valid, error_msg = validar_extensao_arquivo(base_file.filename)
+            if not is_valid:
+                return jsonify({"error": error_msg}), 400
+
+            base_path = gerar_nome_arquivo_temporario(base_file.filename, settings.UPLOAD_FOLDER)
+            base_file.save(base_path)
+            logger.info("Arquivo base salvo em: %s", base_path)
 
         if lista_file:
             # Validar extensão do arquivo lista
@@ -334,8 +329,8 @@ def api_process_inativacao():
             
             lista_path = gerar_nome_arquivo_temporario(lista_file.filename, settings.UPLOAD_FOLDER)
             lista_file.save(lista_path)
-            logger.info(f"Arquivo lista salvo em: {lista_path}")
-            df_lista = pd.read_excel(lista_path, dtype=str).fillna("")
+            logger.info("Arquivo lista salvo em: %s", lista_path)
+            df_lista = ler_planilha(lista_path)
             df_lista = _normalize_lista_columns(df_lista)
         else:
             logger.info("Processando lista a partir de texto")
@@ -356,7 +351,14 @@ def api_process_inativacao():
             if 'Email' not in df_lista.columns:
                 df_lista['Email'] = ''
 
-        df_base = pd.read_excel(base_path, dtype=str).fillna("")
+        tempos_abas = None
+        if df_registered is not None:
+            df_base, df_ignorados = df_registered, None
+        else:
+            # Só linhas ATIVO e colunas usadas na ficha são materializadas
+            df_base, df_ignorados, tempos_abas = ler_abas(
+                base_path, request.form.get("abas"), filtro=filtro_base_ativa, colunas=colunas_base_inativacao,
+                colunas_ignoradas=colunas_chave_base, compacto=True)
 
         use_fuzzy = request.form.get('use_fuzzy', 'false').lower() in ['1', 'true', 'yes']
         try:
@@ -364,54 +366,50 @@ def api_process_inativacao():
         except Exception:
             fuzzy_cutoff = 0.90
 
-        out = processar_inativacao_from_paths(df_base, df_lista, use_fuzzy=use_fuzzy, fuzzy_cutoff=fuzzy_cutoff)
+        out = processar_inativacao_from_paths(df_base, df_lista, use_fuzzy=use_fuzzy, fuzzy_cutoff=fuzzy_cutoff,
+                                              df_ignorados=df_ignorados)
         if isinstance(out, tuple) and len(out) == 2:
             out_df, stats = out
         else:
             out_df = out
             stats = {}
+        if tempos_abas and request.form.get("abas"):
+            stats["abas"] = tempos_abas
 
-        logger.info(f"DataFrame gerado: {out_df.shape} linhas, {out_df.columns.tolist()} colunas")
+        logger.info("DataFrame gerado: %d linhas, %d colunas", out_df.shape[0], out_df.shape[1])
         if out_df.empty:
             logger.warning("DataFrame vazio retornado por processar_inativacao_from_paths")
-            if stats and stats.get('inactive_matches'):
+            if stats and (stats.get('inactive_matches') or (stats.get('inativos') or {}).get('total')):
                 return jsonify({"error": "Nenhuma linha ativa correspondeu; foram encontradas correspondências INATIVAS.", "stats": stats}), 400
             return jsonify({"error": "Nenhum dado processado para inativação", "stats": stats}), 400
 
-        output = io.BytesIO()
-        try:
-            import openpyxl
-            from openpyxl.styles import Font, Alignment, PatternFill
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                out_df.to_excel(writer, sheet_name='Inativacao', index=False)
-                ws = writer.sheets['Inativacao']
-                header_fill = PatternFill(start_color='FFDCE6F1', end_color='FFDCE6F1', fill_type='solid')
-                for cell in list(ws[1]):
-                    cell.font = Font(bold=True)
-                    cell.alignment = Alignment(horizontal='center', vertical='center')
-                    cell.fill = header_fill
-                from openpyxl.utils import get_column_letter
-                for idx, col in enumerate(out_df.columns, 1):
-                    series = out_df[col].astype(str).fillna("")
-                    max_len = max(series.map(len).max(), len(str(col))) + 2
-                    max_len = min(max_len, 60)
-                    ws.column_dimensions[get_column_letter(idx)].width = max_len
-                ws.freeze_panes = 'A2'
-                try:
-                    ws.auto_filter.ref = ws.dimensions
-                except Exception:
-                    pass
-            output.seek(0)
-        except Exception:
-            output = io.BytesIO()
-            out_df.to_excel(output, index=False)
-            output.seek(0)
+        if partes:
+            # ZIP com as partes, enviado à medida que cada uma fica pronta (fora do cache de resultados)
+            max_linhas, formato = partes
+            response = resposta_zip([("saida_inativacao", out_df, 'Inativacao')], max_linhas, formato,
+                                    lambda df, _aba: _planilha_inativacao(df).getvalue(), "saida_inativacao.zip")
+            if stats.get("abas"):
+                response.headers["X-Abas"] = json.dumps(stats["abas"])
+            return response
+
+        output = _planilha_inativacao(out_df)
+
+        download_name = "saida_inativacao.xlsx"
+        mimetype = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        if cache_key:
+            result_cache.put(cache_key, output.getvalue(),
+                             {"filename": download_name, "mimetype": mimetype, "stats": stats})
 
         logger.info("Arquivo de inativação gerado e enviado")
-        return send_file(output,
-                         download_name="saida_inativacao.xlsx",
-                         as_attachment=True,
-                         mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        response = send_file(output,
+                             download_name=download_name,
+                             as_attachment=True,
+                             mimetype=mimetype)
+        if stats.get("abas"):
+            response.headers["X-Abas"] = json.dumps(stats["abas"])
+        return response
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
     except Exception as e:
         logger.exception("Erro em /api/process_inativacao")
         return jsonify({"error": str(e)}), 500
@@ -420,30 +418,36 @@ def api_process_inativacao():
             try:
                 if path and os.path.exists(path):
                     os.remove(path)
-                    logger.info(f"Arquivo temporário removido: {path}")
+                    logger.info("Arquivo temporário removido: %s", path)
             except Exception as e:
-                logger.warning(f"Falha ao remover {path}: {str(e)}")
+                logger.warning("Falha ao remover %s: %s", path, e)
 
 
 @inativacao_bp.route("/preview_inativacao", methods=["POST"])
+@admission_required
 def api_preview_inativacao():
     base_path = None
     lista_path = None
     try:
-        base_file = request.files.get("base")
-        lista_file = request.files.get("lista")
+        base_file = arquivo_enviado("base")
+        lista_file = arquivo_enviado("lista")
         lista_text = request.form.get("lista_text", "").strip()
 
-        if not base_file:
+        try:
+            df_registered = None if base_file else _load_registered_base(request.form)
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+        if not base_file and df_registered is None:
             return jsonify({"error": "Envie a base"}), 400
 
-        # Validar extensão do arquivo base
-        is_valid, error_msg = validar_extensao_arquivo(base_file.filename)
-        if not is_valid:
-            return jsonify({"error": error_msg}), 400
+        if base_file:
+            # Validar extensão do arquivo base
+            is_valid, error_msg = validar_extensao_arquivo(base_file.filename)
+            if not is_valid:
+                return jsonify({"error": error_msg}), 400
 
-        base_path = gerar_nome_arquivo_temporario(base_file.filename, settings.UPLOAD_FOLDER)
-        base_file.save(base_path)
+            base_path = gerar_nome_arquivo_temporario(base_file.filename, settings.UPLOAD_FOLDER)
+            base_file.save(base_path)
 
         if lista_file:
             # Validar extensão do arquivo lista
@@ -453,7 +457,7 @@ def api_preview_inativacao():
             
             lista_path = gerar_nome_arquivo_temporario(lista_file.filename, settings.UPLOAD_FOLDER)
             lista_file.save(lista_path)
-            df_lista = pd.read_excel(lista_path, dtype=str).fillna("")
+            df_lista = ler_planilha(lista_path)
             df_lista = _normalize_lista_columns(df_lista)
         else:
             if not lista_text:
@@ -475,19 +479,29 @@ def api_preview_inativacao():
             if 'Email' not in df_lista.columns:
                 df_lista['Email'] = ''
 
-        df_base = pd.read_excel(base_path, dtype=str).fillna("")
+        tempos_abas = None
+        if df_registered is not None:
+            df_base, df_ignorados = df_registered, None
+        else:
+            # Linhas não ativas ficam fora da leitura; as colunas são todas mantidas para os registros do preview
+            df_base, df_ignorados, tempos_abas = ler_abas(
+                base_path, request.form.get("abas"), filtro=filtro_base_ativa,
+                colunas_ignoradas=colunas_chave_base, compacto=True)
 
         use_fuzzy = request.form.get('use_fuzzy', 'false').lower() in ['1', 'true', 'yes']
         try:
             fuzzy_cutoff = float(request.form.get('fuzzy_cutoff', 0.90))
         except Exception:
             fuzzy_cutoff = 0.90
-        out = processar_inativacao_from_paths(df_base, df_lista, use_fuzzy=use_fuzzy, fuzzy_cutoff=fuzzy_cutoff)
+        out = processar_inativacao_from_paths(df_base, df_lista, use_fuzzy=use_fuzzy, fuzzy_cutoff=fuzzy_cutoff,
+                                              df_ignorados=df_ignorados)
         if isinstance(out, tuple) and len(out) == 2:
             out_df, stats = out
         else:
             out_df = out
             stats = {}
+        if tempos_abas and request.form.get("abas"):
+            stats["abas"] = tempos_abas
 
         try:
             count = int(stats.get('total_matches')) if stats and 'total_matches' in stats else (int(out_df.shape[0]) if out_df is not None else 0)
@@ -537,12 +551,15 @@ def api_preview_inativacao():
                 pass
 
         try:
-            logger.info(f"/api/preview_inativacao -> count={count} sample={len(sample)} records={len(records)} columns={len(columns)}")
+            logger.info("/api/preview_inativacao -> count=%s sample=%d records=%d columns=%d",
+                        count, len(sample), len(records), len(columns))
             if sample and isinstance(sample, list) and len(sample) > 0:
-                logger.debug(f"preview sample keys: {list(sample[0].keys())[:10]}")
+                logger.debug("preview sample keys: %s", list(sample[0].keys())[:10])
         except Exception:
             pass
         return jsonify({"count": count, "sample": sample, "columns": columns, "records": records, "stats": stats}), 200
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
     except Exception as e:
         logger.exception("Erro em /api/preview_inativacao")
         return jsonify({"error": str(e)}), 500
@@ -551,6 +568,6 @@ def api_preview_inativacao():
             try:
                 if path and os.path.exists(path):
                     os.remove(path)
-                    logger.info(f"Arquivo temporário removido: {path}")
+                    logger.info("Arquivo temporário removido: %s", path)
             except Exception as e:
-                logger.warning(f"Falha ao remover {path}: {str(e)}")
+                logger.warning("Falha ao remover %s: %s", path, e)
@@ -0,0 +1,84 @@
+from flask import Blueprint, request, jsonify
+from backend.core.logging import get_logger
+from backend.uploads import OffsetInvalido, fechar_uploads_abertos, upload_store
+
+logger = get_logger()
+
+uploads_bp = Blueprint('uploads', __name__, url_prefix='/api/uploads')
+
+
+@uploads_bp.teardown_app_request
+def _fechar_uploads(exc):
+    fechar_uploads_abertos()
+
+
+def _offset_invalido(oi: OffsetInvalido):
+    return jsonify({"error": str(oi), "recebido": oi.recebido}), 409
+
+
+@uploads_bp.route('', methods=['POST'])
+def api_upload_init():
+    """Abre um upload em blocos: {filename, size, sha256?} -> estado com o id."""
+    try:
+        payload = request.get_json(silent=True) or request.form
+        try:
+            size = int(payload.get("size", 0))
+        except (TypeError, ValueError):
+            return jsonify({"error": "size deve ser um inteiro."}), 400
+        status = upload_store.init(payload.get("filename") or "", size, payload.get("sha256"))
+        return jsonify(status), 201
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        logger.exception("Erro em /api/uploads")
+        return jsonify({"error": str(e)}), 500
+
+
+@uploads_bp.route('/<upload_id>', methods=['GET'])
+def api_upload_status(upload_id):
+    try:
+        return jsonify(upload_store.status(upload_id)), 200
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 404
+
+
+@uploads_bp.route('/<upload_id>', methods=['PUT'])
+def api_upload_chunk(upload_id):
+    """Grava o corpo da requisição a partir de ?offset= (ou do cabeçalho Upload-Offset)."""
+    try:
+        try:
+            offset = int(request.args.get("offset", request.headers.get("Upload-Offset", "")))
+        except (TypeError, ValueError):
+            return jsonify({"error": "Informe o offset do bloco (inteiro)."}), 400
+        recebido = upload_store.write_chunk(upload_id, offset, request.stream,
+                                            request.headers.get("X-Chunk-Sha256"))
+        return jsonify({"id": upload_id, "recebido": recebido}), 200
+    except OffsetInvalido as oi:
+        return _offset_invalido(oi)
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        logger.exception("Erro em /api/uploads/<id> (PUT)")
+        return jsonify({"error": str(e)}), 500
+
+
+@uploads_bp.route('/<upload_id>/complete', methods=['POST'])
+def api_upload_complete(upload_id):
+    try:
+        return jsonify(upload_store.complete(upload_id)), 200
+    except OffsetInvalido as oi:
+        return _offset_invalido(oi)
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        logger.exception("Erro em /api/uploads/<id>/complete")
+        return jsonify({"error": str(e)}), 500
+
+
+@uploads_bp.route('/<upload_id>', methods=['DELETE'])
+def api_upload_delete(upload_id):
+    try:
+        upload_store.delete(upload_id)
+        return ('', 204)
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
@@ -1,6 +1,6 @@
 import os
 import sys
-from flask import Flask
+from flask import Flask, g, request
 from flask_cors import CORS
 
 # Garantir que o diretório pai esteja no sys.path para execução direta (python backend/app.py ou python app.py)
@@ -9,13 +9,16 @@ if PARENT not in sys.path:
     sys.path.insert(0, PARENT)
 
 from backend.core.config import settings
-from backend.core.logging import get_logger
+from backend.core.logging import finalizar_contadores, get_logger, iniciar_contadores
 from backend.api import (
     cadastro_bp,
     frontend_bp,
     health_bp,
     inativacao_bp,
     aprovacao_bp,
+    bases_bp,
+    analise_bp,
+    uploads_bp,
 )
 
 logger = get_logger()
@@ -23,7 +26,8 @@ logger = get_logger()
 
 def create_app() -> Flask:
     """Factory para criar a aplicação Flask configurada."""
-    app = Flask(__name__, static_folder=settings.FRONTEND_STATIC_DIR, static_url_path='/static')
+    # /static é servido pelo frontend_bp, a partir do manifesto em memória (backend/static_assets.py)
+    app = Flask(__name__, static_folder=None)
     CORS(app)
     app.config['MAX_CONTENT_LENGTH'] = settings.MAX_CONTENT_LENGTH
     app.config['UPLOAD_FOLDER'] = settings.UPLOAD_FOLDER
@@ -34,6 +38,18 @@ def create_app() -> Flask:
     app.register_blueprint(frontend_bp)
     app.register_blueprint(health_bp)
     app.register_blueprint(aprovacao_bp)
+    app.register_blueprint(bases_bp)
+    app.register_blueprint(analise_bp)
+    app.register_blueprint(uploads_bp)
+
+    # Contadores de log da requisição: registrados numa linha só ao final
+    @app.before_request
+    def _iniciar_contadores_log():
+        g.log_contadores = iniciar_contadores()
+
+    @app.teardown_request
+    def _finalizar_contadores_log(exc):
+        finalizar_contadores(g.pop('log_contadores', None), request.path)
 
     logger.info('Aplicação Flask criada e blueprints registrados.')
     return app
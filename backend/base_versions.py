@@ -0,0 +1,324 @@
+# backend/base_versions.py
+"""Versões de bases de clientes e diff incremental entre versões.
+
+Cada base registrada é guardada em disco (pickle do DataFrame já lido como
+texto). O diff entre duas versões é feito por chave (CPF em dígitos ou
+UserId) comparando um hash por linha da chave normalizada e das colunas
+presentes nas duas versões, sem comparar os DataFrames célula a célula:
+mudar só a formatação do CPF ou incluir uma coluna na exportação não marca
+as linhas como alteradas (as colunas incluídas/removidas são informadas à
+parte).
+"""
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from .core.config import settings
+from .core.logging import get_logger
+from .schema import resolve_columns
+from .utils import upper_no_accents
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem flock; o servidor de desenvolvimento roda num processo só
+    fcntl = None
+
+logger = get_logger()
+
+KEY_COL = "__chave"
+HASH_COL = "__hash"
+_SAFE_CLIENT = re.compile(r"[^A-Za-z0-9_\-]")
+# Trava do índice quando não há fcntl (só threads do mesmo processo)
+_index_lock = threading.Lock()
+# Versões já lidas no master (`preload_latest`), por (pasta do cliente, id da versão).
+# Uma versão nunca muda depois de registrada, então o snapshot não fica desatualizado.
+_snapshots: Dict[Tuple[str, str], pd.DataFrame] = {}
+
+
+def _detect_key_columns(df: pd.DataFrame) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """Retorna (cpf_col, userid_col, status_col) detectados pelo cabeçalho."""
+    schema = resolve_columns(df.columns, "base")
+    return schema.get("cpf"), schema.get("user_id"), schema.get("status")
+
+
+def build_row_keys(df: pd.DataFrame) -> pd.Series:
+    """Chave de cada linha: CPF (somente dígitos, 11 posições) ou, na falta, UserId."""
+    cpf_col, userid_col, _ = _detect_key_columns(df)
+    keys = pd.Series("", index=df.index, dtype=object)
+    if cpf_col:
+        digits = df[cpf_col].astype(str).str.replace(r"\D", "", regex=True)
+        keys = ("CPF:" + digits.str.zfill(11)).where(digits != "", "")
+    if userid_col:
+        uid = df[userid_col].astype(str).str.strip()
+        keys = keys.where(keys != "", ("ID:" + uid).where(uid != "", ""))
+    return keys
+
+
+def diff_columns(df_old: pd.DataFrame, df_new: pd.DataFrame) -> Tuple[List[str], List[str]]:
+    """(colunas incluídas, colunas removidas) da versão nova em relação à anterior."""
+    old_cols = [str(c) for c in df_old.columns]
+    new_cols = [str(c) for c in df_new.columns]
+    return [c for c in new_cols if c not in old_cols], [c for c in old_cols if c not in new_cols]
+
+
+def hash_rows(df: pd.DataFrame, columns: List[str]) -> pd.Series:
+    """Hash (uint64) do conteúdo de cada linha, considerando apenas `columns`."""
+    aligned = df.reindex(columns=columns, fill_value="").astype(str)
+    return pd.util.hash_pandas_object(aligned, index=False)
+
+
+def compute_delta(df_old: pd.DataFrame, df_new: pd.DataFrame) -> Tuple[Dict[str, pd.DataFrame], Dict[str, int]]:
+    """Compara duas versões de uma base e retorna (frames, stats).
+
+    frames: 'adicionados', 'removidos', 'alterados' e 'status_inativados'
+    (linhas que eram ATIVO e deixaram de ser). Linhas sem chave são ignoradas
+    e contadas em stats['sem_chave'].
+
+    Uma linha é alterada quando muda alguma coluna presente nas duas versões;
+    as colunas de CPF/UserId entram pela chave normalizada. Colunas incluídas
+    ou removidas são contadas em stats['colunas_adicionadas'/'colunas_removidas'].
+    """
+    df_old = df_old.rename(columns=str)
+    df_new = df_new.rename(columns=str)
+    added_cols, removed_cols = diff_columns(df_old, df_new)
+    key_cols = {c for df in (df_old, df_new) for c in _detect_key_columns(df)[:2] if c}
+    columns = [KEY_COL] + sorted((set(df_old.columns) & set(df_new.columns)) - key_cols)
+
+    def prepare(df: pd.DataFrame) -> pd.DataFrame:
+        keys = build_row_keys(df)
+        keyed = pd.DataFrame({
+            KEY_COL: keys.values,
+            HASH_COL: hash_rows(df.assign(**{KEY_COL: keys}), columns).values,
+        }, index=df.index)
+        return keyed
+
+    old_k = prepare(df_old)
+    new_k = prepare(df_new)
+
+    stats = {
+        "linhas_anterior": int(len(df_old)),
+        "linhas_atual": int(len(df_new)),
+        "sem_chave": int((old_k[KEY_COL] == "").sum() + (new_k[KEY_COL] == "").sum()),
+        "colunas_adicionadas": len(added_cols),
+        "colunas_removidas": len(removed_cols),
+    }
+
+    old_k = old_k[old_k[KEY_COL] != ""]
+    new_k = new_k[new_k[KEY_COL] != ""]
+    stats["chaves_duplicadas"] = int(old_k[KEY_COL].duplicated().sum() + new_k[KEY_COL].duplicated().sum())
+    old_k = old_k.drop_duplicates(KEY_COL, keep="first")
+    new_k = new_k.drop_duplicates(KEY_COL, keep="first")
+
+    joined = old_k.reset_index().merge(
+        new_k.reset_index(), on=KEY_COL, how="outer", suffixes=("_old", "_new"), indicator=True
+    )
+    added_idx = joined.loc[joined["_merge"] == "right_only", "index_new"].astype(int)
+    removed_idx = joined.loc[joined["_merge"] == "left_only", "index_old"].astype(int)
+    both = joined[joined["_merge"] == "both"]
+    changed = both[both[f"{HASH_COL}_old"] != both[f"{HASH_COL}_new"]]
+
+    frames: Dict[str, pd.DataFrame] = {
+        "adicionados": df_new.loc[added_idx.values],
+        "removidos": df_old.loc[removed_idx.values],
+        "alterados": df_new.loc[changed["index_new"].astype(int).values],
+    }
+
+    # Status: ATIVO na versão anterior e diferente de ATIVO na atual
+    _, _, status_old_col = _detect_key_columns(df_old)
+    _, _, status_new_col = _detect_key_columns(df_new)
+    if status_old_col and status_new_col and not changed.empty:
+        old_idx = changed["index_old"].astype(int).values
+        new_idx = changed["index_new"].astype(int).values
+        st_old = df_old.loc[old_idx, status_old_col].astype(str).map(upper_no_accents).str.strip().values
+        st_new = df_new.loc[new_idx, status_new_col].astype(str).map(upper_no_accents).str.strip().values
+        flipped = (st_old == "ATIVO") & (st_new != "ATIVO")
+        frames["status_inativados"] = df_new.loc[new_idx[flipped]]
+    else:
+        frames["status_inativados"] = df_new.iloc[0:0]
+
+    for name, frame in frames.items():
+        stats[name] = int(len(frame))
+    return frames, stats
+
+
+class BaseVersionStore:
+    """Armazena versões de bases por cliente em `settings.BASES_FOLDER`.
+
+    Layout: <pasta>/<cliente>/index.json + <versao>.pkl
+    """
+
+    def __init__(self, folder: Optional[str] = None, keep: Optional[int] = None):
+        self.folder = folder or settings.BASES_FOLDER
+        self.keep = settings.BASE_VERSIONS_KEEP if keep is None else keep
+
+    def _client_dir(self, cliente: str) -> str:
+        safe = _SAFE_CLIENT.sub("_", (cliente or "").strip())
+        if not safe:
+            raise ValueError("Informe o identificador do cliente.")
+        return os.path.join(self.folder, safe)
+
+    def _read_index(self, cliente: str) -> List[dict]:
+        path = os.path.join(self._client_dir(cliente), "index.json")
+        if not os.path.exists(path):
+            return []
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_index(self, cliente: str, versions: List[dict]) -> None:
+        path = os.path.join(self._client_dir(cliente), "index.json")
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(versions, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+
+    @contextmanager
+    def _locked(self, cliente: str) -> Iterator[None]:
+        """Trava o índice do cliente entre processos (workers do gunicorn) e threads."""
+        client_dir = self._client_dir(cliente)
+        os.makedirs(client_dir, exist_ok=True)
+        if fcntl is None:
+            with _index_lock:
+                yield
+            return
+        with open(os.path.join(client_dir, "index.lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def list_versions(self, cliente: str) -> List[dict]:
+        return self._read_index(cliente)
+
+    def register(self, cliente: str, df: pd.DataFrame, source_name: str = "") -> dict:
+        """Registra uma nova versão e descarta as mais antigas além de `keep`.
+
+        O pickle é gravado antes; a leitura e a regravação do índice acontecem
+        sob a trava do cliente, para registros simultâneos não se perderem.
+        """
+        client_dir = self._client_dir(cliente)
+        os.makedirs(client_dir, exist_ok=True)
+        version_id = time.strftime("%Y%m%d%H%M%S") + "-" + uuid.uuid4().hex[:6]
+        df.to_pickle(os.path.join(client_dir, f"{version_id}.pkl"))
+
+        meta = {
+            "id": version_id,
+            "arquivo": source_name,
+            "linhas": int(len(df)),
+            "colunas": [str(c) for c in df.columns],
+            "registrado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        with self._locked(cliente):
+            versions = self._read_index(cliente)
+            versions.append(meta)
+            while self.keep and len(versions) > self.keep:
+                old = versions.pop(0)
+                try:
+                    os.remove(os.path.join(client_dir, f"{old['id']}.pkl"))
+                except OSError:
+                    logger.warning("Falha ao remover versão antiga %s de %s", old['id'], cliente)
+            self._write_index(cliente, versions)
+        return meta
+
+    def load(self, cliente: str, version_id: Optional[str] = None) -> Tuple[dict, pd.DataFrame]:
+        """Carrega uma versão (a mais recente se `version_id` for None)."""
+        versions = self._read_index(cliente)
+        if not versions:
+            raise ValueError(f"Nenhuma versão registrada para o cliente '{cliente}'.")
+        if version_id:
+            meta = next((v for v in versions if v["id"] == version_id), None)
+            if meta is None:
+                raise ValueError(f"Versão '{version_id}' não encontrada para o cliente '{cliente}'.")
+        else:
+            meta = versions[-1]
+        client_dir = self._client_dir(cliente)
+        snapshot = _snapshots.get((client_dir, meta["id"]))
+        if snapshot is not None:
+            # Cópia rasa (Copy-on-Write): alterações do chamador não chegam ao snapshot compartilhado
+            return meta, snapshot.copy(deep=False)
+        df = pd.read_pickle(os.path.join(client_dir, f"{meta['id']}.pkl"))
+        return meta, df
+
+    def preload_latest(self, max_bytes: int) -> int:
+        """Carrega a versão mais recente de cada cliente, as mais usadas primeiro, até `max_bytes`.
+
+        Chamado no master do gunicorn antes do fork (`backend/wsgi.py`): os
+        frames ficam compartilhados em copy-on-write pelos workers, e `load`
+        deixa de ler o pickle dessas versões. Versões cujo pickle já excede o
+        que resta de `max_bytes` nem são lidas. Retorna os bytes carregados.
+        """
+        if max_bytes <= 0 or not os.path.isdir(self.folder):
+            return 0
+        clients = []
+        for name in os.listdir(self.folder):
+            path = os.path.join(self.folder, name, "index.json")
+            if os.path.exists(path):
+                clients.append((os.path.getmtime(path), name))
+        total = 0
+        for _, name in sorted(clients, reverse=True):
+            try:
+                versions = self._read_index(name)
+                if not versions:
+                    continue
+                # O pickle não é maior que o frame em memória: uma versão cujo
+                # arquivo já não cabe no que sobra é descartada sem ser lida
+                pkl = os.path.join(self._client_dir(name), f"{versions[-1]['id']}.pkl")
+                if total + os.path.getsize(pkl) > max_bytes:
+                    continue
+                meta, df = self.load(name)
+            except (ValueError, OSError) as e:
+                logger.warning("Pré-carga da base %s ignorada: %s", name, e)
+                continue
+            size = int(df.memory_usage(deep=True).sum())
+            if total + size > max_bytes:
+                continue
+            _snapshots[(self._client_dir(name), meta["id"])] = df
+            total += size
+        logger.info("Bases pré-carregadas: %d versões, %.0f MB", len(_snapshots), total / 1024 / 1024)
+        return total
+
+    def previous_id(self, cliente: str, version_id: str) -> Optional[str]:
+        ids = [v["id"] for v in self._read_index(cliente)]
+        if version_id not in ids:
+            return None
+        pos = ids.index(version_id)
+        return ids[pos - 1] if pos > 0 else None
+
+    def delta_versions(self, cliente: str, from_id: Optional[str] = None,
+                       to_id: Optional[str] = None) -> Tuple[dict, dict]:
+        """Metadados (de, para) das versões comparadas por `delta`, sem carregá-las."""
+        versions = self._read_index(cliente)
+        if not versions:
+            raise ValueError(f"Nenhuma versão registrada para o cliente '{cliente}'.")
+        by_id = {v["id"]: v for v in versions}
+        for version_id in (from_id, to_id):
+            if version_id and version_id not in by_id:
+                raise ValueError(f"Versão '{version_id}' não encontrada para o cliente '{cliente}'.")
+        to_meta = by_id[to_id] if to_id else versions[-1]
+        from_id = from_id or self.previous_id(cliente, to_meta["id"])
+        if not from_id:
+            raise ValueError("É necessário ao menos duas versões registradas para calcular o delta.")
+        return by_id[from_id], to_meta
+
+    def delta(self, cliente: str, from_id: Optional[str] = None,
+              to_id: Optional[str] = None) -> Tuple[dict, Dict[str, pd.DataFrame], Dict[str, int]]:
+        """Diff entre duas versões (padrão: penúltima -> última)."""
+        from_meta, to_meta = self.delta_versions(cliente, from_id, to_id)
+        _, df_to = self.load(cliente, to_meta["id"])
+        _, df_from = self.load(cliente, from_meta["id"])
+        frames, stats = compute_delta(df_from, df_to)
+        added_cols, removed_cols = diff_columns(df_from, df_to)
+        info = {"cliente": cliente, "de": from_meta["id"], "para": to_meta["id"],
+                "colunas_adicionadas": added_cols, "colunas_removidas": removed_cols}
+        logger.info("Delta %s %s -> %s: %s", cliente, from_meta['id'], to_meta['id'], stats)
+        return info, frames, stats
+
+
+base_store = BaseVersionStore()
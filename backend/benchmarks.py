@@ -0,0 +1,965 @@
+"""Benchmarks do backend.
+
+Uso (a partir de backend/):
+    python benchmarks.py server --workers 1,2,4
+    python benchmarks.py docx --fichas 1000
+    python benchmarks.py memory --rows 300000
+    python benchmarks.py buscar --items 50000
+    python benchmarks.py leitura --rows 100000 --inativos 0.8
+    python benchmarks.py cpf --cpfs 2000000
+    python benchmarks.py saida --rows 100000
+    python benchmarks.py indice --rows 300000 --items 1000
+    python benchmarks.py estaticos --requests 2000
+    python benchmarks.py formatos --rows 100000
+    python benchmarks.py validacao --rows 100000 --max-erros 100
+    python benchmarks.py partes --rows 200000 --max-rows 50000
+    python benchmarks.py projecao --rows 100000 --extra-cols 30
+    python benchmarks.py abas --sheets 4 --rows 20000 --workers 4
+
+Cada benchmark imprime uma tabela simples no stdout; os resultados de
+referência ficam documentados no README (seção Benchmarks).
+"""
+import argparse
+import io
+import os
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+
+# ----------------------------------------------------------
+# Dados sintéticos
+# ----------------------------------------------------------
+def cpf_ficticio(n: int) -> str:
+    """CPF válido (dígitos verificadores corretos) a partir dos 9 primeiros dígitos `n`."""
+    digits = [int(c) for c in f"{n:09d}"]
+    for weight in (10, 11):
+        digits.append(sum(d * w for d, w in zip(digits, range(weight, 1, -1))) * 10 % 11 % 10)
+    return "".join(map(str, digits))
+
+
+def make_base(rows: int) -> pd.DataFrame:
+    """Base de usuários fictícia no formato exportado pela plataforma."""
+    cpfs = [cpf_ficticio(i + 1) for i in range(rows)]
+    return pd.DataFrame({
+        "UserId": [str(100000 + i) for i in range(rows)],
+        "Login": cpfs,
+        "CPF": cpfs,
+        "NomeCompleto": [f"Usuario {i} Teste" for i in range(rows)],
+        "Email": [f"usuario{i}@empresa.com" for i in range(rows)],
+        "Status": ["ATIVO" if i % 3 else "INATIVO" for i in range(rows)],
+        "Empresa": [f"EMPRESA {i % 5}" for i in range(rows)],
+        "Codigo_Centro_de_Custo": [str(i % 40) for i in range(rows)],
+        "Centro_de_Custo": [f"CC {i % 40}" for i in range(rows)],
+        "Solicitante": ["S" if i % 2 else "N" for i in range(rows)],
+    })
+
+
+def to_xlsx_bytes(df: pd.DataFrame) -> bytes:
+    buf = io.BytesIO()
+    df.to_excel(buf, index=False)
+    return buf.getvalue()
+
+
+def _multipart(fields: dict, files: dict) -> tuple:
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, (filename, content) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode() + content + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+# ----------------------------------------------------------
+# server: vazão com N workers do gunicorn
+# ----------------------------------------------------------
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(url: str, timeout: float = 60.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as resp:
+                if resp.status == 200:
+                    return
+        except Exception:
+            time.sleep(0.25)
+    raise RuntimeError(f"Servidor não respondeu em {timeout}s: {url}")
+
+
+def bench_server(args) -> None:
+    base_bytes = to_xlsx_bytes(make_base(args.rows))
+    lista = "\n".join(cpf_ficticio(i + 1) for i in range(0, args.rows, 7))
+    body, content_type = _multipart({"lista_text": lista}, {"base": ("base.xlsx", base_bytes)})
+
+    print(f"server: base={args.rows} linhas, {args.requests} requisições, concorrência {args.concurrency}")
+    print(f"{'workers':>8} {'tempo(s)':>10} {'req/s':>8} {'escala':>8}")
+    baseline = None
+    for n in [int(w) for w in args.workers.split(',') if w.strip()]:
+        port = _free_port()
+        env = dict(os.environ, WEB_CONCURRENCY=str(n), PORT=str(port), HOST='127.0.0.1')
+        proc = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', os.path.join('backend', 'gunicorn.conf.py'),
+             '--access-logfile', '/dev/null', 'backend.wsgi:app'],
+            cwd=root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            url = f"http://127.0.0.1:{port}"
+            _wait_ready(f"{url}/api/health")
+
+            def one(_):
+                req = urllib.request.Request(f"{url}/api/preview_inativacao", data=body,
+                                             headers={'Content-Type': content_type}, method='POST')
+                with urllib.request.urlopen(req, timeout=600) as resp:
+                    resp.read()
+                    return resp.status
+
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as ex:
+                statuses = list(ex.map(one, range(args.requests)))
+            elapsed = time.perf_counter() - t0
+            if any(s != 200 for s in statuses):
+                print(f"  aviso: respostas não-200: {[s for s in statuses if s != 200][:5]}")
+            rps = args.requests / elapsed
+            baseline = baseline or rps
+            print(f"{n:>8} {elapsed:>10.2f} {rps:>8.2f} {rps / baseline:>7.2f}x")
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+
+# ----------------------------------------------------------
+# docx: extração de fichas .docx em lote
+# ----------------------------------------------------------
+_DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+_DOCX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Target="word/document.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+    '</Relationships>'
+)
+
+
+def make_ficha_docx(path: str, i: int) -> None:
+    """Ficha .docx mínima: parágrafos "RÓTULO: valor" e uma tabela | RÓTULO | valor |."""
+    def p(text):
+        return f'<w:p><w:r><w:t xml:space="preserve">{text}</w:t></w:r></w:p>'
+
+    def row(label, value):
+        return f'<w:tr><w:tc>{p(label)}</w:tc><w:tc>{p(value)}</w:tc></w:tr>'
+
+    body = "".join([
+        p("FICHA DE CADASTRO DE USUARIO"),
+        p(f"NOME COMPLETO: Usuario {i} da Silva"),
+        p(f"CPF (SEM PONTOS): {i:011d}"),
+        p(f"E-MAIL: usuario{i}@empresa.com"),
+        p("SOLICITANTE? (S/N): S"),
+        "<w:tbl>" + row("CARGO", "Analista") + row("DEPARTAMENTO", "Financeiro")
+        + row("EMPRESA (DO GRUPO)", "ACME") + row("NIVEL", "Operacional") + "</w:tbl>",
+    ])
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f'<w:body>{body}</w:body></w:document>'
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", _DOCX_CONTENT_TYPES)
+        zf.writestr("_rels/.rels", _DOCX_RELS)
+        zf.writestr("word/document.xml", document)
+
+
+def _legacy_extrair_docx(path: str) -> dict:
+    """Implementação anterior (python-docx + uma regex por rótulo), para comparação."""
+    from docx import Document
+    from backend.processor import FICHA_MAP
+
+    text = "\n".join(par.text for par in Document(path).paragraphs)
+    data = {}
+    for label, target in FICHA_MAP.items():
+        m = re.search(rf"{re.escape(label)}\s*[:\-]\s*(.+)", text, flags=re.IGNORECASE)
+        if m:
+            data[target] = m.group(1).strip()
+    return data
+
+
+def bench_docx(args) -> None:
+    from backend.processor import extrair_docx
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_docx_")
+    try:
+        paths = []
+        for i in range(args.fichas):
+            path = os.path.join(tmpdir, f"ficha_{i}.docx")
+            make_ficha_docx(path, i)
+            paths.append(path)
+
+        candidates = [("streaming", extrair_docx)]
+        try:
+            import docx  # noqa: F401
+            candidates.insert(0, ("python-docx", _legacy_extrair_docx))
+        except ImportError:
+            print("python-docx não instalado; comparando apenas o parser atual")
+
+        print(f"docx: {args.fichas} fichas")
+        print(f"{'parser':>12} {'tempo(s)':>10} {'fichas/s':>10} {'campos':>8}")
+        for name, fn in candidates:
+            t0 = time.perf_counter()
+            fields = sum(len(fn(path)) for path in paths)
+            elapsed = time.perf_counter() - t0
+            print(f"{name:>12} {elapsed:>10.2f} {args.fichas / elapsed:>10.0f} {fields:>8}")
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def bench_memory(args) -> None:
+    from backend.processor import processar_inativacao_from_paths
+    from backend.readers import compactar_frame, memoria_frame
+
+    base = make_base(args.rows)
+    lista = pd.DataFrame({"CPF": base["CPF"].iloc[::50].tolist()})
+    variants = [
+        ("object", base.astype(object)),
+        ("str", base.astype(str)),
+        ("compacto", compactar_frame(base.astype(str))),
+    ]
+
+    print(f"memory: {args.rows} linhas, {len(lista)} CPFs na lista")
+    print(f"{'formato':>10} {'MB':>8} {'bytes/linha':>12} {'inativacao(s)':>14} {'pico MB':>8} {'saida':>7}")
+    for name, df in variants:
+        mb = memoria_frame(df) / 1e6
+        t0 = time.perf_counter()
+        out_df, _ = processar_inativacao_from_paths(df, lista)
+        elapsed = time.perf_counter() - t0
+        pico = _pico_alocado(processar_inativacao_from_paths, df, lista)
+        print(f"{name:>10} {mb:>8.1f} {mb * 1e6 / args.rows:>12.0f} {elapsed:>14.2f} {pico:>8.1f} {len(out_df):>7}")
+
+
+def _legacy_buscar(df_base: pd.DataFrame, raw_items: list) -> dict:
+    """Implementação anterior de /api/inativacao/buscar (listas + iterrows), para comparação."""
+    from backend.schema import resolve_columns
+    from backend.utils import upper_no_accents
+
+    cpfs_digits = [re.sub(r"\D", "", x) for x in raw_items]
+    valid_cpfs = [x for x in cpfs_digits if len(x) == 11]
+    email_pat = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$", re.IGNORECASE)
+    valid_emails = [x for x in raw_items if email_pat.match(x) and re.sub(r"\D", "", x) not in valid_cpfs]
+
+    def is_valid_fullname(s: str) -> bool:
+        s = upper_no_accents(str(s)).strip()
+        parts = s.split()
+        return len(parts) >= 2 and len(s) >= 3
+
+    valid_names_raw = [x for x in raw_items if re.sub(r"\D", "", x) not in valid_cpfs
+                       and x not in valid_emails and is_valid_fullname(x)]
+    valid_names_norm = [upper_no_accents(x).strip() for x in valid_names_raw]
+
+    seen = set()
+    duplicates = []
+    for c in valid_cpfs:
+        if c in seen and c not in duplicates:
+            duplicates.append(c)
+        seen.add(c)
+
+    schema = resolve_columns(df_base.columns, "base")
+    cpf_col, nome_col, email_col, status_col, userid_col = (
+        schema.get(f) for f in ("cpf", "nome_completo", "email", "status", "user_id"))
+    df_base = df_base.copy()
+    df_base['CPFdigits'] = df_base[cpf_col].apply(lambda v: re.sub(r"\D", "", str(v))) if cpf_col else ""
+    df_base['NomeNorm'] = df_base[nome_col].apply(lambda v: upper_no_accents(str(v)).strip()) if nome_col else ""
+
+    def item(row, cpf, email):
+        return {
+            "id": str(row.get(userid_col, "")) if userid_col and row.get(userid_col, "") != "" else None,
+            "nome": str(row.get(nome_col, "")) if nome_col else str(row.get('NomeCompleto', "")),
+            "cpf": cpf,
+            "email": email,
+            "status_atual": str(row.get(status_col, "")) if status_col else str(row.get('Status', "")),
+            "found": True,
+        }
+
+    def row_email(row):
+        return str(row.get(email_col, "")) if email_col else str(row.get('Email', ""))
+
+    results, found_cpfs, found_emails, found_name_norms = [], set(), set(), set()
+    if valid_cpfs and cpf_col:
+        for _, row in df_base[df_base['CPFdigits'].isin(valid_cpfs)].iterrows():
+            found_cpfs.add(row['CPFdigits'])
+            results.append(item(row, row['CPFdigits'], row_email(row)))
+    if valid_names_norm and nome_col:
+        for _, row in df_base[df_base['NomeNorm'].isin(valid_names_norm)].iterrows():
+            found_name_norms.add(row['NomeNorm'])
+            if row['CPFdigits'] and row['CPFdigits'] in found_cpfs:
+                continue
+            results.append(item(row, row['CPFdigits'], row_email(row)))
+    if valid_emails and email_col:
+        base_email_norm = df_base[email_col].astype(str).fillna('').str.strip().str.lower()
+        target = [e.strip().lower() for e in valid_emails]
+        for _, row in df_base[base_email_norm.isin(target)].iterrows():
+            email_val = str(row.get(email_col, '')).strip()
+            found_emails.add(email_val.lower())
+            results.append(item(row, str(row['CPFdigits']), email_val))
+
+    missing = {"id": None, "nome": "", "cpf": "", "email": "", "status_atual": "Não localizado", "found": False}
+    not_found_cpfs = [c for c in valid_cpfs if c not in found_cpfs]
+    results += [dict(missing, cpf=c) for c in not_found_cpfs]
+    results += [dict(missing, nome=n) for n in valid_names_norm if n not in found_name_norms]
+    not_found_emails = [e for e in valid_emails if e.strip().lower() not in found_emails]
+    results += [dict(missing, email=e) for e in not_found_emails]
+    results = sorted(results, key=lambda it: (0 if it.get('found') else 1, it.get('nome') or '', it.get('cpf') or ''))
+    return {"items": results, "total": len(results), "duplicates": duplicates,
+            "not_found": not_found_cpfs + valid_names_raw + not_found_emails}
+
+
+def make_buscar_items(base: pd.DataFrame, n: int) -> list:
+    """Itens colados pelo operador: CPFs (com e sem máscara), e-mails, nomes, repetidos e inexistentes."""
+    rows = len(base)
+    items = []
+    for i in range(n):
+        j = (i * 7919) % rows
+        kind = i % 6
+        if kind == 0:
+            items.append(base["CPF"].iat[j])
+        elif kind == 1:
+            c = base["CPF"].iat[j]
+            items.append(f"{c[:3]}.{c[3:6]}.{c[6:9]}-{c[9:]}")
+        elif kind == 2:
+            items.append(base["Email"].iat[j].upper())
+        elif kind == 3:
+            items.append(base["NomeCompleto"].iat[j].lower())
+        elif kind == 4:
+            items.append(cpf_ficticio(900000000 + i) if i % 4 else f"Pessoa Inexistente {i}")
+        else:
+            items.append(items[i // 2] if i % 4 else f"naoexiste{i}@empresa.com")
+    return items
+
+
+def bench_buscar(args) -> None:
+    from backend.processor import buscar_itens
+
+    base = make_base(args.rows)
+    items = make_buscar_items(base, args.items)
+    print(f"buscar: base de {args.rows} linhas, {args.items} itens")
+    print(f"{'versao':>10} {'tempo(s)':>10} {'itens/s':>10} {'resultados':>11}")
+    outputs = {}
+    for name, fn in (("anterior", _legacy_buscar), ("vetorizada", buscar_itens)):
+        t0 = time.perf_counter()
+        outputs[name] = fn(base, items)
+        elapsed = time.perf_counter() - t0
+        print(f"{name:>10} {elapsed:>10.2f} {args.items / elapsed:>10.0f} {outputs[name]['total']:>11}")
+    atual = {k: v for k, v in outputs["vetorizada"].items() if k != "invalid_cpfs"}
+    print("resultados idênticos:", outputs["anterior"] == atual)
+
+
+def bench_leitura(args) -> None:
+    from backend.processor import (colunas_base_inativacao, colunas_chave_base, filtro_base_ativa,
+                                   processar_inativacao_from_paths)
+    from backend.readers import ler_planilha, ler_planilha_filtrada, memoria_frame
+
+    base = make_base(args.rows)
+    n_inativos = int(args.rows * args.inativos)
+    base["Status"] = ["INATIVO" if i < n_inativos else "ATIVO" for i in range(args.rows)]
+    for i in range(args.extras):
+        base[f"Observacao {i}"] = [f"obs {i} {j % 97}" for j in range(args.rows)]
+    lista = pd.DataFrame({"CPF": base["CPF"].iloc[::50].tolist()})
+    tmpdir = tempfile.mkdtemp(prefix="bench_leitura_")
+    try:
+        path = os.path.join(tmpdir, "base.xlsx")
+        with open(path, "wb") as f:
+            f.write(to_xlsx_bytes(base))
+
+        def completa():
+            return ler_planilha(path, compacto=True), None
+
+        def filtrada():
+            return ler_planilha_filtrada(path, filtro=filtro_base_ativa, colunas=colunas_base_inativacao,
+                                         colunas_ignoradas=colunas_chave_base, compacto=True)
+
+        print(f"leitura: {args.rows} linhas ({args.inativos:.0%} inativas), {len(base.columns)} colunas, "
+              f"{len(lista)} CPFs na lista")
+        print(f"{'leitura':>10} {'ler(s)':>8} {'total(s)':>9} {'linhas':>8} {'colunas':>8} {'MB':>7} {'saida':>7} "
+              f"{'inativos':>9}")
+        outputs = {}
+        for name, read in (("completa", completa), ("filtrada", filtrada)):
+            t0 = time.perf_counter()
+            df, ignorados = read()
+            t_read = time.perf_counter() - t0
+            out_df, stats = processar_inativacao_from_paths(df, lista, df_ignorados=ignorados)
+            elapsed = time.perf_counter() - t0
+            outputs[name] = out_df
+            print(f"{name:>10} {t_read:>8.2f} {elapsed:>9.2f} {len(df):>8} {len(df.columns):>8} "
+                  f"{memoria_frame(df) / 1e6:>7.1f} {len(out_df):>7} {stats['inativos']['total']:>9}")
+        print("saídas idênticas:", outputs["completa"].equals(outputs["filtrada"]))
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def bench_formatos(args) -> None:
+    import gzip
+
+    from backend.processor import (colunas_base_inativacao, colunas_chave_base, filtro_base_ativa,
+                                   processar_inativacao_from_paths)
+    from backend.readers import ler_planilha_filtrada
+
+    base = make_base(args.rows)
+    lista = pd.DataFrame({"CPF": base["CPF"].iloc[::50].tolist()})
+    csv_bytes = base.to_csv(index=False, sep=";").encode("utf-8-sig")
+    arquivos = {
+        "base.xlsx": to_xlsx_bytes(base),
+        "base.csv": csv_bytes,
+        "base.tsv": base.to_csv(index=False, sep="\t").encode("utf-8"),
+        "base.csv.gz": gzip.compress(csv_bytes, compresslevel=6),
+        "base.parquet": base.to_parquet(index=False),
+    }
+    tmpdir = tempfile.mkdtemp(prefix="bench_formatos_")
+    try:
+        print(f"formatos: {args.rows} linhas, {len(base.columns)} colunas, leitura filtrada da inativação")
+        print(f"{'arquivo':>13} {'MB':>7} {'ler(s)':>8} {'linhas':>8} {'iguais':>7}")
+        ref = None
+        for nome, raw in arquivos.items():
+            path = os.path.join(tmpdir, nome)
+            with open(path, "wb") as f:
+                f.write(raw)
+            t0 = time.perf_counter()
+            df, ignorados = ler_planilha_filtrada(path, filtro=filtro_base_ativa, colunas=colunas_base_inativacao,
+                                                  colunas_ignoradas=colunas_chave_base, compacto=True)
+            elapsed = time.perf_counter() - t0
+            out_df, _ = processar_inativacao_from_paths(df, lista, df_ignorados=ignorados)
+            ref = out_df if ref is None else ref
+            print(f"{nome:>13} {len(raw) / 1e6:>7.1f} {elapsed:>8.2f} {len(df):>8} {str(out_df.equals(ref)):>7}")
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def bench_validacao(args) -> None:
+    from backend.processor import processar_registros_from_files, validar_registros_from_files
+
+    base = make_base(args.rows)[["CPF", "NomeCompleto", "Email", "Solicitante"]].rename(
+        columns={"Solicitante": "SOLICITANTE? (S/N)"})
+    # 1 a cada 50 registros com CPF inválido
+    base.loc[base.index % 50 == 7, "CPF"] = "123"
+    tmpdir = tempfile.mkdtemp(prefix="bench_validacao_")
+    path = os.path.join(tmpdir, "cadastro.csv")
+    base.to_csv(path, index=False, sep=";")
+    try:
+        print(f"validacao: {args.rows} registros de cadastro (CSV)")
+        print(f"{'modo':>22} {'1º erro(s)':>11} {'total(s)':>9} {'com erro':>9}")
+        t0 = time.perf_counter()
+        errors, _ = processar_registros_from_files([path], login_choice="CPF", fluxo="SELF")
+        print(f"{'processar (planilha)':>22} {'-':>11} {time.perf_counter() - t0:>9.2f} {len(errors):>9}")
+        for rotulo, max_erros in (("validar", None), (f"validar max_erros={args.max_erros}", args.max_erros)):
+            t0 = time.perf_counter()
+            primeiro = None
+            resumo = {}
+            for evento in validar_registros_from_files([path], login_choice="CPF", fluxo="SELF",
+                                                       max_erros=max_erros):
+                if evento["tipo"] == "erro" and primeiro is None:
+                    primeiro = time.perf_counter() - t0
+                resumo = evento
+            print(f"{rotulo:>22} {primeiro or 0:>11.2f} {time.perf_counter() - t0:>9.2f} {resumo['com_erro']:>9}")
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def _cpf_valido_python(cpf: str) -> bool:
+    """Validação linha a linha em Python puro (referência do benchmark `cpf`)."""
+    if len(cpf) != 11 or not cpf.isdigit() or len(set(cpf)) == 1:
+        return False
+    return cpf_ficticio(int(cpf[:9])) == cpf
+
+
+def bench_cpf(args) -> None:
+    import numpy as np
+    from backend.utils import cpf_validos
+
+    rng = np.random.default_rng(0)
+    cpfs = [cpf_ficticio(int(n)) for n in rng.integers(1, 10 ** 9, args.cpfs // 10)]
+    cpfs += [f"{int(n):011d}" for n in rng.integers(0, 10 ** 11, args.cpfs - len(cpfs))]
+    print(f"cpf: {len(cpfs)} CPFs (10% válidos)")
+    print(f"{'versao':>10} {'tempo(s)':>10} {'CPFs/s':>12} {'validos':>9}")
+    outputs = {}
+    for name, fn in (("python", lambda v: [_cpf_valido_python(c) for c in v]), ("lote", cpf_validos)):
+        t0 = time.perf_counter()
+        outputs[name] = np.asarray(fn(cpfs), dtype=bool)
+        elapsed = time.perf_counter() - t0
+        print(f"{name:>10} {elapsed:>10.2f} {len(cpfs) / elapsed:>12.0f} {int(outputs[name].sum()):>9}")
+    print("resultados idênticos:", bool((outputs["python"] == outputs["lote"]).all()))
+
+
+def bench_indice(args) -> None:
+    from backend.processor import buscar_itens, buscar_itens_indice
+    from backend.user_index import UserIndexStore
+    from backend.utils import limpar_cpf_raw
+
+    df = make_base(args.rows)
+    step = max(1, args.rows // args.items)
+    itens = [cpf_ficticio(i + 1) for i in range(0, args.rows, step)][:args.items]
+    itens += [f"Usuario {i} Teste" for i in range(0, args.rows, step * 10)]
+    itens += [f"usuario{i}@empresa.com" for i in range(0, args.rows, step * 10)]
+    alvo = cpf_ficticio(args.rows // 2 + 1)
+    folder = tempfile.mkdtemp()
+    try:
+        store = UserIndexStore(folder=folder)
+        t0 = time.perf_counter()
+        indice = store.construir("0" * 64, df)
+        construir = time.perf_counter() - t0
+        print(f"indice: {args.rows} linhas, {len(itens)} itens; construção {construir:.2f}s, "
+              f"{os.path.getsize(indice.path) / 1e6:.1f} MB")
+        print(f"{'consulta':>10} {'pandas(s)':>10} {'indice(s)':>10} {'iguais':>7}")
+
+        def aprovador_pandas():
+            hits = df[df["CPF"].map(limpar_cpf_raw) == alvo]
+            return hits.iloc[0].to_dict() if not hits.empty else None
+
+        for name, legado, novo in (
+            ("buscar", lambda: buscar_itens(df, itens), lambda: buscar_itens_indice(indice, itens)),
+            ("aprovador", aprovador_pandas, lambda: indice.registro_por_cpf(alvo)),
+        ):
+            t0 = time.perf_counter()
+            ref = legado()
+            t_legado = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            got = novo()
+            t_novo = time.perf_counter() - t0
+            print(f"{name:>10} {t_legado:>10.3f} {t_novo:>10.3f} {str(ref == got):>7}")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def bench_estaticos(args) -> None:
+    from flask import Flask, send_from_directory
+
+    from backend.core.config import settings
+    from backend.static_assets import AssetManifest, asset_response, brotli
+
+    t0 = time.perf_counter()
+    manifest = AssetManifest(settings.FRONTEND_DIR)
+    print(f"estaticos: manifesto em {time.perf_counter() - t0:.2f}s (brotli {'sim' if brotli else 'não'})")
+
+    legado = Flask("legado", static_folder=settings.FRONTEND_STATIC_DIR, static_url_path="/static")
+    novo = Flask("novo", static_folder=None)
+
+    @legado.route("/<path:path>")
+    def servir_legado(path):
+        return send_from_directory(settings.FRONTEND_DIR, path)
+
+    @novo.route("/<path:path>")
+    def servir_novo(path):
+        return asset_response(*manifest.get(path))
+
+    arquivos = ["index.html", "static/js/app.v2.js", "static/css/custom.css", "static/css/animations.css",
+                "static/js/uploads.js", "static/js/inativacao/index.js"]
+    headers = {"Accept-Encoding": "gzip, deflate, br"}
+    print(f"{'arquivo':>30} {'bytes':>8} {'gzip':>8} {'br':>8}")
+    total = {"bytes": 0, "gzip": 0, "br": 0}
+    for path in arquivos:
+        asset = manifest.get(path)[0]
+        tamanhos = {"bytes": len(asset.body)}
+        for enc in ("gzip", "br"):
+            tamanhos[enc] = len(asset.variantes.get(enc, asset.body))
+        for k in total:
+            total[k] += tamanhos[k]
+        print(f"{path:>30} {tamanhos['bytes']:>8} {tamanhos['gzip']:>8} {tamanhos['br']:>8}")
+    print(f"{'total':>30} {total['bytes']:>8} {total['gzip']:>8} {total['br']:>8}")
+
+    print(f"{'servidor':>10} {'req/s':>10} {'bytes/req':>10}")
+    for name, app, extra in (("legado", legado, {}), ("manifesto", novo, {}),
+                             ("304", novo, {"If-None-Match": None})):
+        with app.test_client() as client:
+            url = "/static/js/app.v2.js" if name == "legado" else "/" + manifest.url("static/js/app.v2.js")
+            hdrs = dict(headers)
+            if "If-None-Match" in extra:
+                hdrs["If-None-Match"] = client.get(url, headers=headers).headers["ETag"]
+            t0 = time.perf_counter()
+            size = 0
+            for _ in range(args.requests):
+                size += len(client.get(url, headers=hdrs).data)
+            elapsed = time.perf_counter() - t0
+        print(f"{name:>10} {args.requests / elapsed:>10.0f} {size / args.requests:>10.0f}")
+
+
+def _legacy_saida(matched: pd.DataFrame, schema) -> pd.DataFrame:
+    """Montagem coluna a coluna sobre um frame de NaN (referência do benchmark `saida`)."""
+    from backend.processor import MODEL_COLS, extract_digits_only
+
+    out_df = pd.DataFrame(index=range(len(matched)), columns=MODEL_COLS)
+    out_df["Operacao"] = "DELETE"
+
+    def pick(field):
+        col = schema.get(field)
+        if col and col in matched.columns:
+            return matched[col].values
+        return [""] * len(matched)
+
+    for target, field in (("UserId", "user_id"), ("Login", "login"), ("NomeCompleto", "nome_completo"),
+                          ("Nome", "nome"), ("SobreNome", "sobrenome"), ("Email", "email"),
+                          ("Telefone", "telefone"), ("Cargo", "cargo"), ("Departamento", "departamento"),
+                          ("Nivel", "nivel"), ("NomeEmpresa", "empresa"), ("CodigoCCustoEmpresa", "codigo_ccusto"),
+                          ("DescricaoCCustoEmpresa", "centro_custo"),
+                          ("ViajanteMasterNacional", "viajante_master_nacional"),
+                          ("ViajanteMasterInternacional", "viajante_master_internacional"),
+                          ("Terceiro", "terceiro")):
+        out_df[target] = pick(field)
+    out_df["EmpresaCCustoParaUsuario"] = "S"
+    out_df["CodigoIntegracao"] = "AUT"
+    out_df["Status"] = ""
+    for c in ["Endereco", "Cidade", "Estado", "CEP"]:
+        out_df[c] = ""
+    bool_map = {"SIM": "S", "NAO": "N", "NÃO": "N", "S": "S", "N": "N", "TRUE": "S", "FALSE": "N"}
+    for target, field in (("Solicitante", "solicitante"), ("Vip", "vip"), ("SolicitanteMaster", "solicitante_master"),
+                          ("MasterAdiantamento", "master_adiantamento"), ("MasterReembolso", "master_reembolso")):
+        out_df[target] = "N"
+        col = schema.get(field)
+        if col and col in matched.columns:
+            vals = matched[col].fillna("").astype(str).str.strip().str.upper().map(lambda x: bool_map.get(x, "N"))
+            out_df[target] = vals.values
+    out_df["NroMatricula"] = [extract_digits_only(v) for v in pick("matricula")]
+    out_df = out_df[MODEL_COLS]
+    for col in out_df.columns:
+        if pd.api.types.is_object_dtype(out_df[col]) or pd.api.types.is_string_dtype(out_df[col]):
+            out_df[col] = out_df[col].fillna("").astype(str).str.strip().str.upper()
+    return out_df
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+
+def _medir_em_filho(fn, *args):
+    """(segundos, pico de memória adicional em MB, retorno) de `fn` num processo filho (fork, Linux)."""
+    import multiprocessing
+    import resource
+
+    def alvo(conn):
+        antes = _rss_mb()
+        t0 = time.perf_counter()
+        resultado = fn(*args)
+        elapsed = time.perf_counter() - t0
+        conn.send((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3 - antes, resultado))
+
+    ctx = multiprocessing.get_context("fork")
+    parent, child = ctx.Pipe()
+    proc = ctx.Process(target=alvo, args=(child,))
+    proc.start()
+    result = parent.recv()
+    proc.join()
+    return result
+
+
+def _pico_alocado(fn, *args) -> float:
+    """Pico de memória alocada por `fn`, em MB: heap do Python/NumPy (tracemalloc) + pool do Arrow.
+
+    Mais estável que o RSS: não conta as páginas do chamador que `fn` só lê.
+    """
+    import threading
+    import tracemalloc
+
+    import pyarrow as pa
+
+    base_arrow = pa.total_allocated_bytes()
+    pico_arrow = [0]
+    parar = threading.Event()
+
+    def amostrar():
+        while not parar.wait(0.002):
+            pico_arrow[0] = max(pico_arrow[0], pa.total_allocated_bytes() - base_arrow)
+
+    amostrador = threading.Thread(target=amostrar, daemon=True)
+    tracemalloc.start()
+    amostrador.start()
+    try:
+        fn(*args)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        parar.set()
+        amostrador.join()
+        tracemalloc.stop()
+    return (pico + pico_arrow[0]) / 1e6
+
+
+def bench_saida(args) -> None:
+    from backend.processor import montar_saida, plano_inativacao
+    from backend.schema import resolve_columns
+
+    matched = make_base(args.rows)
+    matched["Vip"] = ["Sim" if i % 7 else "não" for i in range(args.rows)]
+    matched["Terceiro"] = ["N" if i % 4 else "123" for i in range(args.rows)]
+    matched["Matricula"] = [f"M-{i:06d}" for i in range(args.rows)]
+    schema = resolve_columns(matched.columns, "base")
+    constantes = {"Operacao": "DELETE", "EmpresaCCustoParaUsuario": "S", "CodigoIntegracao": "AUT",
+                  "Solicitante": "N", "Vip": "N", "SolicitanteMaster": "N", "MasterAdiantamento": "N",
+                  "MasterReembolso": "N"}
+    variantes = (
+        ("colunas", lambda: _legacy_saida(matched, schema)),
+        ("plano", lambda: montar_saida(matched, plano_inativacao(schema), constantes)),
+    )
+    print(f"saida: ficha de inativação com {args.rows} linhas")
+    print(f"{'montagem':>10} {'tempo(s)':>10} {'pico MB':>9}")
+    for name, fn in variantes:
+        elapsed, pico, _ = _medir_em_filho(fn)
+        print(f"{name:>10} {elapsed:>10.2f} {pico:>9.1f}")
+    iguais = variantes[0][1]().astype(object).equals(variantes[1][1]().astype(object))
+    print("saídas idênticas:", iguais)
+
+
+def projetar_base(xlsx_path: str) -> bytes:
+    """TSV gzip com as colunas usadas na inativação, como o worker do navegador gera
+    (static/js/inativacao/worker.js + /api/inativacao/colunas)."""
+    import csv
+    import gzip
+
+    import openpyxl
+
+    from backend.processor import projecao_base_inativacao
+    from backend.readers import HEADER_SAMPLE_ROWS, _texto_celula
+
+    wb = openpyxl.load_workbook(xlsx_path, read_only=True)
+    try:
+        matriz = [[_texto_celula(v) for v in row] for row in wb.worksheets[0].iter_rows(values_only=True)
+                  if any(v is not None and v != "" for v in row)]
+    finally:
+        wb.close()
+    plano = projecao_base_inativacao(matriz[:HEADER_SAMPLE_ROWS])
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter="\t", lineterminator="\n")
+    writer.writerow(plano["colunas"])
+    writer.writerows([row[pos] if pos < len(row) else "" for pos in plano["posicoes"]]
+                     for row in matriz[plano["linha_cabecalho"] + 1:])
+    return gzip.compress(buf.getvalue().encode("utf-8"))
+
+
+def bench_projecao(args) -> None:
+    from backend.processor import (colunas_base_inativacao, colunas_chave_base, filtro_base_ativa,
+                                   processar_inativacao_from_paths)
+    from backend.readers import ler_abas
+
+    base = make_base(args.rows)
+    for i in range(args.extra_cols):
+        base[f"Campo Extra {i}"] = [f"valor {i}-{j % 97}" for j in range(args.rows)]
+    lista = pd.DataFrame({"CPF": base["CPF"].iloc[::50].tolist()})
+    tmpdir = tempfile.mkdtemp(prefix="bench_projecao_")
+    try:
+        xlsx_path = os.path.join(tmpdir, "base.xlsx")
+        with open(xlsx_path, "wb") as f:
+            f.write(to_xlsx_bytes(base))
+        t0 = time.perf_counter()
+        projetado = projetar_base(xlsx_path)
+        t_projecao = time.perf_counter() - t0
+        tsv_path = os.path.join(tmpdir, "base.tsv.gz")
+        with open(tsv_path, "wb") as f:
+            f.write(projetado)
+
+        print(f"projecao: base de {args.rows} linhas e {len(base.columns)} colunas; "
+              f"projeção (openpyxl, no lugar do SheetJS) {t_projecao:.2f}s")
+        print(f"{'upload':>12} {'MB':>7} {'ler(s)':>8} {'iguais':>7}")
+        ref = None
+        for nome, path in (("base.xlsx", xlsx_path), ("base.tsv.gz", tsv_path)):
+            t0 = time.perf_counter()
+            df, ignorados, _ = ler_abas(path, None, filtro=filtro_base_ativa, colunas=colunas_base_inativacao,
+                                        colunas_ignoradas=colunas_chave_base, compacto=True)
+            elapsed = time.perf_counter() - t0
+            out_df, _ = processar_inativacao_from_paths(df, lista, df_ignorados=ignorados)
+            ref = out_df if ref is None else ref
+            print(f"{nome:>12} {os.path.getsize(path) / 1e6:>7.1f} {elapsed:>8.2f} {str(out_df.equals(ref)):>7}")
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def bench_abas(args) -> None:
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+
+    from backend import readers
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_abas_")
+    try:
+        path = os.path.join(tmpdir, "base.xlsx")
+        with pd.ExcelWriter(path) as writer:
+            for i in range(args.sheets):
+                make_base(args.rows).to_excel(writer, sheet_name=f"Empresa {i + 1}", index=False)
+        nomes = readers.listar_abas(path)
+        leituras = [(path, nome, None, None, None) for nome in nomes]
+
+        def sequencial():
+            return [readers._ler_aba(*a) for a in leituras]
+
+        def pool_por_requisicao():
+            # implementação anterior: um pool criado e desfeito a cada requisição
+            with ProcessPoolExecutor(max_workers=args.workers,
+                                     mp_context=multiprocessing.get_context("forkserver")) as pool:
+                return list(pool.map(readers._ler_aba, *zip(*leituras)))
+
+        def pool_reaproveitado():
+            readers._max_workers_abas = lambda: args.workers
+            return readers.ler_abas(path, "*")
+
+        def configurado():
+            return readers.ler_abas(path, "*")
+
+        def duas_requisicoes(fn):
+            tempos = []
+            for _ in range(2):
+                t0 = time.perf_counter()
+                fn()
+                tempos.append(time.perf_counter() - t0)
+            # o filho sai sem os atexit do concurrent.futures: o pool é encerrado aqui
+            readers._descartar_pool_abas()
+            return tempos
+
+        print(f"abas: {args.sheets} abas de {args.rows} linhas; pool com {args.workers} processos; "
+              f"{os.cpu_count()} CPU(s) (ler_abas usa até {readers._max_workers_abas()} processos aqui)")
+        print(f"{'leitura':>22} {'1a req(s)':>10} {'2a req(s)':>10}")
+        variantes = (("sequencial", sequencial), ("pool por requisição", pool_por_requisicao),
+                     ("pool reaproveitado", pool_reaproveitado), ("ler_abas (padrão)", configurado))
+        for nome, fn in variantes:
+            # cada variante num processo novo (o forkserver e o pool são iniciados uma vez por processo)
+            _, _, (t1, t2) = _medir_em_filho(duas_requisicoes, fn)
+            print(f"{nome:>22} {t1:>10.2f} {t2:>10.2f}")
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def bench_partes(args) -> None:
+    from backend.api.cadastro import _xlsx_parte
+    from backend.output_parts import zip_partes
+    from backend.processor import MODEL_COLS
+
+    base = make_base(args.rows)
+    saida = pd.DataFrame({col: base[col] if col in base.columns else "N" for col in MODEL_COLS})
+
+    def unico():
+        return len(_xlsx_parte(saida, "Cadastro")), None
+
+    def em_partes(formato):
+        t0 = time.perf_counter()
+        tamanho, primeiro = 0, None
+        for bloco in zip_partes([("saida", saida, "Cadastro")], args.max_rows, formato, _xlsx_parte):
+            primeiro = time.perf_counter() - t0 if primeiro is None else primeiro
+            tamanho += len(bloco)
+        return tamanho, primeiro
+
+    variantes = (
+        ("xlsx único", unico),
+        (f"zip xlsx {args.max_rows}", lambda: em_partes("xlsx")),
+        (f"zip csv {args.max_rows}", lambda: em_partes("csv")),
+    )
+    print(f"partes: saída de {args.rows} linhas ({len(MODEL_COLS)} colunas)")
+    print(f"{'saída':>16} {'1º bloco(s)':>12} {'total(s)':>9} {'pico MB':>8} {'MB':>6}")
+    for name, fn in variantes:
+        elapsed, pico, (tamanho, primeiro) = _medir_em_filho(fn)
+        primeiro = "-" if primeiro is None else f"{primeiro:.2f}"
+        print(f"{name:>16} {primeiro:>12} {elapsed:>9.2f} {pico:>8.1f} {tamanho / 1e6:>6.1f}")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks do backend ProcessData")
+    sub = parser.add_subparsers(dest='bench', required=True)
+
+    p = sub.add_parser('server', help='vazão de /api/preview_inativacao por número de workers')
+    p.add_argument('--workers', default='1,2,4')
+    p.add_argument('--rows', type=int, default=5000)
+    p.add_argument('--requests', type=int, default=24)
+    p.add_argument('--concurrency', type=int, default=8)
+    p.set_defaults(func=bench_server)
+
+    p = sub.add_parser('docx', help='extração de fichas .docx em lote')
+    p.add_argument('--fichas', type=int, default=1000)
+    p.set_defaults(func=bench_docx)
+
+    p = sub.add_parser('memory', help='memória e tempo de inativação por formato da base em memória')
+    p.add_argument('--rows', type=int, default=300000)
+    p.set_defaults(func=bench_memory)
+
+    p = sub.add_parser('buscar', help='busca em lote de /api/inativacao/buscar')
+    p.add_argument('--rows', type=int, default=100000)
+    p.add_argument('--items', type=int, default=50000)
+    p.set_defaults(func=bench_buscar)
+
+    p = sub.add_parser('leitura', help='leitura da base de inativação com filtro de linhas e colunas')
+    p.add_argument('--rows', type=int, default=100000)
+    p.add_argument('--inativos', type=float, default=0.8)
+    p.add_argument('--extras', type=int, default=10)
+    p.set_defaults(func=bench_leitura)
+
+    p = sub.add_parser('cpf', help='validação dos dígitos verificadores de CPF em lote')
+    p.add_argument('--cpfs', type=int, default=2000000)
+    p.set_defaults(func=bench_cpf)
+
+    p = sub.add_parser('saida', help='montagem da ficha de saída da inativação')
+    p.add_argument('--rows', type=int, default=100000)
+    p.set_defaults(func=bench_saida)
+
+    p = sub.add_parser('indice', help='consultas pontuais no índice SQLite da base x pandas')
+    p.add_argument('--rows', type=int, default=300000)
+    p.add_argument('--items', type=int, default=1000)
+    p.set_defaults(func=bench_indice)
+
+    p = sub.add_parser('estaticos', help='arquivos do frontend: compressão, ETag/304 e requisições/s')
+    p.add_argument('--requests', type=int, default=2000)
+    p.set_defaults(func=bench_estaticos)
+
+    p = sub.add_parser('formatos', help='leitura da base em XLSX, CSV, TSV, CSV gzip e Parquet')
+    p.add_argument('--rows', type=int, default=100000)
+    p.set_defaults(func=bench_formatos)
+
+    p = sub.add_parser('validacao', help='validação do cadastro em NDJSON x processamento completo')
+    p.add_argument('--rows', type=int, default=100000)
+    p.add_argument('--max-erros', type=int, default=100)
+    p.set_defaults(func=bench_validacao)
+
+    p = sub.add_parser('partes', help='saída inteira em um XLSX x partes num ZIP em streaming')
+    p.add_argument('--rows', type=int, default=200000)
+    p.add_argument('--max-rows', type=int, default=50000)
+    p.set_defaults(func=bench_partes)
+
+    p = sub.add_parser('abas', help='leitura de várias abas: sequencial x pool por requisição x pool reaproveitado')
+    p.add_argument('--sheets', type=int, default=4)
+    p.add_argument('--rows', type=int, default=20000)
+    p.add_argument('--workers', type=int, default=4)
+    p.set_defaults(func=bench_abas)
+
+    p = sub.add_parser('projecao', help='base projetada no navegador (TSV gzip) x planilha inteira')
+    p.add_argument('--rows', type=int, default=100000)
+    p.add_argument('--extra-cols', type=int, default=30)
+    p.set_defaults(func=bench_projecao)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -14,13 +14,72 @@ class Settings:
     UPLOAD_FOLDER: str = os.path.join(BACKEND_DIR, 'tmp_uploads')
     MAX_CONTENT_LENGTH: int = 16 * 1024 * 1024
 
+    # Uploads em blocos, acima de MAX_CONTENT_LENGTH (ver backend/uploads.py)
+    CHUNKED_UPLOAD_FOLDER: str = os.getenv('CHUNKED_UPLOAD_FOLDER', os.path.join(BACKEND_DIR, 'tmp_uploads', 'chunked'))
+    CHUNKED_UPLOAD_MAX_MB: int = int(os.getenv('CHUNKED_UPLOAD_MAX_MB', '512'))
+    CHUNKED_UPLOAD_CHUNK_MB: int = int(os.getenv('CHUNKED_UPLOAD_CHUNK_MB', '8'))
+    CHUNKED_UPLOAD_TTL: int = int(os.getenv('CHUNKED_UPLOAD_TTL', '86400'))
+
+    # Versões de bases de clientes (diff incremental)
+    BASES_FOLDER: str = os.getenv('BASES_FOLDER', os.path.join(BACKEND_DIR, 'bases_store'))
+    BASE_VERSIONS_KEEP: int = int(os.getenv('BASE_VERSIONS_KEEP', '10'))
+    # Última versão de cada cliente carregada no master antes do fork (0 desativa)
+    BASE_PRELOAD_MAX_MB: int = int(os.getenv('BASE_PRELOAD_MAX_MB', '256'))
+
+    # Cache em disco das saídas de inativação/aprovação (ver backend/result_cache.py)
+    RESULT_CACHE_ENABLED: bool = os.getenv('RESULT_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    RESULT_CACHE_FOLDER: str = os.getenv('RESULT_CACHE_FOLDER', os.path.join(BACKEND_DIR, 'result_cache'))
+    RESULT_CACHE_MAX_MB: int = int(os.getenv('RESULT_CACHE_MAX_MB', '256'))
+    RESULT_CACHE_TTL: int = int(os.getenv('RESULT_CACHE_TTL', '3600'))
+
+    # Índice SQLite das bases para buscas pontuais (ver backend/user_index.py)
+    USER_INDEX_ENABLED: bool = os.getenv('USER_INDEX_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    USER_INDEX_FOLDER: str = os.getenv('USER_INDEX_FOLDER', os.path.join(BACKEND_DIR, 'user_index'))
+    USER_INDEX_KEEP: int = int(os.getenv('USER_INDEX_KEEP', '20'))
+
+    # Planilhas perfiladas no servidor (aba Análise, ver backend/profiling.py)
+    ANALISE_FOLDER: str = os.getenv('ANALISE_FOLDER', os.path.join(BACKEND_DIR, 'analise_store'))
+    ANALISE_TTL: int = int(os.getenv('ANALISE_TTL', '3600'))
+    ANALISE_PAGE_MAX: int = int(os.getenv('ANALISE_PAGE_MAX', '500'))
+
+    # Leitura de várias abas em paralelo (processos), ver backend/readers.py
+    SHEET_WORKERS: int = int(os.getenv('SHEET_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+    # Aliases extras de cabeçalho (JSON), ver backend/schema.py
+    SCHEMA_ALIASES_FILE: str = os.getenv('SCHEMA_ALIASES_FILE', '')
+
+    # Logging (ver backend/core/logging.py)
+    LOG_ASYNC: bool = os.getenv('LOG_ASYNC', 'true').lower() in ('1', 'true', 'yes')
+    LOG_RATE_LIMIT: int = int(os.getenv('LOG_RATE_LIMIT', '20'))
+    LOG_RATE_WINDOW: float = float(os.getenv('LOG_RATE_WINDOW', '60'))
+    LOG_SAMPLE_EVERY: int = int(os.getenv('LOG_SAMPLE_EVERY', '0'))
+
     # Server (can be overridden by environment variables)
     DEBUG: bool = os.getenv('DEBUG', 'false').lower() in ('1', 'true', 'yes')
     HOST: str = os.getenv('HOST', '0.0.0.0')
     PORT: int = int(os.getenv('PORT', '5000'))
 
+    # Frontend servido de um manifesto em memória (ver backend/static_assets.py);
+    # com STATIC_RELOAD o manifesto é refeito quando um arquivo muda (desenvolvimento)
+    STATIC_RELOAD: bool = os.getenv('STATIC_RELOAD', str(DEBUG)).lower() in ('1', 'true', 'yes')
+
+    # Production workers (gunicorn, see backend/gunicorn.conf.py)
+    WEB_CONCURRENCY: int = int(os.getenv('WEB_CONCURRENCY', str(min(4, os.cpu_count() or 1))))
+    WORKER_TIMEOUT: int = int(os.getenv('WORKER_TIMEOUT', '300'))
+    WORKER_MAX_REQUESTS: int = int(os.getenv('WORKER_MAX_REQUESTS', '200'))
+    WORKER_MAX_REQUESTS_JITTER: int = int(os.getenv('WORKER_MAX_REQUESTS_JITTER', '50'))
+    WORKER_MAX_RSS_MB: int = int(os.getenv('WORKER_MAX_RSS_MB', '1024'))
+
+    # Controle de admissão dos endpoints pesados (compartilhado pelos workers, ver backend/admission.py)
+    ADMISSION_ENABLED: bool = os.getenv('ADMISSION_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    ADMISSION_MEMORY_BUDGET_MB: int = int(os.getenv('ADMISSION_MEMORY_BUDGET_MB', '1024'))
+    ADMISSION_MAX_QUEUE: int = int(os.getenv('ADMISSION_MAX_QUEUE', '8'))
+    ADMISSION_QUEUE_TIMEOUT: float = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '30'))
+
     def ensure_dirs(self):
         os.makedirs(self.UPLOAD_FOLDER, exist_ok=True)
+        os.makedirs(self.BASES_FOLDER, exist_ok=True)
+        os.makedirs(self.CHUNKED_UPLOAD_FOLDER, exist_ok=True)
         # static dir is managed by frontend assets; no creation here.
         return self
 
@@ -1,9 +1,132 @@
+"""Logger da aplicação.
+
+- Assíncrono (`LOG_ASYNC`): quem loga só enfileira o registro; uma thread
+  (`QueueListener`) escreve no stdout. A thread é recriada nos workers
+  depois do fork do gunicorn (`preload_app`).
+- Limite por mensagem (`RateLimitFilter`): cada chave (o template da
+  mensagem, ou `extra={"log_key": ...}`) passa no máximo `LOG_RATE_LIMIT`
+  vezes por janela de `LOG_RATE_WINDOW` segundos; depois disso só uma a cada
+  `LOG_SAMPLE_EVERY` (0 = nenhuma). As suprimidas viram uma linha de resumo
+  "mais N mensagens semelhantes suprimidas". Erros nunca são suprimidos.
+- Contadores por requisição (`contar`): ocorrências frequentes (linha sem
+  e-mail, CPF ausente...) são somadas e registradas uma vez ao final da
+  requisição (`finalizar_contadores`, ligado em `app.py`).
+"""
+import atexit
 import logging
+import os
+import queue
 import sys
+import threading
+import time
+from contextvars import ContextVar
 from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from .config import settings
 
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 
+_contadores: ContextVar[Optional[Dict[str, int]]] = ContextVar('log_contadores', default=None)
+_listeners: list = []
+
+
+class RateLimitFilter(logging.Filter):
+    """Limita quantas vezes a mesma mensagem é registrada por janela de tempo."""
+
+    def __init__(self, limit: int, window: float, sample_every: int = 0):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self.sample_every = sample_every
+        self._lock = threading.Lock()
+        # chave -> [início da janela, emitidas, suprimidas, último registro suprimido]
+        self._keys: Dict[tuple, list] = {}
+        self._ultima_poda = time.time()
+
+    @staticmethod
+    def _key(record: logging.LogRecord) -> tuple:
+        key = getattr(record, 'log_key', None)
+        return (record.name, record.levelno, key if key is not None else str(record.msg))
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.limit <= 0 or record.levelno >= logging.ERROR or getattr(record, 'resumo_supressao', False):
+            return True
+        key = self._key(record)
+        expirado = None
+        podados = []
+        with self._lock:
+            if record.created - self._ultima_poda >= self.window:
+                podados = self._podar(record.created)
+            state = self._keys.get(key)
+            if state is None or record.created - state[0] >= self.window:
+                if state is not None and state[2]:
+                    expirado = (state[2], state[3])
+                state = self._keys[key] = [record.created, 0, 0, None]
+            if state[1] < self.limit:
+                state[1] += 1
+                passa = True
+            else:
+                state[2] += 1
+                state[3] = record
+                passa = bool(self.sample_every) and state[2] % self.sample_every == 0
+        for suprimidas, antigo in podados:
+            self._resumo(suprimidas, antigo)
+        if expirado:
+            self._resumo(*expirado)
+        return passa
+
+    def _podar(self, agora: float) -> list:
+        """Remove as chaves com janela vencida (com o lock); devolve os resumos pendentes delas."""
+        self._ultima_poda = agora
+        vencidas = [k for k, s in self._keys.items() if agora - s[0] >= self.window]
+        return [(s[2], s[3]) for s in (self._keys.pop(k) for k in vencidas) if s[2]]
+
+    def flush(self) -> None:
+        """Registra os resumos pendentes, reinicia as janelas com supressões e descarta as vencidas."""
+        with self._lock:
+            pendentes = [(s[2], s[3]) for s in self._keys.values() if s[2]]
+            self._keys = {k: s for k, s in self._keys.items() if not s[2]}
+            self._podar(time.time())
+        for suprimidas, record in pendentes:
+            self._resumo(suprimidas, record)
+
+    def _resumo(self, suprimidas: int, record: logging.LogRecord) -> None:
+        logging.getLogger(record.name).log(
+            record.levelno, '%s (mais %d mensagens semelhantes suprimidas)', record.getMessage(), suprimidas,
+            extra={'resumo_supressao': True})
+
+
+def _start_listener(queue_handler: QueueHandler, target: logging.Handler) -> None:
+    queue_handler.queue = queue.SimpleQueue()
+    listener = QueueListener(queue_handler.queue, target, respect_handler_level=True)
+    listener.queue_handler = queue_handler
+    listener.start()
+    _listeners.append(listener)
+
+
+def _restart_listeners_after_fork() -> None:
+    # A thread do listener não sobrevive ao fork: o worker recria fila e thread
+    antigos = list(_listeners)
+    _listeners.clear()
+    for listener in antigos:
+        for handler in listener.handlers:
+            _start_listener(listener.queue_handler, handler)
+
+
+def _stop_listeners() -> None:
+    for listener in _listeners:
+        try:
+            listener.stop()
+        except Exception:
+            pass
+
+
+atexit.register(_stop_listeners)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_listeners_after_fork)
+
 
 @lru_cache(maxsize=4)
 def get_logger(name: str = 'robo_backend') -> logging.Logger:
@@ -12,7 +135,45 @@ def get_logger(name: str = 'robo_backend') -> logging.Logger:
         handler = logging.StreamHandler(sys.stdout)
         formatter = logging.Formatter(LOG_FORMAT)
         handler.setFormatter(formatter)
-        logger.addHandler(handler)
+        if settings.LOG_ASYNC:
+            queue_handler = QueueHandler(queue.SimpleQueue())
+            _start_listener(queue_handler, handler)
+            logger.addHandler(queue_handler)
+        else:
+            logger.addHandler(handler)
+        logger.addFilter(RateLimitFilter(settings.LOG_RATE_LIMIT, settings.LOG_RATE_WINDOW,
+                                         settings.LOG_SAMPLE_EVERY))
         logger.setLevel(logging.INFO)
         logger.propagate = False
     return logger
+
+
+def contar(chave: str, n: int = 1) -> None:
+    """Soma `n` ao contador `chave` da requisição atual (sem requisição, não faz nada)."""
+    atual = _contadores.get()
+    if atual is not None:
+        atual[chave] = atual.get(chave, 0) + n
+
+
+def iniciar_contadores():
+    """Abre os contadores de uma requisição; devolve o token para `finalizar_contadores`."""
+    return _contadores.set({})
+
+
+def finalizar_contadores(token, contexto: str = '', logger: Optional[logging.Logger] = None) -> Dict[str, int]:
+    """Registra numa linha os contadores da requisição e os resumos de supressão pendentes."""
+    logger = logger or get_logger()
+    atual = _contadores.get() or {}
+    try:
+        _contadores.reset(token)
+    except (TypeError, ValueError):
+        # token ausente ou de outro contexto
+        _contadores.set(None)
+    for f in logger.filters:
+        if isinstance(f, RateLimitFilter):
+            f.flush()
+    if atual:
+        resumo = ', '.join(f'{k}={v}' for k, v in sorted(atual.items()))
+        logger.info('Resumo %s: %s', contexto or 'da requisição', resumo)
+    return atual
+
@@ -0,0 +1,71 @@
+"""Configuração do gunicorn para produção.
+
+    gunicorn -c backend/gunicorn.conf.py backend.wsgi:app
+
+- `preload_app`: a aplicação e os caches de `backend.wsgi` são carregados no
+  master e compartilhados pelos workers em copy-on-write.
+- `max_requests` (+ jitter): recicla workers periodicamente para conter a
+  fragmentação de memória do pandas.
+- `WORKER_MAX_RSS_MB`: recicla o worker ao final da requisição em que sua
+  memória residente passar do limite.
+- `child_exit`: devolve ao controle de admissão as reservas de um worker que
+  morreu no meio de uma requisição (timeout, OOM).
+"""
+import gc
+import os
+import resource
+import sys
+
+PARENT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PARENT not in sys.path:
+    sys.path.insert(0, PARENT)
+
+from backend.core.config import settings  # noqa: E402
+
+bind = f"{settings.HOST}:{settings.PORT}"
+workers = settings.WEB_CONCURRENCY
+worker_class = 'sync'
+timeout = settings.WORKER_TIMEOUT
+graceful_timeout = 30
+preload_app = True
+max_requests = settings.WORKER_MAX_REQUESTS
+max_requests_jitter = settings.WORKER_MAX_REQUESTS_JITTER
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+accesslog = '-'
+errorlog = '-'
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def _current_rss_mb() -> float:
+    """Memória residente atual do processo (MB)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / (1024 * 1024)
+    except (OSError, IndexError, ValueError):
+        # Fora do Linux usamos o pico (ru_maxrss em KB no Linux, bytes no macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def when_ready(server):
+    # Congela os objetos já carregados para que o GC dos workers não toque
+    # nessas páginas (o que quebraria o compartilhamento copy-on-write).
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"Workers: {workers} | max_requests={max_requests} | max_rss={settings.WORKER_MAX_RSS_MB}MB")
+
+
+def post_request(worker, req, environ, resp):
+    limit = settings.WORKER_MAX_RSS_MB
+    if limit <= 0:
+        return
+    rss = _current_rss_mb()
+    if rss > limit:
+        worker.log.warning(f"Worker {worker.pid} com {rss:.0f}MB (> {limit}MB); reciclando.")
+        worker.alive = False
+
+
+def child_exit(server, worker):
+    from backend.admission import admission
+    admission.release_pid(worker.pid)
@@ -0,0 +1,128 @@
+# backend/output_parts.py
+"""Saída dividida em partes de até N linhas, entregue num ZIP em streaming.
+
+A importação da plataforma limita o número de linhas por arquivo. Com
+`max_rows_per_file` os endpoints de exportação (cadastro e inativação)
+dividem a saída em partes `<nome>_parte_001.xlsx` (ou .csv) dentro de um ZIP
+enviado ao cliente à medida que cada parte fica pronta:
+
+- só uma parte serializada fica em memória por vez: cada fatia do frame de
+  saída é convertida, gravada no ZIP e os bytes saem para o cliente antes da
+  próxima;
+- o ZIP é escrito num destino sem seek (tamanhos e CRC vão no descritor de
+  dados depois de cada entrada), então nada do arquivo precisa ser reescrito;
+- partes XLSX entram sem recompressão (o XLSX já é um ZIP); CSV (separador
+  `;`, UTF-8 com BOM, como o Excel em português abre) com deflate.
+"""
+import io
+import time
+import zipfile
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+import pandas as pd
+from flask import Response, stream_with_context
+
+from .core.logging import get_logger
+
+logger = get_logger()
+
+FORMATOS_PARTE = ("xlsx", "csv")
+# Linhas de dados por aba do Excel (1.048.576 menos o cabeçalho)
+LIMITE_LINHAS_XLSX = 1_048_575
+
+# (prefixo do nome das partes, frame, nome da aba)
+Grupo = Tuple[str, pd.DataFrame, str]
+
+
+def parametros_partes(form) -> Optional[Tuple[int, str]]:
+    """(`max_rows_per_file`, `formato_saida`) do formulário, ou None sem divisão.
+
+    ValueError para valores inválidos (a rota responde 400).
+    """
+    bruto = (form.get("max_rows_per_file") or "").strip()
+    if not bruto:
+        return None
+    if not bruto.isdigit() or int(bruto) < 1:
+        raise ValueError("Parâmetro 'max_rows_per_file' deve ser um inteiro positivo")
+    formato = (form.get("formato_saida") or "xlsx").strip().lower()
+    if formato not in FORMATOS_PARTE:
+        raise ValueError("Parâmetro 'formato_saida' deve ser 'xlsx' ou 'csv'")
+    max_linhas = int(bruto)
+    if formato == "xlsx" and max_linhas > LIMITE_LINHAS_XLSX:
+        raise ValueError(f"Parâmetro 'max_rows_per_file' acima do limite do Excel ({LIMITE_LINHAS_XLSX} linhas)")
+    return max_linhas, formato
+
+
+class _Destino(io.RawIOBase):
+    """Destino do ZipFile sem seek: acumula o que foi escrito até ser drenado."""
+
+    def __init__(self):
+        super().__init__()
+        self._buf = bytearray()
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._buf += b
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def drenar(self) -> bytes:
+        dados = bytes(self._buf)
+        self._buf.clear()
+        return dados
+
+
+def _csv_bytes(df: pd.DataFrame) -> bytes:
+    return df.to_csv(index=False, sep=";").encode("utf-8-sig")
+
+
+def zip_partes(grupos: Iterable[Grupo], max_linhas: int, formato: str,
+               escrever_xlsx: Callable[[pd.DataFrame, str], bytes]) -> Iterator[bytes]:
+    """Bytes do ZIP com as partes de cada grupo, gerados parte a parte.
+
+    Grupos vazios são omitidos. `escrever_xlsx(fatia, aba)` produz uma parte
+    XLSX (com a formatação do endpoint).
+    """
+    destino = _Destino()
+    t0 = time.perf_counter()
+    partes = 0
+    with zipfile.ZipFile(destino, mode="w") as zf:
+        for prefixo, df, aba in grupos:
+            if df is None or df.empty:
+                continue
+            total = -(-len(df) // max_linhas)
+            largura = max(3, len(str(total)))
+            for n, inicio in enumerate(range(0, len(df), max_linhas), 1):
+                fatia = df.iloc[inicio:inicio + max_linhas]
+                if formato == "csv":
+                    dados, compressao = _csv_bytes(fatia), zipfile.ZIP_DEFLATED
+                else:
+                    dados, compressao = escrever_xlsx(fatia, aba), zipfile.ZIP_STORED
+                info = zipfile.ZipInfo(f"{prefixo}_parte_{n:0{largura}d}.{formato}",
+                                       date_time=time.localtime()[:6])
+                info.compress_type = compressao
+                info.external_attr = 0o644 << 16
+                zf.writestr(info, dados)
+                del dados
+                partes += 1
+                yield destino.drenar()
+    # diretório central, escrito ao fechar o ZipFile
+    yield destino.drenar()
+    logger.info("ZIP com %d partes (%s, até %d linhas) gerado em %.2fs", partes, formato, max_linhas,
+                time.perf_counter() - t0)
+
+
+def resposta_zip(grupos: Iterable[Grupo], max_linhas: int, formato: str,
+                 escrever_xlsx: Callable[[pd.DataFrame, str], bytes], download_name: str) -> Response:
+    """Resposta em streaming (`application/zip`) com as partes de `grupos`."""
+    response = Response(stream_with_context(zip_partes(grupos, max_linhas, formato, escrever_xlsx)),
+                        mimetype="application/zip",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    response.headers.set("Content-Disposition", "attachment", filename=download_name)
+    return response
@@ -1,10 +1,15 @@
 import os
 import re
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+import numpy as np
 import pandas as pd
-from docx import Document
-from .utils import upper_no_accents, limpar_cpf_raw, format_cpf_for_output, separar_nome_sobrenome
-from .validators import validar_linha, validar_dataframe_for_output
-from .core.logging import get_logger
+from .utils import cpf_validos, upper_no_accents, limpar_cpf_raw, format_cpf_for_output
+from .validators import cpf_da_linha, validar_linha, validar_dataframe_for_output
+from .readers import (ler_abas, expandir_frame, cabecalho_amostra, COLUNA_ABA, EXTENSOES_PARQUET, EXTENSOES_TEXTO)
+from .schema import register_aliases, resolve_columns
+from .core.logging import contar, get_logger
 
 logger = get_logger()
 
@@ -103,71 +108,291 @@ FICHA_MAP = {
     "Terceiro": "Terceiro",
 }
 
-
-def drop_header_like_rows(df: pd.DataFrame) -> pd.DataFrame:
-    """Remove linhas que parecem ser cabeçalhos repetidos dentro do arquivo Excel."""
-    if df.empty:
-        return df
-    cols = list(df.columns)
-
-    def is_header(row):
-        matches = 0
-        for c in cols:
-            val = str(row.get(c, "")).strip()
-            if val.upper() == str(c).upper():
-                matches += 1
-        return (matches / max(1, len(cols))) > 0.4
-
-    return df[~df.apply(is_header, axis=1)]
+# Esquema "ficha": todos os rótulos de FICHA_MAP, cada coluna mapeada para seu campo
+_ficha_aliases = {}
+for _label, _target in FICHA_MAP.items():
+    _ficha_aliases.setdefault(_target, {"multi": True, "rules": []})["rules"].append(("exact", _label))
+register_aliases("ficha", _ficha_aliases, prepend=False)
+
+
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_P, _W_T, _W_TAB, _W_BR = _W_NS + "p", _W_NS + "t", _W_NS + "tab", _W_NS + "br"
+_W_TC, _W_TR = _W_NS + "tc", _W_NS + "tr"
+
+# Uma única alternância com todos os rótulos (mais longos primeiro, para que
+# "CPF (SEM PONTOS)" vença "CPF"), compilada uma vez por processo.
+_FICHA_LABELS = sorted(FICHA_MAP, key=len, reverse=True)
+_FICHA_LABEL_INDEX = {label.upper(): label for label in FICHA_MAP}
+_FICHA_LINE_RE = re.compile(
+    r"(?P<label>" + "|".join(re.escape(lbl) for lbl in _FICHA_LABELS) + r")\s*[:\-]\s*(?P<value>.+)",
+    flags=re.IGNORECASE,
+)
+_FICHA_CELL_RE = re.compile(
+    r"^\s*(?P<label>" + "|".join(re.escape(lbl) for lbl in _FICHA_LABELS) + r")\s*[:\-]?\s*$",
+    flags=re.IGNORECASE,
+)
+
+
+def _iter_docx_lines(path: str):
+    """Percorre `word/document.xml` de forma incremental e gera linhas de texto.
+
+    Gera o texto de cada parágrafo (inclusive os de células de tabela) e, para
+    linhas de tabela no formato | RÓTULO | valor |, uma linha sintética
+    "RÓTULO: valor".
+    """
+    with zipfile.ZipFile(path) as zf, zf.open("word/document.xml") as xml:
+        runs: list = []
+        cell_stack: list = []   # textos dos parágrafos de cada célula aberta
+        row_stack: list = []    # textos das células de cada linha aberta
+        for event, elem in ET.iterparse(xml, events=("start", "end")):
+            tag = elem.tag
+            if event == "start":
+                if tag == _W_P:
+                    runs = []
+                elif tag == _W_TC:
+                    cell_stack.append([])
+                elif tag == _W_TR:
+                    row_stack.append([])
+                continue
+
+            if tag == _W_T:
+                runs.append(elem.text or "")
+            elif tag == _W_TAB:
+                runs.append("\t")
+            elif tag == _W_BR:
+                runs.append("\n")
+            elif tag == _W_P:
+                text = "".join(runs)
+                if cell_stack:
+                    cell_stack[-1].append(text)
+                for line in text.split("\n"):
+                    if line.strip():
+                        yield line
+                elem.clear()
+            elif tag == _W_TC:
+                cell_text = " ".join(t.strip() for t in cell_stack.pop() if t.strip())
+                if row_stack:
+                    row_stack[-1].append(cell_text)
+                elem.clear()
+            elif tag == _W_TR:
+                cells = row_stack.pop()
+                for left, right in zip(cells, cells[1:]):
+                    if right and _FICHA_CELL_RE.match(left):
+                        yield f"{left.strip().rstrip(':-').strip()}: {right}"
+                elem.clear()
 
 
 def extrair_docx(path: str) -> dict:
-    """Extrai pares label:value de um .docx usando FICHA_MAP como referência."""
-    doc = Document(path)
-    text = "\n".join(p.text for p in doc.paragraphs)
+    """Extrai pares label:value de um .docx usando FICHA_MAP como referência.
+
+    Lê parágrafos e células de tabela em uma única passada sobre o XML e
+    resolve todos os rótulos com uma só regex. Vale a primeira ocorrência de
+    cada rótulo; entre rótulos sinônimos, prevalece o que vem depois no FICHA_MAP.
+    """
+    found = {}
+    for line in _iter_docx_lines(path):
+        pos = 0
+        while True:
+            m = _FICHA_LINE_RE.search(line, pos)
+            if not m:
+                break
+            label = _FICHA_LABEL_INDEX.get(m.group("label").upper())
+            if label and label not in found:
+                found[label] = m.group("value").strip()
+            # o valor pode conter outros "RÓTULO: valor" na mesma linha
+            pos = m.start("value")
+        if len(found) == len(FICHA_MAP):
+            break
     data = {}
     for label, target in FICHA_MAP.items():
-        pat = rf"{re.escape(label)}\s*[:\-]\s*(.+)"
-        m = re.search(pat, text, flags=re.IGNORECASE)
-        if m:
-            data[target] = m.group(1).strip()
+        if label in found:
+            data[target] = found[label]
     return data
 
 
-def processar_registros_from_files(paths: list, login_choice: str = "CPF", fluxo: str = "SELF"):
-    """Processa arquivos (.docx, .xls, .xlsx) e retorna (errors, df_final)."""
-    all_errors = {}
-    all_data = []
+def processar_registros_from_files(paths: list, login_choice: str = "CPF", fluxo: str = "SELF",
+                                   abas: str = None, tempos_abas: list = None):
+    """Processa arquivos (.docx, .xls, .xlsx, CSV/TSV, Parquet) e retorna (errors, df_final).
 
+    `abas` escolhe as abas lidas de cada planilha (ver `readers.selecionar_abas`);
+    os tempos de leitura de cada aba são acrescentados a `tempos_abas`.
+    """
+    errors, df_final = _processar_registros(paths, login_choice=login_choice, fluxo=fluxo,
+                                            abas=abas, tempos_abas=tempos_abas)
+    return errors, df_final[MODEL_COLS]
+
+
+# Registros validados por lote em `validar_registros_from_files` (os erros de cada lote saem juntos)
+LOTE_VALIDACAO = 2000
+
+
+def validar_registros_from_files(paths: list, login_choice: str = "CPF", fluxo: str = "SELF",
+                                 abas: str = None, max_erros: int = None, lote: int = LOTE_VALIDACAO):
+    """Só valida o cadastro, sem gerar a saída: gera eventos (dicts) à medida que avança.
+
+    Mapeamento e validação são os de `processar_registros_from_files`, feitos em
+    lotes de `lote` registros. Eventos, pelo campo `tipo`:
+    - "arquivo": arquivo lido (`arquivo`, `registros`, `segundos`);
+    - "falha": arquivo que não pôde ser lido (`arquivo`, `erro`);
+    - "geral": problemas do conjunto (`mensagens`);
+    - "erro": registro inválido (`indice`, `arquivo`, `aba`, `linha`, `login`, `nome`,
+      `mensagens`); `indice` é a chave do registro em `errors` no processamento completo;
+    - "resumo": sempre o último (`registros`, `validados`, `com_erro`, `interrompido`, `segundos`).
+
+    Com `max_erros`, a validação para no registro com erro de número `max_erros`.
+    """
+    t0 = time.perf_counter()
+    all_data, origens = [], []
     for path in paths:
+        t_arquivo = time.perf_counter()
         try:
-            if path.lower().endswith('.docx'):
-                data = extrair_docx(path)
-                if data:
-                    all_data.append(data)
-            elif path.lower().endswith(('.xls', '.xlsx')):
-                df = pd.read_excel(path, dtype=str).fillna("")
-                df = drop_header_like_rows(df)
-                normalized_map = {upper_no_accents(k).strip(): v for k, v in FICHA_MAP.items()}
-                for _, row in df.iterrows():
-                    mapped_row = {}
-                    for col in df.columns:
-                        normalized_col = upper_no_accents(str(col)).strip()
-                        if normalized_col in normalized_map:
-                            mapped_row[normalized_map[normalized_col]] = row[col]
-                    if mapped_row:
-                        all_data.append(mapped_row)
-            else:
-                logger.debug(f"Ignorando arquivo não suportado: {path}")
+            registros, origem = _ler_registros(path, abas)
         except Exception as e:
-            logger.warning(f"Falha ao ler {path}: {e}")
-            all_errors[path] = str(e)
+            contar("cadastro.falha_leitura")
+            logger.warning("Falha ao ler %s: %s", path, e)
+            yield {"tipo": "falha", "arquivo": path, "erro": str(e)}
+            continue
+        all_data.extend(registros)
+        origens.extend((path, aba, linha) for aba, linha in origem)
+        yield {"tipo": "arquivo", "arquivo": path, "registros": len(registros),
+               "segundos": round(time.perf_counter() - t_arquivo, 3)}
+
+    # mesmas colunas (e na mesma ordem) do frame único do processamento completo
+    colunas = list(dict.fromkeys(campo for registro in all_data for campo in registro))
+    validados = com_erro = 0
+    interrompido = False
+    for inicio in range(0, len(all_data), lote):
+        fim = min(inicio + lote, len(all_data))
+        df = _preparar_registros(pd.DataFrame(all_data[inicio:fim], columns=colunas, index=range(inicio, fim)),
+                                 login_choice=login_choice, fluxo=fluxo)
+        if inicio == 0:
+            general_msgs = validar_dataframe_for_output(df)
+            if general_msgs:
+                yield {"tipo": "geral", "mensagens": general_msgs}
+        validados = fim
+        for idx, reg, msgs in _erros_por_linha(df):
+            path, aba, linha = origens[idx]
+            com_erro += 1
+            login, nome = reg["Login"], reg["NomeCompleto"]
+            yield {"tipo": "erro", "indice": int(idx), "arquivo": path, "aba": aba, "linha": linha,
+                   "login": "" if pd.isna(login) else str(login), "nome": "" if pd.isna(nome) else str(nome),
+                   "mensagens": msgs}
+            if max_erros and com_erro >= max_erros:
+                validados = idx + 1
+                interrompido = validados < len(all_data)
+                break
+        if interrompido:
+            break
+
+    yield {"tipo": "resumo", "registros": len(all_data), "validados": validados, "com_erro": com_erro,
+           "interrompido": interrompido, "segundos": round(time.perf_counter() - t0, 3)}
+
+
+def processar_cadastro_contra_base(paths: list, df_base: pd.DataFrame, login_choice: str = "CPF",
+                                   fluxo: str = "SELF", modo_existentes: str = "update",
+                                   abas: str = None, tempos_abas: list = None):
+    """Processa o cadastro e separa quem já existe na base do cliente.
+
+    Retorna (errors, df_novos, df_existentes, stats). Com `modo_existentes="update"`
+    os existentes saem com Operacao=UPDATE e o UserId da base; com "skip" saem
+    como foram gerados, apenas para conferência. Ambos trazem a coluna Motivo.
+    """
+    errors, df_final = _processar_registros(paths, login_choice=login_choice, fluxo=fluxo,
+                                            abas=abas, tempos_abas=tempos_abas)
+    existe, motivo, user_ids, stats = localizar_existentes(df_final, df_base)
 
-    if not all_data:
-        return all_errors, pd.DataFrame(columns=MODEL_COLS)
+    df_novos = df_final.loc[~existe, MODEL_COLS]
+    df_existentes = df_final.loc[existe, MODEL_COLS]
+    if modo_existentes == "update":
+        df_existentes["Operacao"] = "UPDATE"
+        base_ids = user_ids[existe]
+        df_existentes["UserId"] = base_ids.where(base_ids != "", df_existentes["UserId"])
+    df_existentes["Motivo"] = motivo[existe].values
+    stats.update({"novos": int(len(df_novos)), "existentes": int(len(df_existentes)), "modo": modo_existentes})
+    return errors, df_novos, df_existentes, stats
+
+
+def _cpf_keys(series: pd.Series) -> pd.Series:
+    digits = series.fillna("").astype(str).str.replace(r"\D", "", regex=True)
+    return digits.str.zfill(11).where(digits != "", "")
+
+
+def _text_keys(series: pd.Series) -> pd.Series:
+    return series.fillna("").astype(str).str.strip().str.lower()
 
-    df_final = pd.DataFrame(all_data)
 
+def localizar_existentes(df_novos: pd.DataFrame, df_base: pd.DataFrame):
+    """Procura cada registro novo na base por CPF, Login e Email (nesta ordem).
+
+    Para cada chave é montado um índice hash da base (pd.Index das chaves) e
+    todos os registros são consultados de uma vez com `get_indexer`, sem
+    comparação par a par. Retorna (existe, motivo, user_ids, stats),
+    alinhados ao índice de `df_novos`.
+    """
+    schema = resolve_columns(df_base.columns, "base")
+    userid_col = schema.get("user_id")
+    base_ids = (df_base[userid_col].astype(str).str.strip().to_numpy(dtype=object) if userid_col
+                else np.full(len(df_base), "", dtype=object))
+    motivo = np.full(len(df_novos), "", dtype=object)
+    user_ids = np.full(len(df_novos), "", dtype=object)
+    stats = {"base_linhas": int(len(df_base)), "chaves_base": {}}
+
+    for out_col, field, keys_of in (("CPF", "cpf", _cpf_keys), ("Login", "login", _text_keys),
+                                    ("Email", "email", _text_keys)):
+        base_col = schema.get(field)
+        if not base_col or out_col not in df_novos.columns:
+            continue
+        base_keys = keys_of(df_base[base_col]).to_numpy(dtype=object)
+        index = pd.Index(base_keys)
+        keep = (base_keys != "") & ~index.duplicated(keep="first")
+        index, ids = index[keep], base_ids[keep]
+        stats["chaves_base"][out_col] = int(len(index))
+
+        keys = keys_of(df_novos[out_col]).to_numpy(dtype=object)
+        pos = index.get_indexer(keys)
+        hit = (motivo == "") & (keys != "") & (pos >= 0)
+        motivo[hit] = out_col
+        user_ids[hit] = ids[pos[hit]]
+
+    existe = pd.Series(motivo != "", index=df_novos.index)
+    stats["por_chave"] = {k: int(v) for k, v in pd.Series(motivo[existe.values]).value_counts().items()}
+    return existe, pd.Series(motivo, index=df_novos.index), pd.Series(user_ids, index=df_novos.index), stats
+
+
+def _ler_registros(path: str, abas: str = None, tempos_abas: list = None) -> tuple:
+    """Registros (campo da ficha -> valor) de um arquivo e a origem de cada um.
+
+    Retorna (registros, origens), com origens = [(aba, linha)] (linha de dados
+    1-based dentro da aba). Formatos não suportados devolvem listas vazias.
+    """
+    if path.lower().endswith('.docx'):
+        data = extrair_docx(path)
+        return ([data], [(None, 1)]) if data else ([], [])
+    if not path.lower().endswith(('.xls', '.xlsx') + EXTENSOES_TEXTO + EXTENSOES_PARQUET):
+        contar("cadastro.arquivo_nao_suportado")
+        logger.debug("Ignorando arquivo não suportado: %s", path)
+        return [], []
+    df, _, tempos = ler_abas(path, abas, schema="ficha")
+    if tempos_abas is not None:
+        tempos_abas.extend(tempos)
+    resolution = resolve_columns(df.columns, "ficha")
+    if resolution.unmapped:
+        logger.debug("Colunas ignoradas em %s: %s", path, resolution.unmapped)
+    # em ordem de coluna: se dois rótulos mapeiam o mesmo campo, vale o último
+    mapped_cols = [(col, resolution.by_column[col]) for col in df.columns if col in resolution.by_column]
+    if not mapped_cols:
+        return [], []
+    registros = [{target: v for (_, target), v in zip(mapped_cols, values)}
+                 for values in df[[col for col, _ in mapped_cols]].itertuples(index=False, name=None)]
+    if COLUNA_ABA in df.columns:
+        origens = list(zip(df[COLUNA_ABA].tolist(), (df.groupby(COLUNA_ABA, sort=False).cumcount() + 1).tolist()))
+    else:
+        origens = [(None, i) for i in range(1, len(registros) + 1)]
+    return registros, origens
+
+
+def _preparar_registros(df_final: pd.DataFrame, login_choice: str = "CPF", fluxo: str = "SELF") -> pd.DataFrame:
+    """Colunas do modelo, Nome/SobreNome, Login, flags do fluxo e textos saneados (antes da validação)."""
     for col in MODEL_COLS:
         if col not in df_final.columns:
             df_final[col] = ""
@@ -177,14 +402,16 @@ def processar_registros_from_files(paths: list, login_choice: str = "CPF", fluxo
     df_final["CodigoIntegracao"] = "AUT"
     df_final["Status"] = ""
 
-    for idx, row in df_final.iterrows():
-        # Sempre recalcular Nome e SobreNome a partir de NomeCompleto,
-        # dando prioridade à lógica do script em relação ao que veio na ficha.
-        first, last = split_name_first_last(row.get("NomeCompleto", ""))
-        if first:
-            df_final.at[idx, "Nome"] = first
-        if last:
-            df_final.at[idx, "SobreNome"] = last
+    # Sempre recalcular Nome e SobreNome a partir de NomeCompleto,
+    # dando prioridade à lógica do script em relação ao que veio na ficha.
+    # (listas montadas de uma vez: gravar célula a célula numa coluna Arrow copia a coluna)
+    partes = [split_name_first_last(v) for v in df_final["NomeCompleto"].tolist()]
+    for col, pos in (("Nome", 0), ("SobreNome", 1)):
+        atuais = df_final[col].tolist()
+        novos = [p[pos] or atual for p, atual in zip(partes, atuais)]
+        if novos != atuais:
+            dtype = df_final[col].dtype if pd.api.types.is_string_dtype(df_final[col].dtype) else None
+            df_final[col] = pd.Series(novos, index=df_final.index, dtype=dtype)
 
     if login_choice == "CPF":
         if "CPF" in df_final.columns:
@@ -236,16 +463,22 @@ def processar_registros_from_files(paths: list, login_choice: str = "CPF", fluxo
             else:
                 df_final[c] = df_final[c].apply(lambda v: sanitize_output_text(v, None))
 
-    errors = {}
-    for idx, row in df_final.iterrows():
-        msgs = validar_linha(row)
+    return df_final
+
+
+def _erros_por_linha(df_final: pd.DataFrame):
+    """Gera (índice, registro, mensagens) de cada registro com problema de validação."""
+    registros = df_final.to_dict("records")
+    # dígitos verificadores de todos os CPFs numa passada só
+    cpf_ok = cpf_validos([cpf_da_linha(reg) for reg in registros])
+    for idx, reg, ok in zip(df_final.index, registros, cpf_ok):
+        msgs = validar_linha(reg, cpf_ok=ok)
         if msgs:
-            errors[idx] = "; ".join(msgs)
+            yield idx, reg, msgs
 
-    general_msgs = validar_dataframe_for_output(df_final)
-    if general_msgs:
-        errors["__geral__"] = "; ".join(general_msgs)
 
+def _finalizar_registros(df_final: pd.DataFrame, login_choice: str = "CPF") -> pd.DataFrame:
+    """Normalização da saída: duplicados, flags S/N, matrícula, caixa dos textos e linhas em branco."""
     if "Login" in df_final.columns and "NomeCompleto" in df_final.columns:
         df_final = df_final.drop_duplicates(subset=["Login", "NomeCompleto"], keep="first")
 
@@ -296,25 +529,362 @@ def processar_registros_from_files(paths: list, login_choice: str = "CPF", fluxo
             return df
         trimmed = df[critical].apply(lambda s: s.astype(str).str.strip())
         mask_blank = trimmed.eq("").all(axis=1)
-        return df.loc[~mask_blank].copy()
+        return df.loc[~mask_blank]
 
     df_final = _drop_blank_rows(df_final)
 
-    df_final = df_final[MODEL_COLS]
+    return df_final
+
+
+def _processar_registros(paths: list, login_choice: str = "CPF", fluxo: str = "SELF",
+                         abas: str = None, tempos_abas: list = None):
+    """Gera os registros de cadastro com todas as colunas lidas (inclusive CPF)."""
+    all_errors = {}
+    all_data = []
+
+    for path in paths:
+        try:
+            all_data.extend(_ler_registros(path, abas, tempos_abas)[0])
+        except Exception as e:
+            contar("cadastro.falha_leitura")
+            logger.warning("Falha ao ler %s: %s", path, e)
+            all_errors[path] = str(e)
+
+    if not all_data:
+        return all_errors, pd.DataFrame(columns=MODEL_COLS)
+
+    df_final = _preparar_registros(pd.DataFrame(all_data), login_choice=login_choice, fluxo=fluxo)
+
+    errors = {idx: "; ".join(msgs) for idx, _, msgs in _erros_por_linha(df_final)}
+    general_msgs = validar_dataframe_for_output(df_final)
+    if general_msgs:
+        errors["__geral__"] = "; ".join(general_msgs)
+
+    return errors, _finalizar_registros(df_final, login_choice=login_choice)
+
+
+# ==========================================================
+# Busca em lote (/api/inativacao/buscar)
+# ==========================================================
+_EMAIL_ITEM_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$", re.IGNORECASE)
+_BUSCA_COLS = ["id", "nome", "cpf", "email", "status_atual", "found"]
+
+
+def _as_keys(series: pd.Series) -> pd.Series:
+    # chaves como object: isin em object usa hashtable (o isin de strings Arrow itera em Python)
+    return pd.Series(series.to_numpy(dtype=object), index=series.index, dtype=object)
+
+
+def _classificar_itens(raw_items: list) -> dict:
+    """Separa os itens da busca em CPFs válidos, CPFs inválidos, e-mails e nomes completos."""
+    items = pd.Series([str(x).strip() for x in raw_items], dtype=object)
+    digits = items.str.replace(r"\D", "", regex=True)
+    has_11 = digits.str.len() == 11
+    # 11 dígitos com verificadores errados não são buscados nem tratados como nome
+    cpf_ok = pd.Series(cpf_validos(digits[has_11]), index=digits[has_11].index, dtype=bool)
+    valid_cpfs = digits[has_11][cpf_ok].tolist()
+    not_cpf = ~digits.isin(set(digits[has_11]))
+
+    is_email = items.str.match(_EMAIL_ITEM_RE).fillna(False).astype(bool) & not_cpf
+    valid_emails = items[is_email].tolist()
+
+    norm = items.map(upper_no_accents).str.strip()
+    is_fullname = (norm.str.split().str.len() >= 2) & (norm.str.len() >= 3)
+    is_name = not_cpf & ~items.isin(set(valid_emails)) & is_fullname
+
+    cpf_series = pd.Series(valid_cpfs, dtype=object)
+    return {
+        "cpfs": valid_cpfs,
+        "invalid_cpfs": digits[has_11][~cpf_ok].drop_duplicates().tolist(),
+        "duplicates": cpf_series[cpf_series.duplicated()].drop_duplicates().tolist(),
+        "emails": valid_emails,
+        "nomes_raw": items[is_name].tolist(),
+        "nomes": norm[is_name].tolist(),
+    }
+
+
+def chaves_busca(df_base: pd.DataFrame, com_nome_norm: bool = True, cpf_col: str | None = None) -> dict:
+    """Colunas da base usadas pela busca, já normalizadas como chaves (object).
+
+    Retorna id, nome, cpf (dígitos), email, status_atual e, com `com_nome_norm`,
+    nome_norm (maiúsculas sem acento); e as flags tem_cpf/tem_nome/tem_email
+    (coluna reconhecida pelo esquema, pré-requisito para buscar por ela).
+    `cpf_col` fixa a coluna de CPF em vez da detectada pelo esquema.
+    """
+    schema = resolve_columns(df_base.columns, "base")
+    nome_col, email_col, status_col, userid_col = (
+        schema.get(f) for f in ("nome_completo", "email", "status", "user_id"))
+    cpf_col = cpf_col if cpf_col in df_base.columns else schema.get("cpf")
+
+    def column(col, fallback):
+        name = col or fallback
+        if name in df_base.columns:
+            return _as_keys(df_base[name].astype(str))
+        return pd.Series("", index=df_base.index, dtype=object)
+
+    chaves = {
+        "cpf": (_as_keys(df_base[cpf_col].astype(str).str.replace(r"\D", "", regex=True)) if cpf_col
+                else pd.Series("", index=df_base.index, dtype=object)),
+        "nome": column(nome_col, "NomeCompleto"),
+        "email": column(email_col, "Email"),
+        "status_atual": column(status_col, "Status"),
+        "tem_cpf": bool(cpf_col), "tem_nome": bool(nome_col), "tem_email": bool(email_col),
+        "cpf_col": cpf_col,
+    }
+    if userid_col:
+        ids = _as_keys(df_base[userid_col].astype(str))
+        chaves["id"] = ids.where(ids != "", None)
+    else:
+        chaves["id"] = pd.Series(None, index=df_base.index, dtype=object)
+    if com_nome_norm and nome_col:
+        chaves["nome_norm"] = _as_keys(df_base[nome_col].astype(str).map(upper_no_accents).str.strip())
+    return chaves
+
+
+def _resposta_busca(itens: dict, frames: list, found_cpfs: set, found_name_norms: set, found_emails: set) -> dict:
+    """Junta os encontrados (`frames`, colunas `_BUSCA_COLS`) e os não localizados no payload da busca."""
+    not_found_cpfs = [c for c in itens["cpfs"] if c not in found_cpfs]
+    not_found_names = [n for n in itens["nomes"] if n not in found_name_norms]
+    not_found_emails = [e for e in itens["emails"] if e.strip().lower() not in found_emails]
+    for key, values in (("cpf", not_found_cpfs), ("nome", not_found_names), ("email", not_found_emails)):
+        if values:
+            missing = pd.DataFrame({c: "" for c in _BUSCA_COLS}, index=range(len(values)))
+            missing[key] = values
+            missing["id"] = None
+            missing["status_atual"] = "Não localizado"
+            missing["found"] = False
+            frames.append(missing[_BUSCA_COLS])
+
+    frames = [f for f in frames if not f.empty]
+    if frames:
+        results = pd.concat(frames, ignore_index=True)
+        order = np.lexsort((results["cpf"].to_numpy(dtype=object),
+                            results["nome"].to_numpy(dtype=object),
+                            ~results["found"].to_numpy(dtype=bool)))
+        results = results.iloc[order].astype(object)
+        results["id"] = results["id"].where(results["id"].notna(), None)
+        records = results.to_dict(orient="records")
+    else:
+        records = []
+
+    return {
+        "items": records,
+        "total": len(records),
+        "duplicates": itens["duplicates"],  # pode conter CPFs duplicados; emails duplicados não são listados separadamente
+        "not_found": not_found_cpfs + itens["nomes_raw"] + not_found_emails,
+        "invalid_cpfs": itens["invalid_cpfs"],
+    }
+
+
+def buscar_itens(df_base: pd.DataFrame, raw_items: list) -> dict:
+    """Classifica os itens (CPF, e-mail ou nome completo) e busca cada grupo na base.
+
+    Uma única passada classifica todos os itens; cada grupo é cruzado com a
+    base por chave normalizada (semi-join via hash) e os itens da resposta são
+    montados por colunas. Retorna o payload de /api/inativacao/buscar.
+    """
+    itens = _classificar_itens(raw_items)
+    chaves = chaves_busca(df_base, com_nome_norm=bool(itens["nomes"]))
+    base_cpf, base_email = chaves["cpf"], chaves["email"]
+
+    def found_frame(mask, email=None) -> pd.DataFrame:
+        return pd.DataFrame({
+            "id": chaves["id"][mask], "nome": chaves["nome"][mask], "cpf": base_cpf[mask],
+            "email": base_email[mask] if email is None else email,
+            "status_atual": chaves["status_atual"][mask], "found": True,
+        }, columns=_BUSCA_COLS)
+
+    frames = []
+    found_cpfs = set()
+    if itens["cpfs"] and chaves["tem_cpf"]:
+        by_cpf = base_cpf.isin(set(itens["cpfs"]))
+        found_cpfs = set(base_cpf[by_cpf])
+        frames.append(found_frame(by_cpf))
+
+    found_name_norms = set()
+    if itens["nomes"] and chaves["tem_nome"]:
+        base_nome_norm = chaves["nome_norm"]
+        by_name = base_nome_norm.isin(set(itens["nomes"]))
+        found_name_norms = set(base_nome_norm[by_name])
+        # linhas já encontradas por CPF contam como nome encontrado, mas não se repetem
+        already = (base_cpf != "") & base_cpf.isin(found_cpfs)
+        frames.append(found_frame(by_name & ~already))
+
+    found_emails = set()
+    if itens["emails"] and chaves["tem_email"]:
+        base_email_strip = base_email.str.strip()
+        by_email = base_email_strip.str.lower().isin({e.strip().lower() for e in itens["emails"]})
+        found_emails = set(base_email_strip[by_email].str.lower())
+        frames.append(found_frame(by_email, email=base_email_strip[by_email]))
+
+    return _resposta_busca(itens, frames, found_cpfs, found_name_norms, found_emails)
+
+
+def buscar_itens_indice(indice, raw_items: list) -> dict:
+    """Mesma busca de `buscar_itens`, por consultas pontuais num `user_index.UserIndex`.
+
+    Só as linhas encontradas saem do SQLite; a base não é carregada.
+    """
+    itens = _classificar_itens(raw_items)
+    frames = []
+    found_cpfs = set()
+    if itens["cpfs"] and indice.tem("cpf"):
+        achados = indice.por_cpf(set(itens["cpfs"]))
+        found_cpfs = set(achados["cpf"])
+        frames.append(achados[_BUSCA_COLS])
+
+    found_name_norms = set()
+    if itens["nomes"] and indice.tem("nome"):
+        achados = indice.por_nome(set(itens["nomes"]))
+        found_name_norms = set(achados["nome_norm"])
+        already = (achados["cpf"] != "") & achados["cpf"].isin(found_cpfs)
+        frames.append(achados.loc[~already, _BUSCA_COLS])
+
+    found_emails = set()
+    if itens["emails"] and indice.tem("email"):
+        achados = indice.por_email({e.strip().lower() for e in itens["emails"]})
+        found_emails = set(achados["email_key"])
+        frames.append(achados.assign(email=achados["email"].str.strip())[_BUSCA_COLS])
+
+    return _resposta_busca(itens, frames, found_cpfs, found_name_norms, found_emails)
+
+
+# ==========================================================
+# Leitura filtrada da base de inativação (readers.ler_planilha_filtrada)
+# ==========================================================
+def _status_ativo(texto: str) -> bool:
+    return upper_no_accents(texto).strip() == "ATIVO"
+
+
+def filtro_base_ativa(header: list):
+    """Filtro de leitura da base: mantém só as linhas com Status ATIVO (sem coluna de status, todas)."""
+    status_col = resolve_columns(header, "base").get("status")
+    return (status_col, _status_ativo) if status_col else None
+
+
+def colunas_base_inativacao(header: list) -> list:
+    """Colunas da base usadas no match e na ficha de saída da inativação."""
+    return list(resolve_columns(header, "base").fields.values())
+
+
+def projecao_base_inativacao(amostra: list) -> dict:
+    """Colunas da base a enviar na inativação, a partir das primeiras linhas da planilha.
+
+    Permite ao navegador projetar a base antes do upload: `linha_cabecalho`
+    (índice na amostra), `posicoes` e `colunas` das colunas que a leitura da
+    inativação manteria (`colunas_base_inativacao`) e o relatório da resolução.
+    """
+    nomes, header_row = cabecalho_amostra(amostra)
+    schema = resolve_columns(nomes, "base")
+    usadas = set(colunas_base_inativacao(nomes))
+    posicoes = [i for i, nome in enumerate(nomes) if nome in usadas]
+    return {"linha_cabecalho": header_row, "posicoes": posicoes, "colunas": [str(nomes[i]) for i in posicoes],
+            "schema": schema.report()}
+
+
+def colunas_chave_base(header: list) -> list:
+    """Colunas guardadas das linhas não ativas (contagem de correspondências INATIVAS)."""
+    schema = resolve_columns(header, "base")
+    return [c for c in (schema.get("cpf"), schema.get("nome_completo"), schema.get("email")) if c]
+
+
+def _contar_inativos(chaves: pd.DataFrame, lista_cpfs: list, lista_nomes: list, lista_emails: list) -> dict:
+    """Correspondências da lista entre as linhas não ativas, com a mesma prioridade CPF > nome > e-mail."""
+    cpf_hit = _as_keys(chaves["CPFdigits"]).isin(lista_cpfs).to_numpy()
+    nome_hit = _as_keys(chaves["Nome Normalizado"]).isin(lista_nomes).to_numpy() & ~cpf_hit
+    email_hit = _as_keys(chaves["Email Normalizado"]).isin(lista_emails).to_numpy() & ~cpf_hit & ~nome_hit
+    counts = {"cpf": int(cpf_hit.sum()), "nome": int(nome_hit.sum()), "email": int(email_hit.sum())}
+    return {"linhas": int(len(chaves)), **counts, "total": sum(counts.values())}
+
+
+# ==========================================================
+# Ficha de saída (MODEL_COLS) montada por colunas
+# ==========================================================
+_SN = {"SIM": "S", "NAO": "N", "NÃO": "N", "S": "S", "N": "N", "TRUE": "S", "FALSE": "N"}
+
+
+def _saida_texto(series: pd.Series) -> pd.Series:
+    """Texto sem espaços nas bordas e em maiúsculas (dígitos inalterados)."""
+    return series.fillna("").astype(str).str.strip().str.upper()
+
+
+def _saida_sn(series: pd.Series) -> np.ndarray:
+    """Sim/Não, S/N e True/False para S/N por tabela dos valores distintos; os demais viram N."""
+    codes, uniques = pd.factorize(_saida_texto(series))
+    tabela = np.array([_SN.get(v, "N") for v in uniques] + ["N"], dtype=object)
+    return tabela[codes]
+
+
+def _saida_digitos(series: pd.Series) -> pd.Series:
+    return series.fillna("").astype(str).str.replace(r"\D", "", regex=True)
+
+
+_CONVERSOES_SAIDA = {"texto": _saida_texto, "sn": _saida_sn, "digitos": _saida_digitos}
+
+
+def plano_inativacao(schema) -> dict:
+    """Coluna de saída -> (coluna da base, conversão), pelo esquema "base" já resolvido."""
+    campos = {
+        "UserId": ("user_id", "texto"), "Login": ("login", "texto"),
+        "NomeCompleto": ("nome_completo", "texto"), "Nome": ("nome", "texto"),
+        "SobreNome": ("sobrenome", "texto"), "Email": ("email", "texto"),
+        "Telefone": ("telefone", "texto"), "Cargo": ("cargo", "texto"),
+        "Departamento": ("departamento", "texto"), "Nivel": ("nivel", "texto"),
+        "NomeEmpresa": ("empresa", "texto"),
+        # empresa, centro de custo e descrição configurados no usuário
+        "CodigoCCustoEmpresa": ("codigo_ccusto", "texto"),
+        "DescricaoCCustoEmpresa": ("centro_custo", "texto"),
+        "ViajanteMasterNacional": ("viajante_master_nacional", "texto"),
+        "ViajanteMasterInternacional": ("viajante_master_internacional", "texto"),
+        "Terceiro": ("terceiro", "texto"),
+        "NroMatricula": ("matricula", "digitos"),
+        "Solicitante": ("solicitante", "sn"), "Vip": ("vip", "sn"),
+        "SolicitanteMaster": ("solicitante_master", "sn"),
+        "MasterAdiantamento": ("master_adiantamento", "sn"),
+        "MasterReembolso": ("master_reembolso", "sn"),
+    }
+    return {destino: (schema.get(campo), conversao) for destino, (campo, conversao) in campos.items()
+            if schema.get(campo)}
+
+
+def montar_saida(origem: pd.DataFrame, plano: dict, constantes: dict = None,
+                 colunas: list = MODEL_COLS) -> pd.DataFrame:
+    """Ficha de saída construída de uma vez a partir das colunas de `origem`.
 
-    return errors, df_final
+    `plano` mapeia coluna de saída -> (coluna de `origem`, conversão): "texto"
+    (sem espaços nas bordas, maiúsculas), "sn" (S/N por tabela) ou "digitos".
+    As demais colunas recebem o valor de `constantes` (padrão "") repetido em
+    todas as linhas. Cada par (coluna, conversão) é calculado uma só vez.
+    """
+    constantes = constantes or {}
+    calculadas = {}
+    dados = {}
+    for col in colunas:
+        fonte = plano.get(col)
+        if fonte and fonte[0] in origem.columns:
+            if fonte not in calculadas:
+                valores = _CONVERSOES_SAIDA[fonte[1]](origem[fonte[0]])
+                calculadas[fonte] = valores.array if isinstance(valores, pd.Series) else valores
+            dados[col] = calculadas[fonte]
+        else:
+            dados[col] = constantes.get(col, "")
+    return pd.DataFrame(dados, index=pd.RangeIndex(len(origem)), columns=colunas, copy=False)
 
 
 # ==========================================================
 # NOVA VERSÃO: processar_inativacao_from_paths (compatível)
 # ==========================================================
 def processar_inativacao_from_paths(df_base: pd.DataFrame, df_lista: pd.DataFrame,
-                                    use_fuzzy: bool = False, fuzzy_cutoff: float = 0.9):
+                                    use_fuzzy: bool = False, fuzzy_cutoff: float = 0.9,
+                                    df_ignorados: pd.DataFrame = None):
     """
     Processa inativação comparando usuários da base com uma lista de desligados.
     Estratégia:
       - Match exato por CPF (prioritário)
       - Match exato por NomeCompleto (fallback)
+    `df_ignorados` são as linhas não ativas já descartadas na leitura
+    (`ler_planilha_filtrada` com `filtro_base_ativa`); elas entram apenas
+    na contagem stats["inativos"].
     Retorna: (df_inativacao, stats)
     """
     try:
@@ -325,65 +895,82 @@ def processar_inativacao_from_paths(df_base: pd.DataFrame, df_lista: pd.DataFram
             s = re.sub(r"\D", "", str(s))
             return s.zfill(11) if s else ""
 
-        df_base = df_base.copy()
-        df_lista = df_lista.copy()
-
         # Detectar colunas relevantes
-        col_map = {upper_no_accents(str(c)).strip(): c for c in df_base.columns}
-        cpf_col = next((v for k, v in col_map.items() if "CPF" in k), None)
-        logger.info("Coluna CPF detectada: {}".format(cpf_col) if cpf_col else "Nenhuma coluna CPF detectada na base; CPF matching desabilitado")
-        nome_col = next((v for k, v in col_map.items() if "NOMECOMPLETO" in k or "NOME COMPLETO" in k), None)
-        email_col = next((v for k, v in col_map.items() if "EMAIL" in k), None)
-        status_col = next((v for k, v in col_map.items() if "STATUS" in k), None)
-
-        df_base["CPFdigits"] = df_base[cpf_col].apply(normalize_cpf) if cpf_col else ""
-        df_base["Nome Normalizado"] = df_base[nome_col].apply(normalize_str) if nome_col else ""
-        df_base["Email Normalizado"] = df_base[email_col].astype(str).fillna("").str.strip().str.lower() if email_col else ""
-
+        schema = resolve_columns(df_base.columns, "base")
+        cpf_col = schema.get("cpf")
+        if cpf_col:
+            logger.info("Coluna CPF detectada: %s", cpf_col)
+        else:
+            logger.info("Nenhuma coluna CPF detectada na base; CPF matching desabilitado")
+        nome_col = schema.get("nome_completo")
+        email_col = schema.get("email")
+        status_col = schema.get("status")
+
+        # Copy-on-Write: assign e os filtros abaixo criam frames novos sem copiar
+        # as colunas da base (nem alterar o frame recebido)
+        df_base = df_base.assign(**{
+            "CPFdigits": df_base[cpf_col].apply(normalize_cpf) if cpf_col else "",
+            "Nome Normalizado": df_base[nome_col].apply(normalize_str) if nome_col else "",
+            "Email Normalizado": df_base[email_col].astype(str).fillna("").str.strip().str.lower() if email_col else "",
+        })
+
+        key_cols = ["CPFdigits", "Nome Normalizado", "Email Normalizado"]
+        inativos = pd.DataFrame(columns=key_cols)
         if status_col:
-            df_base["Status Normalizado"] = df_base[status_col].apply(normalize_str)
-            df_base = df_base[df_base["Status Normalizado"] == "ATIVO"].copy()
-
-        df_lista["CPFdigits"] = df_lista["CPF"].apply(normalize_cpf) if "CPF" in df_lista.columns else ""
-        df_lista["Nome Normalizado"] = df_lista["NomeCompleto"].apply(normalize_str) if "NomeCompleto" in df_lista.columns else ""
-        df_lista["Email Normalizado"] = df_lista["Email"].astype(str).fillna("").str.strip().str.lower() if "Email" in df_lista.columns else ""
-
-        lista_cpfs = [cpf for cpf in df_lista["CPFdigits"].unique() if cpf]
-        matched_by_cpf = df_base[df_base["CPFdigits"].isin(lista_cpfs)] if cpf_col else pd.DataFrame()
-
-        lista_nomes = [nome for nome in df_lista["Nome Normalizado"].unique() if nome]
-        matched_by_nome = df_base[
-            (df_base["Nome Normalizado"].isin(lista_nomes)) &
-            (~df_base.index.isin(matched_by_cpf.index))
-        ] if nome_col else pd.DataFrame()
-
-        lista_emails = [em for em in df_lista["Email Normalizado"].unique() if em]
-        matched_by_email = df_base[
-            (df_base["Email Normalizado"].isin(lista_emails)) &
-            (~df_base.index.isin(matched_by_cpf.index)) &
-            (~df_base.index.isin(matched_by_nome.index))
-        ] if email_col else pd.DataFrame()
+            df_base = df_base.assign(**{"Status Normalizado": df_base[status_col].apply(normalize_str)})
+            ativo = df_base["Status Normalizado"] == "ATIVO"
+            inativos = df_base.loc[~ativo, key_cols]
+            df_base = df_base[ativo]
+        if df_ignorados is not None and len(df_ignorados):
+            def ignorados_col(col, fn):
+                if col and col in df_ignorados.columns:
+                    return df_ignorados[col].astype(str).apply(fn).values
+                return ""
+            inativos = pd.concat([inativos, pd.DataFrame({
+                "CPFdigits": ignorados_col(cpf_col, normalize_cpf),
+                "Nome Normalizado": ignorados_col(nome_col, normalize_str),
+                "Email Normalizado": ignorados_col(email_col, lambda v: v.strip().lower()),
+            }, index=range(len(df_ignorados)))], ignore_index=True)
+
+        def lista_chaves(col, fn):
+            if col not in df_lista.columns:
+                return []
+            return [v for v in fn(df_lista[col]).unique() if v]
+
+        lista_cpfs = lista_chaves("CPF", lambda s: s.apply(normalize_cpf))
+        # CPFs com dígitos verificadores errados não entram no match
+        cpf_ok = cpf_validos(lista_cpfs)
+        cpfs_invalidos = [cpf for cpf, ok in zip(lista_cpfs, cpf_ok) if not ok]
+        lista_cpfs = [cpf for cpf, ok in zip(lista_cpfs, cpf_ok) if ok]
+        lista_nomes = lista_chaves("NomeCompleto", lambda s: s.apply(normalize_str))
+        lista_emails = lista_chaves("Email", lambda s: s.astype(str).fillna("").str.strip().str.lower())
+
+        # Prioridade CPF > nome > e-mail: cada linha da base entra uma vez só,
+        # então as correspondências são deduplicadas pela posição da linha
+        sem_match = np.zeros(len(df_base), dtype=bool)
+        cpf_hit = _as_keys(df_base["CPFdigits"]).isin(lista_cpfs).to_numpy() if cpf_col else sem_match
+        nome_hit = (_as_keys(df_base["Nome Normalizado"]).isin(lista_nomes).to_numpy()
+                    if nome_col else sem_match) & ~cpf_hit
+        email_hit = (_as_keys(df_base["Email Normalizado"]).isin(lista_emails).to_numpy()
+                     if email_col else sem_match) & ~cpf_hit & ~nome_hit
+        posicoes = [np.flatnonzero(hit) for hit in (cpf_hit, nome_hit, email_hit)]
+        n_cpf, n_nome, n_email = (len(p) for p in posicoes)
 
         stats = {
-            "cpf_matches": len(matched_by_cpf),
-            "name_matches": len(matched_by_nome),
-            "email_matches": len(matched_by_email)
+            "cpf_matches": n_cpf,
+            "name_matches": n_nome,
+            "email_matches": n_email,
+            "inativos": _contar_inativos(inativos, lista_cpfs, lista_nomes, lista_emails),
+            "cpfs_invalidos": cpfs_invalidos,
+            "schema": schema.report(),
         }
 
-        # adicionar coluna temporária de match_type para auditoria
-        if not matched_by_cpf.empty:
-            matched_by_cpf = matched_by_cpf.copy()
-            matched_by_cpf["__match_type"] = "cpf"
-        if not matched_by_nome.empty:
-            matched_by_nome = matched_by_nome.copy()
-            matched_by_nome["__match_type"] = "nome"
-        if not matched_by_email.empty:
-            matched_by_email = matched_by_email.copy()
-            matched_by_email["__match_type"] = "email"
-
-        matched = pd.concat([matched_by_cpf, matched_by_nome, matched_by_email], ignore_index=True).drop_duplicates()
-        # normalizar índices para evitar problemas ao extrair colunas por posição
-        matched = matched.reset_index(drop=True)
+        # uma única seleção das linhas encontradas, com a coluna de auditoria match_type;
+        # bases compactas (categóricas) voltam a texto simples só nessas linhas
+        matched = df_base.take(np.concatenate(posicoes)).reset_index(drop=True)
+        matched = expandir_frame(matched.assign(**{
+            "__match_type": np.repeat(np.array(["cpf", "nome", "email"], dtype=object), [n_cpf, n_nome, n_email]),
+        }))
 
         if matched.empty:
             logger.warning("Nenhuma correspondência encontrada para inativação.")
@@ -391,135 +978,21 @@ def processar_inativacao_from_paths(df_base: pd.DataFrame, df_lista: pd.DataFram
             stats["inactive_matches"] = {}
             return pd.DataFrame(columns=MODEL_COLS), stats
 
-        out_df = pd.DataFrame(index=range(len(matched)), columns=MODEL_COLS)
-        out_df["Operacao"] = "DELETE"
-
-        def pick(df, *keys):
-            for k in keys:
-                if k in df.columns:
-                    return df[k].values
-            return [""] * len(df)
-
-        # Robust lookup by alias names (ignores spaces, underscores, case, and accents)
-        def _norm_key(s: str) -> str:
-            try:
-                return re.sub(r"[^A-Z0-9]", "", upper_no_accents(str(s)).upper())
-            except Exception:
-                return ""
-
-        def pick_by_alias(df, *aliases):
-            if df is None or df.empty:
-                return [""] * (0 if df is None else len(df))
-            alias_norms = [_norm_key(a) for a in aliases]
-            for col in df.columns:
-                nk = _norm_key(col)
-                for an in alias_norms:
-                    if an and (nk == an or an in nk):
-                        return df[col].values
-            return [""] * len(df)
-
-        out_df["UserId"] = pick(matched, "UserId")
-        out_df["Login"] = pick(matched, "Login", "UserName")
-        out_df["NomeCompleto"] = pick(matched, "NomeCompleto", "Nome Completo", nome_col)
-        out_df["Nome"] = pick(matched, "Nome")
-        out_df["SobreNome"] = pick(matched, "SobreNome")
-        out_df["Email"] = pick(matched, "Email")
-        out_df["Telefone"] = pick(matched, "Telefone")
-        out_df["Cargo"] = pick(matched, "Cargo")
-        out_df["Departamento"] = pick(matched, "Departamento")
-        out_df["Nivel"] = pick(matched, "Nivel")
-        out_df["NomeEmpresa"] = pick(matched, "Empresa")
-        #busca a empresa, centro de custo e descrição que estiver configurado no usuário.
-        out_df["CodigoCCustoEmpresa"] = pick(matched, "Codigo_Centro_de_Custo" , )
-        out_df["DescricaoCCustoEmpresa"] = pick(matched, "Centro_de_Custo")
-        out_df["ViajanteMasterNacional"] = pick(matched, "ViajanteMasterNacional")
-        out_df["ViajanteMasterInternacional"] = pick(matched, "ViajanteMasterInternacional")
-        out_df["EmpresaCCustoParaUsuario"] = "S"
-        out_df["Terceiro"] = pick(matched, "Terceiro")
-        out_df["CodigoIntegracao"] = "AUT"
-        out_df["Status"] = ""
-
-        # Valores padrão para campos que serão preenchidos com mapeamento booleano
-        bool_defaults = [
-            "Solicitante", "Vip","SolicitanteMaster", "MasterAdiantamento", "MasterReembolso",
-            ]
-        for c in ["Endereco", "Cidade", "Estado", "CEP"]:
-            out_df[c] = ""
-        for c in bool_defaults:
-            out_df[c] = "N"
-
-        # Preencher flags booleanas a partir das colunas reais na base (detecção robusta)
-        def find_real_col(target_name):
-            # procura por uma coluna cujo nome normalizado contenha target_name (ex: 'SOLICITANTE')
-            t = upper_no_accents(target_name).strip()
-            for k, v in col_map.items():
-                if t in k:
-                    return v
-            return None
-
-        bool_map = {"SIM": "S", "NAO": "N", "NÃO": "N", "S": "S", "N": "N", "TRUE": "S", "FALSE": "N"}
-        for logical_col in bool_defaults:
-            real_col = find_real_col(logical_col)
-            if real_col and real_col in matched.columns:
-                # Para 'Terceiro', priorizar dígitos se existirem; caso contrário mapear Sim/Não para S/N
-                if logical_col == 'Terceiro':
-                    def terceiro_map(v):
-                        d = extract_digits_only(v)
-                        if d:
-                            return d
-                        return bool_map.get(str(v).strip().upper(), "N")
-                    vals = matched[real_col].fillna("").astype(str).map(lambda x: terceiro_map(x))
-                    out_df[logical_col] = vals.values
-                else:
-                    # normalizar valores e mapear para S/N
-                    vals = matched[real_col].fillna("").astype(str).str.strip().str.upper().map(lambda x: bool_map.get(x, "N"))
-                    out_df[logical_col] = vals.values
-
-        # Para inativação, manter Nome e SobreNome exatamente como estão na base
-        # (não recalcular a partir de NomeCompleto), apenas garantir que colunas existam.
-        if "Nome" not in out_df.columns:
-            out_df["Nome"] = ""
-        if "SobreNome" not in out_df.columns:
-            out_df["SobreNome"] = ""
-
-        # Garantir NroMatricula preenchido a partir de 'Matricula' caso necessário e somente com dígitos
-        try:
-            nro_vals = pick_by_alias(matched, "NroMatricula", "Matricula")
-            out_df["NroMatricula"] = [extract_digits_only(v) for v in nro_vals]
-        except Exception:
-            out_df["NroMatricula"] = ""
-
-        out_df = out_df[MODEL_COLS]
-
-        # Padronizar: todos os campos em MAIÚSCULAS na ficha de saída (inativação)
-        for col in out_df.columns:
-            if out_df[col].dtype == object:
-                # garantir string, remover espaços nas bordas e aplicar upper; dígitos permanecem inalterados
-                out_df[col] = out_df[col].fillna("").astype(str).str.strip().str.upper()
+        # Nome e SobreNome saem exatamente como estão na base (não recalculados de NomeCompleto)
+        out_df = montar_saida(matched, plano_inativacao(schema), {
+            "Operacao": "DELETE", "EmpresaCCustoParaUsuario": "S", "CodigoIntegracao": "AUT",
+            "Solicitante": "N", "Vip": "N", "SolicitanteMaster": "N", "MasterAdiantamento": "N",
+            "MasterReembolso": "N",
+        })
 
         # Construir mapeamento de inactive_matches para o preview (listas de dicionários)
         inactive = {}
-        try:
-            if not matched_by_cpf.empty:
-                inactive['cpf'] = matched_by_cpf.fillna('').to_dict(orient='records')
-            else:
-                inactive['cpf'] = []
-        except Exception:
-            inactive['cpf'] = []
-        try:
-            if not matched_by_nome.empty:
-                inactive['nome'] = matched_by_nome.fillna('').to_dict(orient='records')
-            else:
-                inactive['nome'] = []
-        except Exception:
-            inactive['nome'] = []
-        try:
-            if not matched_by_email.empty:
-                inactive['email'] = matched_by_email.fillna('').to_dict(orient='records')
-            else:
-                inactive['email'] = []
-        except Exception:
-            inactive['email'] = []
+        limites = {"cpf": (0, n_cpf), "nome": (n_cpf, n_cpf + n_nome), "email": (n_cpf + n_nome, len(matched))}
+        for tipo, (inicio, fim) in limites.items():
+            try:
+                inactive[tipo] = matched.iloc[inicio:fim].fillna('').to_dict(orient='records')
+            except Exception:
+                inactive[tipo] = []
 
         stats['inactive_matches'] = inactive
         # total de matches combinados (fonte de verdade para contagem no preview)
@@ -528,14 +1001,13 @@ def processar_inativacao_from_paths(df_base: pd.DataFrame, df_lista: pd.DataFram
         except Exception:
             stats['total_matches'] = sum(len(v) for v in inactive.values() if isinstance(v, list))
 
-        logger.info(
-            f"Inativação concluída. Linhas encontradas: {out_df.shape[0]} (CPF={stats['cpf_matches']}, Nome={stats['name_matches']}, Email={stats['email_matches']})"
-        )
+        logger.info("Inativação concluída. Linhas encontradas: %d (CPF=%d, Nome=%d, Email=%d)", out_df.shape[0],
+                    stats['cpf_matches'], stats['name_matches'], stats['email_matches'])
 
         return out_df, stats
 
     except Exception as e:
-        logger.error(f"Erro em processar_inativacao_from_paths: {e}")
+        logger.error("Erro em processar_inativacao_from_paths: %s", e)
         # garantir que stats sempre tenha total_matches válido mesmo em caso de erro
         error_stats = {"error": str(e), "cpf_matches": 0, "name_matches": 0, "total_matches": 0, "inactive_matches": {}}
         return pd.DataFrame(columns=MODEL_COLS), error_stats
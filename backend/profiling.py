@@ -0,0 +1,159 @@
+# backend/profiling.py
+"""Perfil de planilhas grandes no servidor (aba Análise).
+
+`perfilar_frame` resume cada coluna em passadas vetorizadas (preenchidos,
+distintos, valores mais frequentes) e, nas colunas de CPF e e-mail
+reconhecidas pelo esquema "base", a validade e as duplicidades.
+
+A planilha lida fica guardada em disco (`PerfilStore`) sob um token, para
+que a interface percorra janelas de linhas sem reenviar o arquivo.
+"""
+import os
+import re
+import time
+import uuid
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .core.config import settings
+from .core.logging import get_logger
+from .schema import resolve_columns
+from .utils import cpf_validos
+
+logger = get_logger()
+
+TOP_VALUES = 10
+_EMAIL_RE = r"[^@\s]+@[^@\s]+\.[^@\s]+"
+_TOKEN_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+def _texto(series: pd.Series) -> pd.Series:
+    """Coluna como texto sem espaços nas bordas (bases compactas incluídas)."""
+    return series.astype(str).str.strip()
+
+
+def _top(values: pd.Series, k: int = TOP_VALUES) -> list:
+    counts = values.value_counts(sort=True).head(k)
+    return [{"valor": str(v), "qtd": int(c)} for v, c in counts.items()]
+
+
+def _duplicados(keys: pd.Series) -> dict:
+    """Linhas cujo valor se repete e os valores mais repetidos."""
+    dup = keys.duplicated(keep=False)
+    repeated = keys[dup]
+    return {"linhas": int(dup.sum()), "valores": int(repeated.nunique()), "top": _top(repeated)}
+
+
+def perfil_cpf(series: pd.Series) -> dict:
+    texto = _texto(series)
+    preenchido = texto != ""
+    digits = texto[preenchido].str.replace(r"[^0-9]", "", regex=True)
+    onze = digits.str.len() == 11
+    validos = cpf_validos(digits[onze])
+    return {
+        "preenchidos": int(preenchido.sum()),
+        "tamanho_invalido": int((~onze).sum()),
+        "digito_invalido": int((~validos).sum()),
+        "validos": int(validos.sum()),
+        "duplicados": _duplicados(digits[onze]),
+    }
+
+
+def perfil_email(series: pd.Series) -> dict:
+    texto = _texto(series).str.lower()
+    preenchido = texto[texto != ""]
+    valido = preenchido.str.fullmatch(_EMAIL_RE)
+    return {
+        "preenchidos": int(len(preenchido)),
+        "validos": int(valido.sum()),
+        "invalidos": int((~valido).sum()),
+        "exemplos_invalidos": preenchido[~valido].head(TOP_VALUES).tolist(),
+        "duplicados": _duplicados(preenchido),
+    }
+
+
+def perfilar_frame(df: pd.DataFrame, top: int = TOP_VALUES) -> dict:
+    """Perfil por coluna: preenchidos, distintos, valores mais frequentes e checagens de CPF/e-mail."""
+    schema = resolve_columns(df.columns, "base")
+    colunas = []
+    for col in df.columns:
+        texto = _texto(df[col])
+        preenchidos = texto[texto != ""]
+        colunas.append({
+            "coluna": str(col),
+            "preenchidos": int(len(preenchidos)),
+            "vazios": int(len(texto) - len(preenchidos)),
+            "distintos": int(preenchidos.nunique()),
+            "top": _top(preenchidos, top),
+        })
+    perfil = {"linhas": int(len(df)), "colunas": colunas}
+    cpf_col, email_col = schema.get("cpf"), schema.get("email")
+    if cpf_col:
+        perfil["cpf"] = {"coluna": str(cpf_col), **perfil_cpf(df[cpf_col])}
+    if email_col:
+        perfil["email"] = {"coluna": str(email_col), **perfil_email(df[email_col])}
+    return perfil
+
+
+def janela_linhas(df: pd.DataFrame, offset: int = 0, limit: int = 100, busca: str = "") -> dict:
+    """Janela [offset, offset+limit) das linhas, opcionalmente só as que contêm `busca` em alguma coluna."""
+    total = len(df)
+    if busca:
+        mask = np.zeros(len(df), dtype=bool)
+        for col in df.columns:
+            mask |= df[col].astype(str).str.contains(busca, case=False, regex=False).to_numpy(dtype=bool)
+        df = df[mask]
+    window = df.iloc[offset:offset + limit]
+    return {
+        "offset": offset,
+        "limit": limit,
+        "total": int(len(df)),
+        "total_planilha": int(total),
+        "colunas": [str(c) for c in df.columns],
+        "linhas": window.astype(str).values.tolist(),
+    }
+
+
+class PerfilStore:
+    """Planilhas perfiladas guardadas em disco (pickle) por token, com expiração."""
+
+    def __init__(self, folder: Optional[str] = None, ttl: Optional[int] = None):
+        self.folder = folder or settings.ANALISE_FOLDER
+        self.ttl = settings.ANALISE_TTL if ttl is None else ttl
+
+    def _path(self, token: str) -> str:
+        if not _TOKEN_RE.match(token or ""):
+            raise ValueError("Token de análise inválido.")
+        return os.path.join(self.folder, f"{token}.pkl")
+
+    def save(self, df: pd.DataFrame) -> str:
+        os.makedirs(self.folder, exist_ok=True)
+        self.purge()
+        token = uuid.uuid4().hex
+        df.to_pickle(self._path(token))
+        return token
+
+    def load(self, token: str) -> pd.DataFrame:
+        path = self._path(token)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                raise FileNotFoundError(path)
+            return pd.read_pickle(path)
+        except FileNotFoundError:
+            raise ValueError("Análise expirada ou inexistente; envie o arquivo novamente.")
+
+    def purge(self) -> None:
+        expired_before = time.time() - self.ttl
+        for name in os.listdir(self.folder):
+            path = os.path.join(self.folder, name)
+            try:
+                if name.endswith(".pkl") and os.path.getmtime(path) < expired_before:
+                    os.remove(path)
+            except OSError:
+                logger.warning("Falha ao remover análise expirada %s", name)
+
+
+perfil_store = PerfilStore()
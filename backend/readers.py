@@ -0,0 +1,683 @@
+# backend/readers.py
+"""Leitura de planilhas de entrada (cadastro, inativação, bases).
+
+Centraliza a detecção da linha de cabeçalho (planilhas de clientes costumam
+ter um título nas primeiras linhas) e a remoção de cabeçalhos repetidos.
+
+`ler_planilha_filtrada` lê .xlsx em streaming aplicando um filtro de linhas
+e uma projeção de colunas durante a leitura: linhas recusadas e colunas não
+usadas nunca chegam a virar DataFrame.
+
+Além do Excel são aceitos CSV/TSV (também comprimidos com gzip) e Parquet,
+com a mesma semântica: tudo é lido como texto, com o cabeçalho detectado e
+os cabeçalhos repetidos removidos. Em CSV/TSV a codificação (UTF-8, com ou
+sem BOM, ou Windows-1252) e o separador (`,` `;` tab `|`) são detectados
+numa amostra do início do arquivo, e os dados são lidos em blocos de
+`CSV_CHUNK_ROWS` linhas.
+
+`ler_abas` lê várias abas da mesma pasta de trabalho (todas, por nome ou por
+padrão) em paralelo e as junta, unificando as colunas pelo esquema e
+marcando a aba de origem de cada linha. Os processos de leitura são criados
+uma vez por processo do servidor e reaproveitados entre requisições.
+
+Bases grandes podem ser mantidas em memória em formato compacto
+(`compactar_frame`): os valores continuam sendo textos para quem os lê
+(`.astype(str)`, `.str`, comparações), mas ocupam uma fração da memória.
+
+Os frames são processados com Copy-on-Write (padrão no pandas 3; ativado
+aqui nas versões anteriores): filtros, `assign` e cópias rasas compartilham
+os dados com o frame de origem até que uma coluna seja alterada, e o
+processamento não faz cópias defensivas.
+"""
+import codecs
+import csv
+import fnmatch
+import gzip
+import html
+import io
+import itertools
+import multiprocessing
+import os
+import re
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas._libs.parsers import STR_NA_VALUES
+
+from .core.config import settings
+from .schema import resolve_columns
+from .utils import upper_no_accents
+
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+# Quantidade de linhas iniciais inspecionadas para achar o cabeçalho real
+HEADER_SAMPLE_ROWS = 15
+
+# Formatos aceitos além do Excel (CSV/TSV, opcionalmente com gzip, e Parquet)
+EXTENSOES_TEXTO = (".csv", ".tsv", ".csv.gz", ".tsv.gz")
+EXTENSOES_PARQUET = (".parquet",)
+# Linhas por bloco na leitura de CSV/TSV
+CSV_CHUNK_ROWS = 100_000
+# Início do arquivo usado para detectar codificação, separador e cabeçalho
+_AMOSTRA_BYTES = 256 * 1024
+_SEPARADORES = ",;\t|"
+_CODIFICACOES = ("utf-8-sig", "cp1252", "latin-1")
+# Nome da única "aba" de arquivos sem abas (CSV/TSV/Parquet), para `abas`
+ABA_UNICA = "Dados"
+
+# Nomes de coluna conhecidos (normalizados: sem acento, só A-Z0-9)
+_KNOWN_HEADER_TOKENS = ("CPF", "EMAIL", "NOME", "STATUS", "LOGIN", "USERID", "MATRICULA",
+                        "EMPRESA", "CENTRODECUSTO", "CARGO", "DEPARTAMENTO", "APROVACAO")
+
+
+def _header_key(value) -> str:
+    return re.sub(r"[^A-Z0-9]", "", upper_no_accents(value))
+
+
+def _header_score(values) -> tuple:
+    """(células com cara de cabeçalho, células preenchidas) de uma linha."""
+    keys = [_header_key(v) for v in values if str(v).strip() and str(v).lower() != "nan"]
+    known = sum(1 for k in keys if any(tok in k for tok in _KNOWN_HEADER_TOKENS))
+    return known, len(keys)
+
+
+def detectar_linha_cabecalho(sample: pd.DataFrame) -> int:
+    """Índice (0-based) da linha que contém o cabeçalho real em `sample`.
+
+    `sample` são as primeiras linhas lidas com `header=None`. Vence a linha com
+    mais nomes de coluna conhecidos; sem nenhum reconhecido, assume a linha 0.
+    """
+    best_row, best_score = 0, (0, 0)
+    for pos, row in enumerate(sample.itertuples(index=False, name=None)):
+        score = _header_score(row)
+        if score > best_score:
+            best_row, best_score = pos, score
+    return best_row if best_score[0] > 0 else 0
+
+
+def drop_header_like_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """Remove linhas que parecem ser cabeçalhos repetidos dentro do arquivo Excel.
+
+    Uma linha é cabeçalho quando mais de 40% das células repetem o nome da
+    própria coluna. A comparação é feita coluna a coluna; linhas que já não
+    conseguem atingir o limite deixam de ser avaliadas nas colunas seguintes.
+    """
+    if df.empty:
+        return df
+    cols = list(df.columns)
+    limit = 0.4 * max(1, len(cols))
+    matches = np.zeros(len(df), dtype=np.int32)
+    candidates = np.arange(len(df))
+    for pos, c in enumerate(cols):
+        remaining = len(cols) - pos
+        candidates = candidates[matches[candidates] + remaining > limit]
+        if candidates.size == 0:
+            break
+        values = df[c] if candidates.size == len(df) else df[c].iloc[candidates]
+        hit = values.astype(str).str.strip().str.upper().eq(str(c).upper()).to_numpy()
+        matches[candidates[hit]] += 1
+    is_header = matches > limit
+    if not is_header.any():
+        return df
+    return df[~is_header]
+
+
+def _arrow_string_dtype():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None
+    return pd.StringDtype("pyarrow")
+
+
+# Colunas S/N viram categorias fixas (códigos int8, 1 byte por linha)
+FLAG_CATEGORIES = ["", "N", "S"]
+# Colunas com poucos valores distintos (Status, Empresa, Cargo...) viram categóricas
+LOW_CARDINALITY_RATIO = 0.05
+LOW_CARDINALITY_MAX = 5000
+
+
+def compactar_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Converte colunas de texto para representações compactas, preservando os valores.
+
+    - flags S/N: categórica com categorias fixas ["", "N", "S"];
+    - baixa cardinalidade: categórica;
+    - texto livre (nomes, e-mails, CPFs): string Arrow, quando o pyarrow está instalado.
+    """
+    if df.empty:
+        return df
+    arrow_str = _arrow_string_dtype()
+    limit = min(LOW_CARDINALITY_MAX, max(2, int(len(df) * LOW_CARDINALITY_RATIO)))
+    converted = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        uniques = series.unique()
+        if len(uniques) <= len(FLAG_CATEGORIES) and set(uniques) <= set(FLAG_CATEGORIES):
+            converted[col] = pd.Categorical(series, categories=FLAG_CATEGORIES)
+        elif len(uniques) <= limit:
+            converted[col] = series.astype("category")
+        elif arrow_str is not None and series.dtype != arrow_str:
+            converted[col] = series.astype(arrow_str)
+    if not converted:
+        return df
+    out = df.copy(deep=False)
+    for col, values in converted.items():
+        out[col] = values
+    return out
+
+
+def expandir_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Volta um frame compactado ao contrato de saída: colunas de texto simples, sem nulos."""
+    converted = {
+        col: df[col].astype(str).where(df[col].notna(), "")
+        for col in df.columns
+        if isinstance(df[col].dtype, pd.CategoricalDtype)
+    }
+    if not converted:
+        return df
+    # cópia rasa: com Copy-on-Write as demais colunas continuam compartilhadas
+    out = df.copy(deep=False)
+    for col, values in converted.items():
+        out[col] = values
+    return out
+
+
+def memoria_frame(df: pd.DataFrame) -> int:
+    """Memória ocupada pelo frame (bytes, incluindo o conteúdo dos textos)."""
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+# ==========================================================
+# Formatos de entrada (Excel, CSV/TSV, Parquet)
+# ==========================================================
+def formato_entrada(path: str) -> str:
+    """'xlsx', 'texto' (CSV/TSV, com ou sem gzip), 'parquet' ou 'excel' (demais, ex.: .xls)."""
+    nome = str(path).lower()
+    if nome.endswith(".xlsx"):
+        return "xlsx"
+    if nome.endswith(EXTENSOES_TEXTO):
+        return "texto"
+    if nome.endswith(EXTENSOES_PARQUET):
+        return "parquet"
+    return "excel"
+
+
+def _dialeto_texto(path: str) -> Tuple[str, str, str]:
+    """(codificação, separador, amostra decodificada) de um CSV/TSV."""
+    nome = str(path).lower()
+    with (gzip.open(path, "rb") if nome.endswith(".gz") else open(path, "rb")) as f:
+        raw = f.read(_AMOSTRA_BYTES)
+    for encoding in _CODIFICACOES:
+        try:
+            # decodificador incremental: um caractere cortado no fim da amostra não é erro
+            amostra = codecs.getincrementaldecoder(encoding)().decode(raw, final=False)
+            break
+        except UnicodeDecodeError:
+            continue
+    if nome.endswith((".tsv", ".tsv.gz")):
+        return encoding, "\t", amostra
+    linhas = "\n".join(amostra.splitlines()[:50])
+    try:
+        sep = csv.Sniffer().sniff(linhas, delimiters=_SEPARADORES).delimiter
+    except csv.Error:
+        contagens = {c: linhas.count(c) for c in _SEPARADORES}
+        sep = max(contagens, key=contagens.get) if any(contagens.values()) else ","
+    return encoding, sep, amostra
+
+
+def cabecalho_amostra(rows: List[list], detectar: bool = True) -> Tuple[List, int]:
+    """(nomes das colunas, índice da linha de cabeçalho) das primeiras linhas de uma tabela.
+
+    A largura é a da parte preenchida da amostra, como o Excel ignora colunas
+    vazias à direita.
+    """
+    if not rows:
+        return [], 0
+    header_row = 0
+    if detectar:
+        width = max(len(r) for r in rows)
+        header_row = detectar_linha_cabecalho(pd.DataFrame([list(r) + [""] * (width - len(r)) for r in rows]))
+    usados = max(_largura_util(r) for r in rows[header_row:])
+    header = list(rows[header_row][:usados])
+    return _nomes_colunas(header + [None] * (usados - len(header))), header_row
+
+
+def _cabecalho_texto(amostra: str, sep: str, sample_rows: int, detectar: bool = True) -> Tuple[List, int]:
+    """(nomes das colunas, linhas do arquivo até o fim do cabeçalho) a partir da amostra."""
+    reader = csv.reader(io.StringIO(amostra), delimiter=sep)
+    rows, fim_linha = [], []
+    for row in itertools.islice(reader, sample_rows):
+        rows.append(row)
+        fim_linha.append(reader.line_num)
+    if not rows:
+        return [], 0
+    names, header_row = cabecalho_amostra(rows, detectar)
+    return names, fim_linha[header_row]
+
+
+def _blocos_texto(path: str, sample_rows: int = HEADER_SAMPLE_ROWS, detectar: bool = True):
+    """Gera o CSV/TSV em blocos de `CSV_CHUNK_ROWS` linhas, como texto e sem nulos.
+
+    O índice continua de um bloco para o outro (o mesmo de uma leitura única).
+    """
+    encoding, sep, amostra = _dialeto_texto(path)
+    header, pular = _cabecalho_texto(amostra, sep, sample_rows, detectar)
+    if not header:
+        yield pd.DataFrame()
+        return
+    leitor = pd.read_csv(path, sep=sep, encoding=encoding, header=None, names=header,
+                         usecols=range(len(header)), skiprows=pular, dtype=str, index_col=False,
+                         compression="gzip" if str(path).lower().endswith(".gz") else None,
+                         chunksize=CSV_CHUNK_ROWS)
+    try:
+        with leitor:
+            vazio = True
+            for bloco in leitor:
+                vazio = False
+                yield bloco.fillna("")
+            if vazio:
+                yield pd.DataFrame({c: pd.Series(dtype=str) for c in header})
+    except UnicodeDecodeError as exc:
+        raise ValueError(f"Codificação do arquivo não reconhecida (lido como {encoding}): {exc}") from exc
+
+
+def _ler_parquet(path: str) -> pd.DataFrame:
+    """Parquet como texto, com as mesmas conversões de célula da leitura do Excel."""
+    df = pd.read_parquet(path)
+    colunas = {}
+    for col in df.columns:
+        serie = df[col]
+        if isinstance(serie.dtype, pd.StringDtype):
+            texto = serie.fillna("")
+            colunas[str(col)] = texto.mask(texto.isin(STR_NA_VALUES), "")
+        else:
+            colunas[str(col)] = serie.astype(object).map(_texto_celula).astype(str)
+    return pd.DataFrame(colunas, index=df.index)
+
+
+def ler_tabela(path: str) -> pd.DataFrame:
+    """Primeira aba (ou o arquivo CSV/TSV/Parquet) como texto, com cabeçalho na
+    primeira linha e sem outras limpezas, como `pd.read_excel(dtype=str).fillna("")`."""
+    formato = formato_entrada(path)
+    if formato == "texto":
+        return pd.concat(list(_blocos_texto(path, detectar=False)))
+    if formato == "parquet":
+        return _ler_parquet(path)
+    return pd.read_excel(path, dtype=str).fillna("")
+
+
+def ler_planilha(path: str, sample_rows: int = HEADER_SAMPLE_ROWS, compacto: bool = False,
+                 aba=0) -> pd.DataFrame:
+    """Lê uma aba (padrão: a primeira) como texto, localizando o cabeçalho e removendo cabeçalhos repetidos.
+
+    CSV/TSV e Parquet não têm abas (`aba` é ignorado). Com `compacto=True` o
+    resultado passa por `compactar_frame` (bases grandes).
+    """
+    formato = formato_entrada(path)
+    if formato == "texto":
+        df = pd.concat([drop_header_like_rows(b) for b in _blocos_texto(path, sample_rows)])
+    elif formato == "parquet":
+        df = drop_header_like_rows(_ler_parquet(path))
+    else:
+        sample = pd.read_excel(path, sheet_name=aba, header=None, nrows=sample_rows, dtype=str)
+        header_row = detectar_linha_cabecalho(sample)
+        df = pd.read_excel(path, sheet_name=aba, dtype=str, header=header_row).fillna("")
+        df = drop_header_like_rows(df)
+    return compactar_frame(df) if compacto else df
+
+
+# Um filtro recebe o cabeçalho e devolve (coluna, predicado sobre o texto da célula) ou None
+FiltroLinhas = Callable[[List], Optional[Tuple[object, Callable[[str], bool]]]]
+# Uma projeção recebe o cabeçalho e devolve as colunas a manter (None = todas)
+ProjecaoColunas = Callable[[List], Optional[List]]
+
+
+def _texto_celula(value) -> str:
+    """Texto de uma célula como `pd.read_excel(dtype=str).fillna("")` o produziria."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, (int, float)):
+        if isinstance(value, float) and value != value:
+            return ""
+        as_int = int(value) if isinstance(value, int) or value.is_integer() else None
+        return str(as_int) if as_int is not None else str(value)
+    text = str(value)
+    return "" if text in STR_NA_VALUES else text
+
+
+def _largura_util(row) -> int:
+    """Posição da última célula preenchida da linha (0 = linha em branco)."""
+    last = len(row)
+    while last and (row[last - 1] is None or row[last - 1] == ""):
+        last -= 1
+    return last
+
+
+def _nomes_colunas(header: list) -> list:
+    """Nomes das colunas a partir da linha de cabeçalho, com as regras do pandas
+    (vazias viram 'Unnamed: i'; repetidas recebem sufixo '.1', '.2'...)."""
+    names = []
+    for i, value in enumerate(header):
+        if value is None or value == "":
+            names.append(f"Unnamed: {i}")
+        elif isinstance(value, float) and value.is_integer():
+            names.append(int(value))
+        else:
+            names.append(value)
+    counts = {}
+    for i, col in enumerate(names):
+        cur = counts.get(col, 0)
+        while cur > 0:
+            counts[col] = cur + 1
+            col = f"{col}.{cur}"
+            cur = counts.get(col, 0)
+        names[i] = col
+        counts[col] = cur + 1
+    return names
+
+
+def _aplicar_filtro_frame(df: pd.DataFrame, filtro: Optional[FiltroLinhas],
+                          colunas: Optional[ProjecaoColunas],
+                          colunas_ignoradas: Optional[ProjecaoColunas],
+                          descartar: Optional[np.ndarray] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Mesma semântica de `ler_planilha_filtrada` sobre um frame já lido (.xls).
+
+    `descartar` marca linhas que saem das mantidas sem contar como ignoradas
+    (cabeçalhos repetidos, quando o frame ainda os contém).
+    """
+    header = list(df.columns)
+    regra = filtro(header) if filtro else None
+    keep = (df[regra[0]].astype(str).map(regra[1]).to_numpy(dtype=bool) if regra
+            else np.ones(len(df), dtype=bool))
+    ignoradas = [c for c in (colunas_ignoradas(header) if colunas_ignoradas else None) or [] if c in df.columns]
+    skipped = df.loc[~keep, ignoradas].reset_index(drop=True)
+    if descartar is not None:
+        keep = keep & ~descartar
+    selecionadas = colunas(header) if colunas else None
+    kept = df[keep] if selecionadas is None else df.loc[keep, [c for c in header if c in selecionadas]]
+    return kept.reset_index(drop=True), skipped
+
+
+def ler_planilha_filtrada(path: str, filtro: Optional[FiltroLinhas] = None,
+                          colunas: Optional[ProjecaoColunas] = None,
+                          colunas_ignoradas: Optional[ProjecaoColunas] = None,
+                          sample_rows: int = HEADER_SAMPLE_ROWS,
+                          compacto: bool = False, aba=0) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Lê uma aba como `ler_planilha`, filtrando linhas e colunas durante a leitura.
+
+    `filtro`, `colunas` e `colunas_ignoradas` recebem o cabeçalho detectado:
+    - `filtro` devolve (coluna, predicado); só as linhas cujo texto na coluna
+      satisfaz o predicado são mantidas;
+    - `colunas` devolve as colunas materializadas para as linhas mantidas;
+    - `colunas_ignoradas` devolve as colunas guardadas das linhas recusadas
+      (para contagens e diagnósticos).
+
+    Retorna (df, df_ignoradas), ambos com índice 0..n-1. .xlsx é lido em
+    streaming (openpyxl read-only) e CSV/TSV bloco a bloco; outros formatos
+    são lidos inteiros e filtrados em seguida.
+    """
+    formato = formato_entrada(path)
+    if formato == "texto":
+        # como no streaming do .xlsx: o filtro vê todas as linhas e os cabeçalhos
+        # repetidos só saem das mantidas
+        partes = [_aplicar_filtro_frame(b, filtro, colunas, colunas_ignoradas,
+                                        descartar=~b.index.isin(drop_header_like_rows(b).index))
+                  for b in _blocos_texto(path, sample_rows)]
+        kept = pd.concat([k for k, _ in partes], ignore_index=True)
+        skipped = pd.concat([s for _, s in partes], ignore_index=True)
+        return (compactar_frame(kept) if compacto else kept), skipped
+    if formato != "xlsx":
+        df = ler_planilha(path, sample_rows=sample_rows, aba=aba)
+        kept, skipped = _aplicar_filtro_frame(df, filtro, colunas, colunas_ignoradas)
+        return (compactar_frame(kept) if compacto else kept), skipped
+
+    import openpyxl
+
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[aba] if isinstance(aba, str) else wb.worksheets[aba]
+        rows = ws.iter_rows(values_only=True)
+        head = list(itertools.islice(rows, sample_rows))
+        if not head:
+            return pd.DataFrame(), pd.DataFrame()
+        header_row = detectar_linha_cabecalho(pd.DataFrame([[_texto_celula(v) for v in r] for r in head]))
+        width = max(len(r) for r in head)
+        header = _nomes_colunas(list(head[header_row]) + [None] * (width - len(head[header_row])))
+        header_upper = [str(c).upper() for c in header]
+
+        regra = filtro(header) if filtro else None
+        test_pos = header.index(regra[0]) if regra and regra[0] in header else None
+        predicate = regra[1] if test_pos is not None else None
+        selecionadas = colunas(header) if colunas else None
+        keep_pos = [i for i, c in enumerate(header) if selecionadas is None or c in selecionadas]
+        ignoradas = (colunas_ignoradas(header) if colunas_ignoradas else None) or []
+        skip_pos = [i for i, c in enumerate(header) if c in ignoradas]
+
+        kept = [[] for _ in keep_pos]
+        skipped = [[] for _ in skip_pos]
+        # células que repetem o nome da coluna, por linha mantida (cabeçalhos repetidos)
+        header_hits = []
+        n_skipped = 0
+        # largura real da planilha: o pandas ignora colunas vazias à direita
+        used_width = 0
+        for r in head[:header_row + 1]:
+            used_width = max(used_width, _largura_util(r))
+        # linhas em branco só contam se houver dados depois delas (as finais são descartadas)
+        pending_blank = 0
+
+        for row in itertools.chain(head[header_row + 1:], rows):
+            last = _largura_util(row)
+            if not last:
+                pending_blank += 1
+                continue
+            used_width = max(used_width, last)
+            for _ in range(pending_blank):
+                if predicate is None or predicate(""):
+                    for values in kept:
+                        values.append("")
+                    header_hits.append(0)
+                else:
+                    n_skipped += 1
+                    for values in skipped:
+                        values.append("")
+            pending_blank = 0
+
+            if predicate is not None and not predicate(_texto_celula(row[test_pos]) if test_pos < last else ""):
+                n_skipped += 1
+                for values, pos in zip(skipped, skip_pos):
+                    values.append(_texto_celula(row[pos]) if pos < last else "")
+                continue
+            texts = [_texto_celula(v) for v in row[:min(last, width)]]
+            for values, pos in zip(kept, keep_pos):
+                values.append(texts[pos] if pos < len(texts) else "")
+            header_hits.append(sum(1 for t, h in zip(texts, header_upper) if t and t.strip().upper() == h))
+    finally:
+        wb.close()
+
+    n_cols = min(used_width, width)
+    df = pd.DataFrame({header[pos]: values for pos, values in zip(keep_pos, kept) if pos < n_cols},
+                      index=range(len(header_hits)), dtype=str)
+    is_header = np.asarray(header_hits, dtype=np.int32) > 0.4 * max(1, n_cols)
+    if is_header.any():
+        df = df[~is_header].reset_index(drop=True)
+    df_skipped = pd.DataFrame({header[pos]: values for pos, values in zip(skip_pos, skipped) if pos < n_cols},
+                              index=range(n_skipped), dtype=str)
+    return (compactar_frame(df) if compacto else df), df_skipped
+
+
+# ==========================================================
+# Várias abas (`ler_abas`)
+# ==========================================================
+# Coluna acrescentada com o nome da aba de origem de cada linha
+COLUNA_ABA = "AbaOrigem"
+
+_SHEET_RE = re.compile(r'<sheet\b[^>]*\bname="([^"]*)"')
+
+
+def listar_abas(path: str) -> List[str]:
+    """Nomes das abas na ordem da pasta de trabalho (.xlsx sem abrir as planilhas).
+
+    CSV/TSV e Parquet têm uma aba só, `ABA_UNICA`.
+    """
+    formato = formato_entrada(path)
+    if formato in ("texto", "parquet"):
+        return [ABA_UNICA]
+    if formato == "xlsx":
+        with zipfile.ZipFile(path) as zf:
+            workbook = zf.read("xl/workbook.xml").decode("utf-8")
+        return [html.unescape(name) for name in _SHEET_RE.findall(workbook)]
+    with pd.ExcelFile(path) as xls:
+        return [str(name) for name in xls.sheet_names]
+
+
+def selecionar_abas(nomes: List[str], spec: Optional[str]) -> List[str]:
+    """Abas escolhidas por `spec`: vazio = a primeira; "*" ou "todas" = todas;
+    senão nomes e/ou padrões (`Empresa*`) separados por vírgula, sem distinguir maiúsculas.
+    """
+    spec = (spec or "").strip()
+    if not spec:
+        return nomes[:1]
+    if spec.lower() in ("*", "todas"):
+        return list(nomes)
+    escolhidas = set()
+    for token in (t.strip() for t in spec.split(",")):
+        if not token:
+            continue
+        achadas = [n for n in nomes if fnmatch.fnmatchcase(n.strip().lower(), token.lower())]
+        if not achadas:
+            raise ValueError(f"Aba não encontrada: '{token}'. Abas disponíveis: {', '.join(nomes)}")
+        escolhidas.update(achadas)
+    return [n for n in nomes if n in escolhidas]
+
+
+def _ler_aba(path: str, aba: str, filtro, colunas, colunas_ignoradas) -> tuple:
+    t0 = time.perf_counter()
+    if filtro or colunas or colunas_ignoradas:
+        df, ignoradas = ler_planilha_filtrada(path, filtro=filtro, colunas=colunas,
+                                              colunas_ignoradas=colunas_ignoradas, aba=aba)
+    else:
+        df, ignoradas = ler_planilha(path, aba=aba), None
+    return df, ignoradas, time.perf_counter() - t0
+
+
+def _unificar_colunas(frames: List[pd.DataFrame], schema: str) -> List[pd.DataFrame]:
+    """Renomeia, em cada aba, as colunas reconhecidas pelo esquema para o nome usado
+    na primeira aba em que o campo aparece (ex.: "E-mail" e "Email" viram uma coluna só)."""
+    nomes = {}
+    unificados = []
+    for df in frames:
+        mapping = {}
+        for campo, col in resolve_columns(df.columns, schema).fields.items():
+            alvo = nomes.setdefault(campo, col)
+            if col != alvo and alvo not in df.columns:
+                mapping[col] = alvo
+        unificados.append(df.rename(columns=mapping) if mapping else df)
+    return unificados
+
+
+def _juntar(frames: List[pd.DataFrame], abas: List[str]) -> pd.DataFrame:
+    tagged = [df.assign(**{COLUNA_ABA: aba}) for df, aba in zip(frames, abas)]
+    return pd.concat(tagged, ignore_index=True).fillna("") if tagged else pd.DataFrame()
+
+
+def _contexto_processos():
+    """Contexto dos processos de leitura das abas.
+
+    `forkserver` onde existe (Linux): o processo do servidor é multi-thread
+    (listener do log, servidor de desenvolvimento) e um fork direto pode herdar
+    um lock travado. Nos demais sistemas (Windows, macOS) vale o padrão da
+    plataforma (`spawn`). `_ler_aba` e os filtros/projeções são funções de
+    módulo, então são enviados aos processos por pickle.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        # Sem pré-carga no forkserver (o padrão pré-carrega o __main__): importar
+        # o pandas lá cria threads (Arrow, BLAS) e os processos criados por ele
+        # herdariam locks travados
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload([])
+        return ctx
+    return multiprocessing.get_context()
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def _max_workers_abas() -> int:
+    # Leitura é CPU-bound: processos além dos núcleos só somam custo de processo e pickle
+    return max(1, min(settings.SHEET_WORKERS, os.cpu_count() or 1))
+
+
+def _pool_abas() -> ProcessPoolExecutor:
+    """Pool de leitura das abas, criado na primeira leitura de cada processo e reaproveitado.
+
+    Um pool herdado por fork (worker do gunicorn) não serve ao filho: o pid
+    de quem o criou é conferido e, se for outro, um novo pool é criado.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=_max_workers_abas(), mp_context=_contexto_processos())
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _descartar_pool_abas() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def ler_abas(path: str, abas: Optional[str] = None, schema: str = "base",
+             filtro: Optional[FiltroLinhas] = None, colunas: Optional[ProjecaoColunas] = None,
+             colunas_ignoradas: Optional[ProjecaoColunas] = None,
+             compacto: bool = False) -> Tuple[pd.DataFrame, Optional[pd.DataFrame], List[dict]]:
+    """Lê as abas escolhidas por `abas` (ver `selecionar_abas`) e as junta num frame só.
+
+    Sem `abas`, equivale a `ler_planilha` / `ler_planilha_filtrada` da primeira
+    aba. Com várias abas, cada uma é lida em paralelo (pool de processos
+    reaproveitado, até `SHEET_WORKERS` e o número de núcleos), as colunas são
+    unificadas pelo esquema `schema` e cada linha recebe a aba de origem em
+    `COLUNA_ABA`.
+
+    Retorna (df, df_ignoradas, tempos); `df_ignoradas` só existe com filtro ou
+    projeção, e `tempos` traz {"aba", "linhas", "segundos"} de cada aba lida.
+    """
+    if not (abas or "").strip():
+        df, ignoradas, elapsed = _ler_aba(path, 0, filtro, colunas, colunas_ignoradas)
+        tempos = [{"aba": None, "linhas": int(len(df)), "segundos": round(elapsed, 3)}]
+        return (compactar_frame(df) if compacto else df), ignoradas, tempos
+
+    nomes = selecionar_abas(listar_abas(path), abas)
+    args = [(path, nome, filtro, colunas, colunas_ignoradas) for nome in nomes]
+    lidas = None
+    if min(len(nomes), _max_workers_abas()) > 1:
+        try:
+            lidas = list(_pool_abas().map(_ler_aba, *zip(*args)))
+        except BrokenProcessPool:
+            # um processo morreu (ex.: OOM): o pool é recriado na próxima leitura
+            _descartar_pool_abas()
+    if lidas is None:
+        lidas = [_ler_aba(*a) for a in args]
+
+    frames = _unificar_colunas([df for df, _, _ in lidas], schema)
+    df = _juntar(frames, nomes)
+    ignoradas = None
+    if any(ign is not None for _, ign, _ in lidas):
+        ignoradas = _juntar(_unificar_colunas([ign for _, ign, _ in lidas], schema), nomes)
+    tempos = [{"aba": nome, "linhas": int(len(d)), "segundos": round(t, 3)} for nome, (d, _, t) in zip(nomes, lidas)]
+    return (compactar_frame(df) if compacto else df), ignoradas, tempos
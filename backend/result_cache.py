@@ -0,0 +1,200 @@
+# backend/result_cache.py
+"""Cache em disco das saídas finais (XLSX + stats) de inativação e aprovação.
+
+A chave é um hash do conteúdo dos arquivos enviados, dos parâmetros da
+requisição e da versão do código (hash dos módulos .py do backend usados em
+execução, inclusive os que alimentam a saída indiretamente, como as versões de
+base e o índice de usuários; testes e benchmarks não entram). Qualquer alteração nesses fontes muda a versão e as
+entradas antigas deixam de ser usadas e são removidas.
+
+Cada entrada são dois arquivos em `RESULT_CACHE_FOLDER`: `<chave>.bin`
+(bytes da saída) e `<chave>.json` (nome do arquivo, mimetype, stats).
+O horário de modificação marca o último acesso: acima de
+`RESULT_CACHE_MAX_MB` as entradas menos usadas são descartadas primeiro, e
+entradas mais antigas que `RESULT_CACHE_TTL` expiram.
+"""
+import hashlib
+import io
+import json
+import os
+import time
+import uuid
+from typing import Dict, Iterable, Optional, Tuple
+
+from flask import send_file
+
+from .core.config import settings
+from .core.logging import get_logger
+
+logger = get_logger()
+
+_CHUNK = 1024 * 1024
+
+
+_NAO_VERSIONADOS = ("benchmarks.py",)
+
+
+def _versioned_sources() -> Iterable[str]:
+    """Caminhos relativos (com "/") dos módulos do backend usados em execução, em ordem.
+
+    Só entram os subpacotes (pastas com `__init__.py`), de modo que as pastas
+    de dados (uploads, cache, índices, bases) nem são percorridas; testes e
+    benchmarks ficam de fora.
+    """
+    found = []
+    for dirpath, dirnames, filenames in os.walk(settings.BACKEND_DIR):
+        dirnames[:] = [d for d in dirnames if os.path.exists(os.path.join(dirpath, d, "__init__.py"))]
+        for name in filenames:
+            if name.endswith(".py") and not name.startswith("test_") and name not in _NAO_VERSIONADOS:
+                rel = os.path.relpath(os.path.join(dirpath, name), settings.BACKEND_DIR)
+                found.append(rel.replace(os.sep, "/"))
+    return sorted(found)
+
+
+def code_version() -> str:
+    """Hash dos fontes do backend (muda a cada alteração de código)."""
+    h = hashlib.sha256()
+    for rel in _versioned_sources():
+        h.update(rel.encode("utf-8"))
+        try:
+            with open(os.path.join(settings.BACKEND_DIR, rel), "rb") as f:
+                h.update(f.read())
+        except OSError:
+            h.update(b"-")
+    return h.hexdigest()[:16]
+
+
+def hash_upload(h, file_storage) -> None:
+    """Atualiza `h` com o conteúdo de um upload, sem consumir o stream."""
+    stream = file_storage.stream
+    pos = stream.tell()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(_CHUNK), b""):
+        h.update(chunk)
+    stream.seek(pos)
+
+
+class ResultCache:
+    """LRU em disco com TTL e limite de tamanho total."""
+
+    def __init__(self, folder: str, max_bytes: int, ttl: float, version: str):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.version = version
+        os.makedirs(self.folder, exist_ok=True)
+        self._purge_other_versions()
+
+    def key(self, namespace: str, files: Dict[str, object], params: Dict[str, object]) -> str:
+        """Chave da requisição: versão + namespace + conteúdo dos arquivos + parâmetros."""
+        h = hashlib.sha256()
+        h.update(f"{self.version}\x1f{namespace}".encode("utf-8"))
+        for name in sorted(files):
+            h.update(f"\x1ffile:{name}\x1f".encode("utf-8"))
+            if files[name] is not None:
+                hash_upload(h, files[name])
+        h.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+        return h.hexdigest()
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        return os.path.join(self.folder, f"{key}.bin"), os.path.join(self.folder, f"{key}.json")
+
+    def _remove(self, key: str) -> None:
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def get(self, key: str) -> Optional[Tuple[bytes, dict]]:
+        """(bytes, meta) da entrada, ou None se ausente, expirada ou de outra versão."""
+        data_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != self.version or time.time() - meta.get("created", 0) > self.ttl:
+                self._remove(key)
+                return None
+            with open(data_path, "rb") as f:
+                data = f.read()
+        except (OSError, ValueError):
+            return None
+        now = time.time()
+        for path in (data_path, meta_path):
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+        return data, meta
+
+    def put(self, key: str, data: bytes, meta: dict) -> None:
+        if len(data) > self.max_bytes:
+            return
+        data_path, meta_path = self._paths(key)
+        meta = {**meta, "version": self.version, "created": time.time(), "size": len(data)}
+        try:
+            for path, payload, mode in ((data_path, data, "wb"),
+                                        (meta_path, json.dumps(meta, ensure_ascii=False, default=str), "w")):
+                tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+                with open(tmp, mode, **({} if mode == "wb" else {"encoding": "utf-8"})) as f:
+                    f.write(payload)
+                os.replace(tmp, path)
+        except OSError as e:
+            logger.warning("Falha ao gravar resultado em cache: %s", e)
+            self._remove(key)
+            return
+        self._evict()
+
+    def _entries(self) -> Iterable[Tuple[float, int, str]]:
+        """(último acesso, tamanho, chave) das entradas em disco."""
+        for name in os.listdir(self.folder):
+            if not name.endswith(".bin"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.folder, name))
+            except OSError:
+                continue
+            yield st.st_mtime, st.st_size, name[:-4]
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        expired_before = time.time() - self.ttl
+        for mtime, size, key in entries:
+            if total <= self.max_bytes and mtime >= expired_before:
+                break
+            self._remove(key)
+            total -= size
+
+    def _purge_other_versions(self) -> None:
+        for name in os.listdir(self.folder):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.folder, name), encoding="utf-8") as f:
+                    version = json.load(f).get("version")
+            except (OSError, ValueError):
+                version = None
+            if version != self.version:
+                self._remove(name[:-5])
+
+    def stats(self) -> dict:
+        entries = list(self._entries())
+        return {"entries": len(entries), "size_mb": round(sum(s for _, s, _ in entries) / (1024 * 1024), 1),
+                "version": self.version}
+
+
+def cached_file_response(data: bytes, meta: dict):
+    """Resposta de download a partir de uma entrada do cache."""
+    response = send_file(io.BytesIO(data), download_name=meta.get("filename"), as_attachment=True,
+                         mimetype=meta.get("mimetype"))
+    response.headers["X-Cache"] = "HIT"
+    return response
+
+
+result_cache = ResultCache(
+    folder=settings.RESULT_CACHE_FOLDER,
+    max_bytes=settings.RESULT_CACHE_MAX_MB * 1024 * 1024,
+    ttl=settings.RESULT_CACHE_TTL,
+    version=code_version(),
+) if settings.RESULT_CACHE_ENABLED else None
@@ -0,0 +1,243 @@
+# backend/schema.py
+"""Resolução de esquema: cabeçalhos da planilha -> campos canônicos.
+
+Cada esquema ("base", "lista", "aprovacao", "ficha", ...) é uma tabela de
+aliases: para cada campo canônico, uma lista ordenada de regras. A primeira
+regra que casar com alguma coluna define a coluna do campo.
+
+Tipos de regra (sempre sobre o cabeçalho sem acentos e em maiúsculas):
+- ("exact", "NOME COMPLETO")  igualdade, espaços das bordas removidos
+- ("compact", "NOMECOMPLETO") igualdade considerando apenas A-Z0-9
+- ("contains", "CPF")         substring do cabeçalho (normal ou compacto)
+- ("regex", r"(^| )NOME$")    re.search no cabeçalho
+
+Campos declarados como {"multi": True, "rules": [...]} recebem todas as
+colunas que casam (ex.: LoginAprovador_1..100), ordenadas pelo número final.
+
+As resoluções são memorizadas por (esquema, impressão digital do cabeçalho),
+de modo que a mesma planilha não é reanalisada a cada chamada.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .core.config import settings
+from .core.logging import get_logger
+from .utils import upper_no_accents
+
+logger = get_logger()
+
+SCHEMA_ALIASES: Dict[str, Dict[str, object]] = {
+    # Base de usuários exportada da plataforma (inativação, versões de base)
+    "base": {
+        "cpf": [("contains", "CPF")],
+        "nome_completo": [("compact", "NOMECOMPLETO"), ("contains", "NOMECOMPLETO")],
+        "email": [("compact", "EMAIL"), ("contains", "EMAIL")],
+        "status": [("compact", "STATUS"), ("contains", "STATUS")],
+        "user_id": [("compact", "USERID"), ("contains", "USERID"), ("contains", "IDUSUARIO")],
+        "login": [("compact", "LOGIN"), ("compact", "USERNAME")],
+        "nome": [("compact", "NOME")],
+        "sobrenome": [("compact", "SOBRENOME")],
+        "telefone": [("compact", "TELEFONE")],
+        "cargo": [("compact", "CARGO")],
+        "departamento": [("compact", "DEPARTAMENTO")],
+        "nivel": [("compact", "NIVEL")],
+        "empresa": [("compact", "EMPRESA")],
+        "codigo_ccusto": [("compact", "CODIGOCENTRODECUSTO")],
+        "centro_custo": [("compact", "CENTRODECUSTO")],
+        "matricula": [("compact", "NROMATRICULA"), ("contains", "NROMATRICULA"),
+                      ("compact", "MATRICULA"), ("contains", "MATRICULA")],
+        "solicitante": [("compact", "SOLICITANTE"), ("contains", "SOLICITANTE")],
+        "vip": [("compact", "VIP"), ("contains", "VIP")],
+        "solicitante_master": [("compact", "SOLICITANTEMASTER"), ("contains", "SOLICITANTEMASTER")],
+        "master_adiantamento": [("compact", "MASTERADIANTAMENTO"), ("contains", "MASTERADIANTAMENTO")],
+        "master_reembolso": [("compact", "MASTERREEMBOLSO"), ("contains", "MASTERREEMBOLSO")],
+        "viajante_master_nacional": [("compact", "VIAJANTEMASTERNACIONAL")],
+        "viajante_master_internacional": [("compact", "VIAJANTEMASTERINTERNACIONAL")],
+        "terceiro": [("compact", "TERCEIRO")],
+    },
+    # Lista de desligados (CPF / nome / e-mail)
+    "lista": {
+        "cpf": [("contains", "CPF")],
+        "nome_completo": [("contains", "NOMECOMPLETO")],
+        "nome": [("regex", r"(^|\s)NOME$")],
+        "sobrenome": [("contains", "SOBRENOME")],
+        "nome_qualquer": [("contains", "NOME")],
+        "email": [("contains", "EMAIL")],
+    },
+    # Base de carga de aprovação
+    "aprovacao": {
+        "aprovacao_id": [("compact", "APROVACAOID")],
+        "aprovacao_por": [("compact", "APROVACAOPOR")],
+        "aprovacao": [("compact", "APROVACAO")],
+        "tipo": [("compact", "TIPO")],
+        "valor": [("compact", "VALOR")],
+        "desc_ccusto": [("compact", "DESCRICAOCCUSTO"), ("compact", "DESCRICAOCENTRODECUSTO"),
+                        ("compact", "DESCRICAOCCUSTOEMPRESA")],
+        "cod_ccusto": [("compact", "CODIGOCCUSTO"), ("compact", "CODIGOCENTRODECUSTO"),
+                       ("compact", "CODIGOCCUSTOEMPRESA")],
+        "login_segundo": [("compact", "LOGINAPROVADORSEGUNDONIVEL")],
+        "segundo_master": [("compact", "SEGUNDONIVELMASTER")],
+        "traveler_name_col": [("compact", "NOMEVIAJANTE"), ("compact", "NOMECOMPLETOVIAJANTE"),
+                              ("compact", "NOMECOMPLETO")],
+        "approver_cols": {"multi": True, "rules": [("regex", r"^LOGINAPROVADOR_(\d+)$")]},
+    },
+}
+
+_CACHE_MAX = 256
+_cache: "OrderedDict[Tuple[str, str], SchemaResolution]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _upper_key(col) -> str:
+    return re.sub(r"\s+", " ", upper_no_accents(str(col))).strip()
+
+
+def _compact_key(col) -> str:
+    return re.sub(r"[^A-Z0-9]", "", upper_no_accents(str(col)))
+
+
+def header_fingerprint(columns: Iterable) -> str:
+    """Impressão digital estável de um cabeçalho (ordem e nomes das colunas)."""
+    joined = "\x1f".join(str(c) for c in columns)
+    return hashlib.sha1(joined.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class SchemaResolution:
+    """Resultado imutável da resolução (compartilhado pelo cache; não alterar)."""
+    schema: str
+    fingerprint: str
+    fields: Dict[str, str]
+    multi: Dict[str, List[str]]
+    by_column: Dict[str, str]
+    missing: List[str]
+    unmapped: List[str] = field(default_factory=list)
+
+    def get(self, name: str, default=None):
+        if name in self.multi:
+            return self.multi[name]
+        return self.fields.get(name, default)
+
+    def report(self) -> dict:
+        return {
+            "schema": self.schema,
+            "fingerprint": self.fingerprint,
+            "fields": dict(self.fields),
+            "multi": {k: list(v) for k, v in self.multi.items()},
+            "missing": list(self.missing),
+            "unmapped": list(self.unmapped),
+        }
+
+
+def _rule_matches(kind: str, value: str, upper: str, compact: str) -> Optional[re.Match]:
+    if kind == "exact":
+        return upper == _upper_key(value) or None
+    if kind == "compact":
+        return compact == _compact_key(value) or None
+    if kind == "contains":
+        token = _upper_key(value)
+        return (token in upper or _compact_key(token) in compact) or None
+    if kind == "regex":
+        return re.search(value, upper)
+    raise ValueError(f"Tipo de regra desconhecido: {kind}")
+
+
+def _resolve(schema: str, columns: Tuple, fingerprint: str) -> SchemaResolution:
+    table = SCHEMA_ALIASES.get(schema)
+    if table is None:
+        raise ValueError(f"Esquema desconhecido: {schema}")
+    keys = [(col, _upper_key(col), _compact_key(col)) for col in columns]
+
+    fields: Dict[str, str] = {}
+    multi: Dict[str, List[str]] = {}
+    by_column: Dict[str, str] = {}
+    for name, spec in table.items():
+        if isinstance(spec, dict):
+            rules, is_multi = spec.get("rules", []), bool(spec.get("multi"))
+        else:
+            rules, is_multi = spec, False
+        if is_multi:
+            found = []
+            for col, upper, compact in keys:
+                for kind, value in rules:
+                    m = _rule_matches(kind, value, upper, compact)
+                    if m:
+                        num = re.search(r"(\d+)$", upper)
+                        found.append((int(num.group(1)) if num else 0, col))
+                        break
+            multi[name] = [col for _, col in sorted(found, key=lambda t: t[0])]
+            for col in multi[name]:
+                by_column.setdefault(col, name)
+            continue
+        for kind, value in rules:
+            col = next((c for c, upper, compact in keys if _rule_matches(kind, value, upper, compact)), None)
+            if col is not None:
+                fields[name] = col
+                by_column.setdefault(col, name)
+                break
+
+    missing = [name for name in table if name not in fields and not multi.get(name)]
+    unmapped = [str(c) for c in columns if c not in by_column]
+    return SchemaResolution(schema, fingerprint, fields, multi, by_column, missing, unmapped)
+
+
+def resolve_columns(columns: Iterable, schema: str = "base") -> SchemaResolution:
+    """Resolve os cabeçalhos `columns` no esquema indicado (memorizado)."""
+    cols = tuple(columns)
+    fingerprint = header_fingerprint(cols)
+    cache_key = (schema, fingerprint)
+    with _lock:
+        hit = _cache.get(cache_key)
+        if hit is not None:
+            _cache.move_to_end(cache_key)
+            return hit
+    resolution = _resolve(schema, cols, fingerprint)
+    with _lock:
+        _cache[cache_key] = resolution
+        while len(_cache) > _CACHE_MAX:
+            _cache.popitem(last=False)
+    return resolution
+
+
+def register_aliases(schema: str, aliases: Dict[str, object], prepend: bool = True) -> None:
+    """Adiciona aliases a um esquema (criando-o se necessário) e limpa o cache.
+
+    Com `prepend=True` as novas regras têm prioridade sobre as existentes.
+    """
+    table = SCHEMA_ALIASES.setdefault(schema, {})
+    for name, spec in aliases.items():
+        new_rules = spec.get("rules", []) if isinstance(spec, dict) else spec
+        new_rules = [tuple(r) for r in new_rules]
+        current = table.get(name)
+        if isinstance(current, dict):
+            current["rules"] = new_rules + current["rules"] if prepend else current["rules"] + new_rules
+        elif current is not None:
+            table[name] = new_rules + list(current) if prepend else list(current) + new_rules
+        elif isinstance(spec, dict):
+            table[name] = {**spec, "rules": new_rules}
+        else:
+            table[name] = new_rules
+    with _lock:
+        _cache.clear()
+
+
+def _load_aliases_file(path: str) -> None:
+    """Carrega aliases extras de um JSON {"esquema": {"campo": [["tipo", "valor"], ...]}}."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            extra = json.load(f)
+        for schema, aliases in extra.items():
+            register_aliases(schema, aliases)
+        logger.info("Aliases de esquema carregados de %s", path)
+    except Exception as e:
+        logger.warning("Falha ao carregar aliases de esquema de %s: %s", path, e)
+
+
+if settings.SCHEMA_ALIASES_FILE and os.path.exists(settings.SCHEMA_ALIASES_FILE):
+    _load_aliases_file(settings.SCHEMA_ALIASES_FILE)
@@ -0,0 +1,170 @@
+# backend/static_assets.py
+"""Arquivos do frontend servidos a partir de um manifesto em memória.
+
+Na inicialização cada arquivo de `FRONTEND_DIR` é lido uma vez e entra no
+manifesto com:
+
+- ETag forte (SHA-256 do conteúdo);
+- URL com impressão digital (`static/js/app.v2.<hash>.js`), servida com
+  `Cache-Control: public, max-age=31536000, immutable`: qualquer alteração
+  no arquivo muda a URL;
+- variantes gzip e, com o pacote `brotli` instalado, br, comprimidas uma só
+  vez (textos acima de `_MIN_COMPRIMIR` bytes e só quando ficam menores).
+
+O index.html é reescrito para apontar para as URLs com hash. Ele e os
+caminhos sem hash saem com `Cache-Control: no-cache`: o navegador revalida
+com If-None-Match e recebe 304 sem corpo. Cada requisição é uma consulta ao
+dicionário, sem acesso ao disco.
+
+Com `STATIC_RELOAD` (padrão: o valor de DEBUG) o manifesto é refeito quando
+algum arquivo muda, para o desenvolvimento.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from flask import Response, request
+
+from .core.config import settings
+from .core.logging import get_logger
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele, só gzip
+    brotli = None
+
+logger = get_logger()
+
+INDEX = "index.html"
+_COMPRIMIVEIS = {".html", ".js", ".css", ".json", ".svg", ".webmanifest", ".txt", ".map", ".ico"}
+_MIN_COMPRIMIR = 512
+_CACHE_IMUTAVEL = "public, max-age=31536000, immutable"
+_CACHE_REVALIDAR = "no-cache"
+_MIMETYPES = {".js": "text/javascript", ".css": "text/css", ".html": "text/html",
+              ".webmanifest": "application/manifest+json"}
+# src="..."/href="..." relativos (sem esquema); a query (ex.: ?v=3) é descartada na troca pela URL com hash
+_REFERENCIA_RE = re.compile(r'\b((?:src|href)=")([^"?#:]+)(?:\?[^"#]*)?(")')
+
+
+@dataclass
+class Asset:
+    path: str
+    url: str
+    body: bytes
+    mimetype: str
+    etag: str
+    variantes: Dict[str, bytes] = field(default_factory=dict)
+
+
+def _comprimir(path: str, body: bytes) -> Dict[str, bytes]:
+    if os.path.splitext(path)[1].lower() not in _COMPRIMIVEIS or len(body) < _MIN_COMPRIMIR:
+        return {}
+    variantes = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variantes["br"] = brotli.compress(body, quality=11)
+    return {enc: dados for enc, dados in variantes.items() if len(dados) < len(body)}
+
+
+def _asset(path: str, body: bytes, fingerprint: bool = True) -> Asset:
+    digest = hashlib.sha256(body).hexdigest()
+    base, ext = os.path.splitext(path)
+    mimetype = _MIMETYPES.get(ext.lower()) or mimetypes.guess_type(path)[0] or "application/octet-stream"
+    return Asset(path=path, url=f"{base}.{digest[:12]}{ext}" if fingerprint else path, body=body,
+                 mimetype=mimetype, etag=digest[:32], variantes=_comprimir(path, body))
+
+
+class AssetManifest:
+    """Caminho (com ou sem hash) -> (arquivo em memória, se a URL é imutável)."""
+
+    def __init__(self, root: str, reload: bool = False):
+        self.root = root
+        self.reload = reload
+        self._rotas: Dict[str, Tuple[Asset, bool]] = {}
+        self._assinatura: tuple = ()
+        self.build()
+
+    def _arquivos(self):
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            for name in sorted(filenames):
+                if not name.startswith("."):
+                    full = os.path.join(dirpath, name)
+                    yield os.path.relpath(full, self.root).replace(os.sep, "/"), full
+
+    def _assinatura_atual(self) -> tuple:
+        assinatura = []
+        for rel, full in self._arquivos():
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            assinatura.append((rel, st.st_mtime_ns, st.st_size))
+        return tuple(assinatura)
+
+    def build(self) -> None:
+        assets: Dict[str, Asset] = {}
+        for rel, full in self._arquivos():
+            try:
+                with open(full, "rb") as f:
+                    body = f.read()
+            except OSError:
+                logger.warning("Falha ao ler %s para o manifesto do frontend", rel)
+                continue
+            assets[rel] = _asset(rel, body, fingerprint=rel != INDEX)
+
+        if INDEX in assets:
+            def trocar(m):
+                asset = assets.get(m.group(2))
+                return f"{m.group(1)}{asset.url}{m.group(3)}" if asset and m.group(2) != INDEX else m.group(0)
+
+            html = _REFERENCIA_RE.sub(trocar, assets[INDEX].body.decode("utf-8"))
+            assets[INDEX] = _asset(INDEX, html.encode("utf-8"), fingerprint=False)
+
+        rotas: Dict[str, Tuple[Asset, bool]] = {}
+        for asset in assets.values():
+            rotas[asset.path] = (asset, False)
+            if asset.url != asset.path:
+                rotas[asset.url] = (asset, True)
+        self._rotas = rotas
+        if self.reload:
+            self._assinatura = self._assinatura_atual()
+        total = sum(len(a.body) for a in assets.values())
+        comprimido = sum(min([len(a.body), *map(len, a.variantes.values())]) for a in assets.values())
+        logger.info("Manifesto do frontend: %d arquivos, %.0f KB (%.0f KB comprimidos)",
+                    len(assets), total / 1024, comprimido / 1024)
+
+    def get(self, path: str) -> Optional[Tuple[Asset, bool]]:
+        if self.reload and self._assinatura_atual() != self._assinatura:
+            self.build()
+        return self._rotas.get(path)
+
+    def url(self, path: str) -> str:
+        """URL com hash de `path` (o próprio `path` se não estiver no manifesto)."""
+        encontrado = self._rotas.get(path)
+        return encontrado[0].url if encontrado else path
+
+
+def asset_response(asset: Asset, imutavel: bool) -> Response:
+    """Resposta do arquivo na melhor codificação aceita, com ETag e 304 para If-None-Match."""
+    encoding = request.accept_encodings.best_match([e for e in ("br", "gzip") if e in asset.variantes])
+    etag = f"{asset.etag}-{encoding}" if encoding else asset.etag
+    headers = {"Cache-Control": _CACHE_IMUTAVEL if imutavel else _CACHE_REVALIDAR}
+    if asset.variantes:
+        headers["Vary"] = "Accept-Encoding"
+
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304, headers=headers)
+    else:
+        response = Response(asset.variantes[encoding] if encoding else asset.body,
+                            mimetype=asset.mimetype, headers=headers)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(etag)
+    return response
+
+
+asset_manifest = AssetManifest(settings.FRONTEND_DIR, reload=settings.STATIC_RELOAD)
@@ -16,9 +16,9 @@ except Exception as e:
 
 # criar arquivo Excel fictício em memória usando DataFrame com valores variados
 rows = [
-    {"CPF": "11122233344", "NomeCompleto": "Ana Souza", "Solicitante": "Sim", "Terceiro": "Sim"},
-    {"CPF": "22233344455", "NomeCompleto": "Bruno Lima", "Solicitante": "", "Terceiro": "Não"},
-    {"CPF": "33344455566", "NomeCompleto": "Carlos Dias", "Solicitante": None, "Terceiro": "S"}
+    {"CPF": "11122233396", "NomeCompleto": "Ana Souza", "Solicitante": "Sim", "Terceiro": "Sim"},
+    {"CPF": "22233344405", "NomeCompleto": "Bruno Lima", "Solicitante": "", "Terceiro": "Não"},
+    {"CPF": "33344455508", "NomeCompleto": "Carlos Dias", "Solicitante": None, "Terceiro": "S"}
 ]
 
 # o processar_registros_from_files recebe paths; vamos escrever um xlsx temporário
@@ -43,3 +43,51 @@ finally:
         os.remove(path)
     except Exception:
         pass
+
+# ficha .docx com dados em parágrafos e em tabela (| RÓTULO | valor |)
+import zipfile
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+par = lambda t: f'<w:p><w:r><w:t>{t}</w:t></w:r></w:p>'
+doc_xml = (f'<w:document {W}><w:body>'
+           + par('NOME COMPLETO: Diana Prado') + par('CPF (SEM PONTOS): 44455566619')
+           + '<w:tbl><w:tr><w:tc>' + par('E-MAIL') + '</w:tc><w:tc>' + par('diana@empresa.com') + '</w:tc></w:tr></w:tbl>'
+           + '</w:body></w:document>')
+fd, docx_path = tempfile.mkstemp(suffix='.docx')
+os.close(fd)
+with zipfile.ZipFile(docx_path, 'w') as zf:
+    zf.writestr('word/document.xml', doc_xml)
+try:
+    from backend.processor import extrair_docx
+    print('docx:', extrair_docx(docx_path))
+except Exception as e:
+    print('Erro no teste docx:', e)
+    traceback.print_exc()
+finally:
+    try:
+        os.remove(docx_path)
+    except Exception:
+        pass
+
+# cadastro contra a base do cliente: Ana (por CPF) e Carlos (por Email) já existem
+base = pd.DataFrame([
+    {"UserId": "900", "CPF": "111.222.333-96", "Login": "x", "Email": "", "Status": "ATIVO"},
+    {"UserId": "901", "CPF": "", "Login": "y", "Email": "carlos@empresa.com", "Status": "ATIVO"},
+])
+rows_email = [dict(r, Email=f"{r['NomeCompleto'].split()[0].lower()}@empresa.com") for r in rows]
+fd, path = tempfile.mkstemp(suffix='.xlsx')
+os.close(fd)
+pd.DataFrame(rows_email).to_excel(path, index=False)
+try:
+    from backend.processor import processar_cadastro_contra_base
+    errors, novos, existentes, stats = processar_cadastro_contra_base([path], base, login_choice='CPF', fluxo='SELF')
+    print('novos:', novos['NomeCompleto'].tolist())
+    print('existentes:', existentes[['Operacao', 'UserId', 'NomeCompleto', 'Motivo']].to_dict(orient='records'))
+    print('stats:', stats)
+except Exception as e:
+    print('Erro no teste cadastro contra base:', e)
+    traceback.print_exc()
+finally:
+    try:
+        os.remove(path)
+    except Exception:
+        pass
@@ -29,11 +29,11 @@ def show_result(desc, out, stats):
 # caso 1: CPF exato
 try:
     df_base = pd.DataFrame([
-        {"CPF": "111.222.333-44", "NomeCompleto":"Maria Silva", "Status":"ATIVO", "Solicitante":"S", "Terceiro":"N"},
-        {"CPF": "222.333.444-55", "NomeCompleto":"Joao Pereira", "Status":"ATIVO", "Solicitante":"N", "Terceiro":"S"},
-        {"CPF": "333.444.555-66", "NomeCompleto":"Mariana Costa", "Status":"INATIVO", "Solicitante":"N", "Terceiro":"N"},
+        {"CPF": "111.222.333-96", "NomeCompleto":"Maria Silva", "Status":"ATIVO", "Solicitante":"S", "Terceiro":"N"},
+        {"CPF": "222.333.444-05", "NomeCompleto":"Joao Pereira", "Status":"ATIVO", "Solicitante":"N", "Terceiro":"S"},
+        {"CPF": "333.444.555-08", "NomeCompleto":"Mariana Costa", "Status":"INATIVO", "Solicitante":"N", "Terceiro":"N"},
     ])
-    df_lista = pd.DataFrame([{"CPF":"11122233344"}])
+    df_lista = pd.DataFrame([{"CPF":"11122233396"}])
     out, stats = processar_inativacao_from_paths(df_base, df_lista, use_fuzzy=False)
     show_result('CPF exato', out, stats)
 except Exception as e:
@@ -58,4 +58,71 @@ except Exception as e:
     print('Erro no caso Nome genérico:', e)
     traceback.print_exc()
 
+# caso 4: busca em lote (CPF com máscara, nome, e-mail, itens inexistentes e CPFs com dígito errado)
+try:
+    from backend.processor import buscar_itens
+    busca = buscar_itens(df_base, ["111.222.333-96", "joao pereira", "x@y.com", "99999999999", "11122233396", "123.456.789-00"])
+    print('\n' + '='*40)
+    print('Busca em lote')
+    print('items:', busca['items'])
+    print('duplicates:', busca['duplicates'], 'not_found:', busca['not_found'], 'invalid_cpfs:', busca['invalid_cpfs'])
+    # mesma busca por consultas pontuais no índice SQLite da base
+    import io
+    import tempfile
+    from backend.processor import buscar_itens_indice
+    from backend.user_index import UserIndexStore
+    indice = UserIndexStore(folder=tempfile.mkdtemp()).construir('0' * 64, df_base)
+    busca_indice = buscar_itens_indice(indice, ["111.222.333-96", "joao pereira", "x@y.com", "99999999999",
+                                                "11122233396", "123.456.789-00"])
+    print('busca pelo índice igual:', busca_indice == busca)
+    # o índice de um upload só é construído quando o mesmo arquivo volta
+    from werkzeug.datastructures import FileStorage
+    store = UserIndexStore(folder=tempfile.mkdtemp())
+    carregar = lambda: (df_base, [])
+    obtidos = [store.obter(FileStorage(io.BytesIO(b'base'), 'base.xlsx'), 'busca', None, carregar) for _ in range(3)]
+    print('índice por envio (1º, 2º, 3º):', [o is not None for o in obtidos])
+except Exception as e:
+    print('Erro no caso busca em lote:', e)
+    traceback.print_exc()
+
+# caso 5: leitura filtrada (só ATIVO) e correspondência apenas com linha INATIVA
+try:
+    import io
+    import tempfile
+    from backend.processor import colunas_base_inativacao, colunas_chave_base, filtro_base_ativa
+    from backend.readers import ler_planilha_filtrada
+    tmp_base = os.path.join(tempfile.mkdtemp(), 'base.xlsx')
+    df_base.assign(Observacao='x').to_excel(tmp_base, index=False)
+    df_lido, df_ignorados = ler_planilha_filtrada(tmp_base, filtro=filtro_base_ativa, colunas=colunas_base_inativacao,
+                                                  colunas_ignoradas=colunas_chave_base)
+    print('\n' + '='*40)
+    print('Leitura filtrada')
+    print('colunas:', list(df_lido.columns), 'linhas:', len(df_lido), 'ignoradas:', df_ignorados.to_dict(orient='records'))
+    df_lista5 = pd.DataFrame([{"CPF": "33344455508"}])
+    out5, stats5 = processar_inativacao_from_paths(df_lido, df_lista5, df_ignorados=df_ignorados)
+    print('out rows:', out5.shape[0], 'inativos:', stats5['inativos'])
+except Exception as e:
+    print('Erro no caso leitura filtrada:', e)
+    traceback.print_exc()
+
+# caso 6: base dividida em abas, com cabeçalhos diferentes, lida com seleção por padrão
+try:
+    from backend.readers import ler_abas
+    tmp_abas = os.path.join(tempfile.mkdtemp(), 'base_abas.xlsx')
+    with pd.ExcelWriter(tmp_abas) as writer:
+        df_base.iloc[:2].to_excel(writer, sheet_name='Empresa A', index=False)
+        df_base.iloc[2:].rename(columns={'CPF': 'CPF do usuario', 'NomeCompleto': 'Nome Completo'}).to_excel(
+            writer, sheet_name='Empresa B', index=False)
+        pd.DataFrame({'Total': [3]}).to_excel(writer, sheet_name='Resumo', index=False)
+    df_abas, ign_abas, tempos = ler_abas(tmp_abas, 'empresa*', filtro=filtro_base_ativa,
+                                         colunas_ignoradas=colunas_chave_base)
+    print('\n' + '='*40)
+    print('Várias abas')
+    print('abas:', [t['aba'] for t in tempos], 'linhas:', [t['linhas'] for t in tempos])
+    print('colunas:', list(df_abas.columns))
+    print('ignoradas:', ign_abas.to_dict(orient='records'))
+except Exception as e:
+    print('Erro no caso várias abas:', e)
+    traceback.print_exc()
+
 print('\nTeste concluído')
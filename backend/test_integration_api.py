@@ -26,14 +26,14 @@ def make_excel_bytes(df: pd.DataFrame):
 
 # construir base e lista
 df_base = pd.DataFrame([
-    {"CPF": "11122233344", "NomeCompleto": "Maria Silva", "Status": "ATIVO", "Solicitante": "S", "Terceiro": "N"},
-    {"CPF": "22233344455", "NomeCompleto": "Joao Pereira", "Status": "ATIVO", "Solicitante": "N", "Terceiro": "S"},
-    {"CPF": "33344455566", "NomeCompleto": "Mariana Costa", "Status": "INATIVO", "Solicitante": "N", "Terceiro": "N"}
+    {"CPF": "11122233396", "NomeCompleto": "Maria Silva", "Status": "ATIVO", "Solicitante": "S", "Terceiro": "N"},
+    {"CPF": "22233344405", "NomeCompleto": "Joao Pereira", "Status": "ATIVO", "Solicitante": "N", "Terceiro": "S"},
+    {"CPF": "33344455508", "NomeCompleto": "Mariana Costa", "Status": "INATIVO", "Solicitante": "N", "Terceiro": "N"}
 ])
 
 # lista como arquivo Excel
 df_lista = pd.DataFrame([
-    {"CPF": "11122233344", "NomeCompleto": ""}
+    {"CPF": "11122233396", "NomeCompleto": ""}
 ])
 
 base_bytes = make_excel_bytes(df_base)
@@ -75,4 +75,245 @@ with app.test_client() as client:
         except Exception:
             print('process response text:', resp2.get_data(as_text=True))
 
+print('\nVersões de base: registro, delta e escopo=delta na inativação')
+import shutil
+from backend.base_versions import base_store
+cliente_teste = 'teste_integracao_delta'
+shutil.rmtree(base_store._client_dir(cliente_teste), ignore_errors=True)
+df_v1 = pd.DataFrame({
+    'CPF': ['529.982.247-25', '111.444.777-35', '390.533.447-05', '987.654.321-00'],
+    'NomeCompleto': ['Ana Lima', 'Bia Rocha', 'Caio Dias', 'Davi Melo'],
+    'Status': ['ATIVO', 'ATIVO', 'ATIVO', 'ATIVO'],
+})
+# v2: CPF sem máscara e coluna nova (não alteram as linhas), Bia renomeada, Caio inativado, Davi -> Eva
+df_v2 = pd.DataFrame({
+    'CPF': ['52998224725', '11144477735', '39053344705', '12345678909'],
+    'NomeCompleto': ['Ana Lima', 'Bia Rocha Souza', 'Caio Dias', 'Eva Nunes'],
+    'Status': ['ATIVO', 'ATIVO', 'INATIVO', 'ATIVO'],
+    'Departamento': ['TI', 'RH', 'TI', 'RH'],
+})
+try:
+    with app.test_client() as client:
+        for nome, df_v in (('v1.xlsx', df_v1), ('v2.xlsx', df_v2)):
+            resp_v = client.post(f'/api/bases/{cliente_teste}/versoes', data={'base': (make_excel_bytes(df_v), nome)},
+                                 content_type='multipart/form-data')
+            print('registro', nome, '=', resp_v.status_code, 'delta =', resp_v.get_json()['delta'] is not None)
+        print('versões =', len(client.get(f'/api/bases/{cliente_teste}/versoes').get_json()['versoes']))
+        delta = client.get(f'/api/bases/{cliente_teste}/delta').get_json()
+        contagens = {k: delta['stats'][k] for k in ('adicionados', 'removidos', 'alterados', 'status_inativados')}
+        print('delta:', contagens, 'colunas:', delta['colunas_adicionadas'], delta['colunas_removidas'])
+        print('delta ok =', contagens == {'adicionados': 1, 'removidos': 1, 'alterados': 2, 'status_inativados': 1})
+        data_d = {'base_cliente': cliente_teste, 'escopo': 'delta', 'use_fuzzy': 'false',
+                  'lista_text': '52998224725\n11144477735\n12345678909'}
+        resp_d = client.post('/api/preview_inativacao', data=data_d, content_type='multipart/form-data')
+        print('escopo=delta =', resp_d.status_code,
+              sorted(r['NomeCompleto'] for r in resp_d.get_json()['records']))
+finally:
+    shutil.rmtree(base_store._client_dir(cliente_teste), ignore_errors=True)
+
+print('\nRepetindo /api/process_inativacao (espera-se resposta do cache de resultados)')
+base_raw = make_excel_bytes(df_base).getvalue()
+lista_raw = make_excel_bytes(df_lista).getvalue()
+with app.test_client() as client:
+    repeats = []
+    for _ in range(2):
+        data4 = {'base': (io.BytesIO(base_raw), 'base.xlsx'), 'lista': (io.BytesIO(lista_raw), 'lista.xlsx'), 'use_fuzzy': 'false'}
+        repeats.append(client.post('/api/process_inativacao', data=data4, content_type='multipart/form-data'))
+    resp4 = repeats[-1]
+    print('repeat status_code =', resp4.status_code, 'X-Cache =', resp4.headers.get('X-Cache'),
+          'mesmo arquivo =', resp4.data == repeats[0].data)
+
+print('\nControle de admissão: orçamento ocupado e fila desabilitada (espera-se 429)')
+from backend.admission import admission
+with app.test_client() as client:
+    print('metrics:', {'admission': client.get('/api/metrics').get_json()['admission']})
+    held = admission.budget
+    held_slot = admission.acquire(held)
+    old_queue = admission.max_queue
+    admission.max_queue = 0
+    try:
+        data3 = {'base': (make_excel_bytes(df_base), 'base.xlsx'), 'lista': (make_excel_bytes(df_lista), 'lista.xlsx')}
+        resp3 = client.post('/api/preview_inativacao', data=data3, content_type='multipart/form-data')
+        print('busy status_code =', resp3.status_code, 'Retry-After =', resp3.headers.get('Retry-After'))
+    finally:
+        admission.max_queue = old_queue
+        admission.release(held_slot)
+    snap = client.get('/api/health').get_json()['admission']
+    print('in_flight =', snap['in_flight'], 'rejected_total =', snap['rejected_total'])
+
+print('\nPerfil de planilha no servidor (/api/analise/profile)')
+df_perfil = pd.DataFrame({
+    'CPF': ['529.982.247-25', '52998224725', '111.111.111-11', '123', '12345678900', ''],
+    'Email': ['a@x.com', 'A@x.com ', 'sem-arroba', '', 'b@y.org', 'c@z.com'],
+    'Status': ['ATIVO', 'ATIVO', 'INATIVO', 'ATIVO', 'ATIVO', 'INATIVO'],
+})
+with app.test_client() as client:
+    resp5 = client.post('/api/analise/profile?limit=2', data={'file': (make_excel_bytes(df_perfil), 'perfil.xlsx')},
+                        content_type='multipart/form-data')
+    body5 = resp5.get_json()
+    print('profile status_code =', resp5.status_code)
+    print('cpf:', body5['perfil']['cpf'])
+    print('email:', body5['perfil']['email'])
+    print('status:', next(c for c in body5['perfil']['colunas'] if c['coluna'] == 'Status'))
+    print('janela:', body5['janela'])
+    resp6 = client.get(f"/api/analise/profile/{body5['token']}/linhas?offset=0&limit=10&q=inativo")
+    print('linhas status_code =', resp6.status_code, 'total =', resp6.get_json()['total'],
+          'linhas =', resp6.get_json()['linhas'])
+    print('token inválido =', client.get('/api/analise/profile/../linhas').status_code,
+          client.get('/api/analise/profile/abc/linhas').get_json())
+
+print('\nUpload em blocos (/api/uploads) e uso do id em /api/process_inativacao')
+import hashlib
+with app.test_client() as client:
+    init = client.post('/api/uploads', json={'filename': 'base.xlsx', 'size': len(base_raw),
+                                             'sha256': hashlib.sha256(base_raw).hexdigest()})
+    upload_id = init.get_json()['id']
+    print('init status_code =', init.status_code, 'recebido =', init.get_json()['recebido'])
+    terco = len(base_raw) // 3
+    r1 = client.put(f'/api/uploads/{upload_id}?offset=0', data=base_raw[:terco])
+    # bloco fora de ordem (como depois de uma queda de rede): servidor indica de onde continuar
+    r2 = client.put(f'/api/uploads/{upload_id}?offset={2 * terco}', data=base_raw[2 * terco:])
+    print('bloco 1 =', r1.status_code, 'fora de ordem =', r2.status_code, r2.get_json()['recebido'] == terco)
+    recebido = client.get(f'/api/uploads/{upload_id}').get_json()['recebido']
+    r3 = client.put(f'/api/uploads/{upload_id}', data=base_raw[recebido:2 * terco],
+                    headers={'Upload-Offset': str(recebido), 'X-Chunk-Sha256': '0' * 64})
+    print('checksum do bloco errado =', r3.status_code, r3.get_json()['error'])
+    for offset, fim in ((recebido, 2 * terco), (2 * terco, len(base_raw))):
+        client.put(f'/api/uploads/{upload_id}?offset={offset}', data=base_raw[offset:fim],
+                   headers={'X-Chunk-Sha256': hashlib.sha256(base_raw[offset:fim]).hexdigest()})
+    done = client.post(f'/api/uploads/{upload_id}/complete')
+    print('complete status_code =', done.status_code, 'concluido =', done.get_json()['concluido'])
+    data5 = {'base_upload_id': upload_id, 'lista': (io.BytesIO(lista_raw), 'lista.xlsx'), 'use_fuzzy': 'false'}
+    resp7 = client.post('/api/process_inativacao', data=data5, content_type='multipart/form-data')
+    print('process com upload_id =', resp7.status_code, 'X-Cache =', resp7.headers.get('X-Cache'),
+          'mesmo arquivo =', resp7.data == repeats[0].data)
+    resp8 = client.post('/api/process_inativacao', data={'base_upload_id': 'f' * 32, 'lista_text': '11122233396'},
+                        content_type='multipart/form-data')
+    print('upload inexistente =', resp8.status_code, resp8.get_json())
+    client.delete(f'/api/uploads/{upload_id}')
+
+print('\nBase e lista em CSV/TSV/Parquet (espera-se a mesma saída do XLSX)')
+import gzip
+with app.test_client() as client:
+    saida_xlsx = pd.read_excel(io.BytesIO(repeats[0].data), sheet_name=None, dtype=str)
+    lista_csv = df_lista.to_csv(index=False, sep=';').encode('utf-8-sig')
+    bases = {
+        'base.csv': df_base.to_csv(index=False, sep=';').encode('cp1252'),
+        'base.tsv': df_base.to_csv(index=False, sep='\t').encode('utf-8'),
+        'base.csv.gz': gzip.compress(df_base.to_csv(index=False).encode('utf-8')),
+        'base.parquet': df_base.to_parquet(index=False),
+    }
+    for nome, raw in bases.items():
+        data6 = {'base': (io.BytesIO(raw), nome), 'lista': (io.BytesIO(lista_csv), 'lista.csv'), 'use_fuzzy': 'false'}
+        resp9 = client.post('/api/process_inativacao', data=data6, content_type='multipart/form-data')
+        saida = pd.read_excel(io.BytesIO(resp9.data), sheet_name=None, dtype=str) if resp9.status_code == 200 else {}
+        iguais = saida.keys() == saida_xlsx.keys() and all(saida[k].equals(saida_xlsx[k]) for k in saida)
+        print(nome, '=', resp9.status_code, 'mesma saída =', iguais)
+    resp10 = client.post('/api/process_inativacao', data={'base': (io.BytesIO(b'x'), 'base.txt'), 'lista_text': '1'},
+                         content_type='multipart/form-data')
+    print('extensão recusada =', resp10.status_code, resp10.get_json())
+
+print('\nValidação do cadastro em NDJSON (/api/process_cadastro/validar)')
+import json as json_mod
+df_cad = pd.DataFrame([
+    {"CPF": "11122233396", "NomeCompleto": "Ana Souza", "Email": "ana@empresa.com", "SOLICITANTE? (S/N)": "S", "TERCEIRO? (S/N)": "N"},
+    {"CPF": "123", "NomeCompleto": "Bruno Lima", "Email": "bruno@empresa.com", "SOLICITANTE? (S/N)": "N", "TERCEIRO? (S/N)": "N"},
+    {"CPF": "", "NomeCompleto": "", "Email": "sem-arroba", "SOLICITANTE? (S/N)": "N", "TERCEIRO? (S/N)": "N"},
+    {"CPF": "33344455508", "NomeCompleto": "Carlos Dias", "Email": "carlos@empresa.com", "SOLICITANTE? (S/N)": "S", "TERCEIRO? (S/N)": "S"},
+])
+cad_csv = df_cad.to_csv(index=False, sep=';').encode('utf-8')
+with app.test_client() as client:
+    for max_erros in ('', '1'):
+        resp11 = client.post('/api/process_cadastro/validar', content_type='multipart/form-data',
+                             data={'files[]': (io.BytesIO(cad_csv), 'cadastro.csv'), 'login_choice': 'CPF',
+                                   'fluxo': 'SELF', 'max_erros': max_erros})
+        # fechar a resposta (como o servidor WSGI faz ao fim do envio) libera a vaga da admissão
+        with resp11:
+            eventos = [json_mod.loads(l) for l in resp11.get_data(as_text=True).splitlines()]
+        print('max_erros =', repr(max_erros), resp11.status_code, resp11.mimetype,
+              [e['tipo'] for e in eventos])
+        print('  erros:', [(e['arquivo'], e['linha'], e['mensagens']) for e in eventos if e['tipo'] == 'erro'])
+        print('  resumo:', {k: v for k, v in eventos[-1].items() if k != 'segundos'})
+    resp12 = client.post('/api/process_cadastro/validar', content_type='multipart/form-data',
+                         data={'files[]': (io.BytesIO(cad_csv), 'cadastro.csv'), 'max_erros': '0'})
+    print('max_erros inválido =', resp12.status_code, resp12.get_json())
+    print('in_flight =', client.get('/api/health').get_json()['admission']['in_flight'])
+    # os contadores de log (sem e-mail, sem CPF) também são resumidos na validação em streaming
+    import logging
+    from backend.core.logging import get_logger
+
+    class _Registros(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.mensagens = []
+
+        def emit(self, record):
+            self.mensagens.append(record.getMessage())
+
+    registros = _Registros()
+    get_logger().addHandler(registros)
+    try:
+        sem_email = pd.DataFrame({'CPF': ['11122233396'] * 5, 'NomeCompleto': ['Ana Souza'] * 5, 'Email': [''] * 5})
+        with client.post('/api/process_cadastro/validar', content_type='multipart/form-data',
+                         data={'files[]': (io.BytesIO(sem_email.to_csv(index=False).encode('utf-8')), 'sem_email.csv')}) as resp13:
+            resp13.get_data()
+    finally:
+        get_logger().removeHandler(registros)
+    print('resumo do log:', [m for m in registros.mensagens if m.startswith('Resumo /api/process_cadastro/validar')])
+
+print('\nSaída em partes (max_rows_per_file): ZIP em streaming')
+import zipfile
+with app.test_client() as client:
+    for formato in ('xlsx', 'csv'):
+        data7 = {'base': (make_excel_bytes(df_base), 'base.xlsx'), 'lista_text': '11122233396\n22233344405',
+                 'max_rows_per_file': '1', 'formato_saida': formato}
+        resp13 = client.post('/api/process_inativacao', data=data7, content_type='multipart/form-data')
+        with resp13:
+            zf = zipfile.ZipFile(io.BytesIO(resp13.data))
+        ler = pd.read_excel if formato == 'xlsx' else (lambda b, **kw: pd.read_csv(b, sep=';', encoding='utf-8-sig', **kw))
+        print(formato, '=', resp13.status_code, resp13.mimetype, resp13.headers.get('Content-Disposition'),
+              [(n, ler(io.BytesIO(zf.read(n)), dtype=str)['NomeCompleto'].tolist()) for n in zf.namelist()])
+    resp14 = client.post('/api/process_inativacao', data={'base': (make_excel_bytes(df_base), 'base.xlsx'),
+                                                          'lista_text': '11122233396', 'max_rows_per_file': 'x'},
+                         content_type='multipart/form-data')
+    print('max_rows_per_file inválido =', resp14.status_code, resp14.get_json())
+    print('in_flight =', client.get('/api/health').get_json()['admission']['in_flight'])
+
+print('\nBase projetada no navegador: colunas usadas + TSV gzip (espera-se a mesma saída do XLSX)')
+import csv
+with app.test_client() as client:
+    df_larga = df_base.assign(Cargo='Analista', Observacao='x' * 40)
+    amostra = [['Exportação de usuários'], list(df_larga.columns)] + df_larga.astype(str).values.tolist()
+    plano = client.post('/api/inativacao/colunas', json={'amostra': amostra}).get_json()
+    print('colunas =', plano['linha_cabecalho'], plano['posicoes'], plano['colunas'])
+    tsv = io.StringIO()
+    writer = csv.writer(tsv, delimiter='\t', lineterminator='\n')
+    writer.writerow(plano['colunas'])
+    writer.writerows([row[p] for p in plano['posicoes']] for row in amostra[plano['linha_cabecalho'] + 1:])
+    # mesma base como planilha inteira (título na primeira linha) e como TSV gzip projetado
+    larga_xlsx = io.BytesIO()
+    pd.DataFrame(amostra).to_excel(larga_xlsx, index=False, header=False)
+    saidas, tamanhos = [], []
+    for nome, raw in (('base.xlsx', larga_xlsx.getvalue()), ('base.tsv.gz', gzip.compress(tsv.getvalue().encode('utf-8')))):
+        data8 = {'base': (io.BytesIO(raw), nome), 'lista': (io.BytesIO(lista_raw), 'lista.xlsx'), 'use_fuzzy': 'false'}
+        resp15 = client.post('/api/process_inativacao', data=data8, content_type='multipart/form-data')
+        saidas.append(pd.read_excel(io.BytesIO(resp15.data), dtype=str))
+        tamanhos.append(len(raw))
+        print(nome, '=', resp15.status_code)
+    print('projetada menor =', tamanhos[1] < tamanhos[0], 'mesma saída =', saidas[0].equals(saidas[1]), 'Cargo =', saidas[1]['Cargo'].tolist())
+    print('amostra inválida =', client.post('/api/inativacao/colunas', json={'amostra': 'CPF'}).status_code)
+
+print('\nFrontend: URLs com hash, cache imutável, compressão e 304')
+import re
+with app.test_client() as client:
+    index = client.get('/')
+    js = re.search(r'src="(static/js/app\.v2\.[0-9a-f]{12}\.js)"', index.get_data(as_text=True))
+    print('index =', index.status_code, index.headers.get('Cache-Control'), 'url com hash =', bool(js))
+    asset = client.get('/' + js.group(1), headers={'Accept-Encoding': 'gzip'})
+    print('asset =', asset.status_code, asset.headers.get('Cache-Control'), asset.headers.get('Content-Encoding'))
+    again = client.get('/' + js.group(1), headers={'Accept-Encoding': 'gzip', 'If-None-Match': asset.headers['ETag']})
+    print('revalidação =', again.status_code, len(again.data))
+    print('sem hash =', client.get('/static/js/app.v2.js').headers.get('Cache-Control'),
+          'inexistente =', client.get('/static/js/nao_existe.js').status_code)
+
 print('Teste de integração finalizado')
@@ -0,0 +1,245 @@
+# backend/uploads.py
+"""Uploads em blocos, para arquivos acima de `MAX_CONTENT_LENGTH`.
+
+Fluxo (ver `api/uploads.py`):
+
+1. `POST /api/uploads` com nome, tamanho e, opcionalmente, o SHA-256 do
+   arquivo inteiro: devolve o `id` do upload.
+2. `PUT /api/uploads/<id>?offset=N` com os bytes do bloco no corpo (até
+   `CHUNKED_UPLOAD_CHUNK_MB`). O offset não pode passar do que já foi
+   recebido; reenviar um trecho sobrescreve os mesmos bytes. O cabeçalho
+   `X-Chunk-Sha256`, se enviado, é conferido antes de gravar.
+3. `GET /api/uploads/<id>` informa quantos bytes chegaram: depois de uma
+   queda de rede o cliente continua daquele ponto.
+4. `POST /api/uploads/<id>/complete` confere o tamanho e o SHA-256 e libera
+   o arquivo para uso.
+
+O estado fica só em disco (`<id>.json` com os metadados e `<id>.part` com
+os bytes), compartilhado pelos workers do gunicorn: o total recebido é o
+tamanho do `.part`. Uploads sem atividade por `CHUNKED_UPLOAD_TTL` expiram.
+
+Os endpoints de processamento aceitam, no lugar de cada arquivo, o campo
+`<campo>_upload_id` (ex.: `base_upload_id`); `arquivo_enviado` devolve um
+`FileStorage` equivalente ao do upload direto.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from typing import List, Optional
+
+from flask import g, request
+from werkzeug.datastructures import FileStorage
+
+from .core.config import settings
+from .core.logging import get_logger
+from .utils import validar_extensao_arquivo
+
+logger = get_logger()
+
+_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+_BLOCO = 1024 * 1024
+
+
+class OffsetInvalido(ValueError):
+    """Bloco enviado além do que já foi recebido (o cliente deve retomar de `recebido`)."""
+
+    def __init__(self, message: str, recebido: int):
+        super().__init__(message)
+        self.recebido = recebido
+
+
+def _sha256(value: Optional[str], campo: str) -> Optional[str]:
+    value = (value or "").strip().lower()
+    if not value:
+        return None
+    if not _SHA256_RE.match(value):
+        raise ValueError(f"{campo} deve ser um SHA-256 em hexadecimal.")
+    return value
+
+
+class ChunkedUploadStore:
+    """Uploads em andamento e concluídos, em disco, com expiração."""
+
+    def __init__(self, folder: Optional[str] = None, max_bytes: Optional[int] = None,
+                 chunk_max: Optional[int] = None, ttl: Optional[int] = None):
+        self.folder = folder or settings.CHUNKED_UPLOAD_FOLDER
+        self.max_bytes = settings.CHUNKED_UPLOAD_MAX_MB * 1024 * 1024 if max_bytes is None else max_bytes
+        self.chunk_max = settings.CHUNKED_UPLOAD_CHUNK_MB * 1024 * 1024 if chunk_max is None else chunk_max
+        self.ttl = settings.CHUNKED_UPLOAD_TTL if ttl is None else ttl
+
+    def _paths(self, upload_id: str) -> tuple:
+        if not _ID_RE.match(upload_id or ""):
+            raise ValueError("Id de upload inválido.")
+        return os.path.join(self.folder, f"{upload_id}.json"), os.path.join(self.folder, f"{upload_id}.part")
+
+    def _load(self, upload_id: str) -> dict:
+        meta_path, part_path = self._paths(upload_id)
+        try:
+            if time.time() - os.path.getmtime(part_path) > self.ttl:
+                self.delete(upload_id)
+                raise FileNotFoundError(part_path)
+            with open(meta_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            raise ValueError("Upload expirado ou inexistente; envie o arquivo novamente.")
+
+    def _save(self, upload_id: str, meta: dict) -> None:
+        meta_path, _ = self._paths(upload_id)
+        tmp = f"{meta_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, meta_path)
+
+    def init(self, filename: str, size: int, sha256: Optional[str] = None) -> dict:
+        """Abre um upload de `size` bytes; devolve o estado com o `id`."""
+        is_valid, error_msg = validar_extensao_arquivo(filename)
+        if not is_valid:
+            raise ValueError(error_msg)
+        if size <= 0:
+            raise ValueError("Tamanho do arquivo deve ser maior que zero.")
+        if size > self.max_bytes:
+            raise ValueError(f"Arquivo maior que o limite de {self.max_bytes // (1024 * 1024)} MB.")
+        os.makedirs(self.folder, exist_ok=True)
+        self.purge()
+        upload_id = uuid.uuid4().hex
+        meta = {
+            "id": upload_id,
+            "filename": os.path.basename(filename),
+            "size": int(size),
+            "sha256": _sha256(sha256, "sha256"),
+            "created": time.time(),
+            "concluido": False,
+        }
+        open(self._paths(upload_id)[1], "wb").close()
+        self._save(upload_id, meta)
+        logger.info("Upload %s iniciado: %s (%d bytes)", upload_id, meta["filename"], meta["size"])
+        return self.status(upload_id)
+
+    def status(self, upload_id: str) -> dict:
+        meta = self._load(upload_id)
+        recebido = os.path.getsize(self._paths(upload_id)[1])
+        return {**meta, "recebido": recebido, "chunk_max": self.chunk_max}
+
+    def write_chunk(self, upload_id: str, offset: int, stream, chunk_sha256: Optional[str] = None) -> int:
+        """Grava um bloco a partir de `offset`; devolve o total recebido."""
+        meta = self._load(upload_id)
+        if meta["concluido"]:
+            raise ValueError("Upload já concluído.")
+        part_path = self._paths(upload_id)[1]
+        recebido = os.path.getsize(part_path)
+        if offset < 0 or offset > recebido:
+            raise OffsetInvalido(f"Offset {offset} inválido; continue a partir de {recebido}.", recebido)
+        data = stream.read(self.chunk_max + 1)
+        if not data:
+            raise ValueError("Bloco vazio.")
+        if len(data) > self.chunk_max:
+            raise ValueError(f"Bloco maior que o limite de {self.chunk_max // (1024 * 1024)} MB.")
+        if offset + len(data) > meta["size"]:
+            raise ValueError("Bloco ultrapassa o tamanho declarado do arquivo.")
+        esperado = _sha256(chunk_sha256, "X-Chunk-Sha256")
+        if esperado and hashlib.sha256(data).hexdigest() != esperado:
+            raise ValueError("Checksum do bloco não confere; reenvie o bloco.")
+        with open(part_path, "r+b") as f:
+            f.seek(offset)
+            f.write(data)
+        return max(recebido, offset + len(data))
+
+    def complete(self, upload_id: str) -> dict:
+        """Confere tamanho e SHA-256 e marca o upload como pronto para uso."""
+        meta = self._load(upload_id)
+        if meta["concluido"]:
+            return self.status(upload_id)
+        part_path = self._paths(upload_id)[1]
+        recebido = os.path.getsize(part_path)
+        if recebido != meta["size"]:
+            raise OffsetInvalido(f"Upload incompleto: {recebido} de {meta['size']} bytes.", recebido)
+        h = hashlib.sha256()
+        with open(part_path, "rb") as f:
+            for bloco in iter(lambda: f.read(_BLOCO), b""):
+                h.update(bloco)
+        digest = h.hexdigest()
+        if meta["sha256"] and digest != meta["sha256"]:
+            # Conteúdo corrompido: recomeça do zero em vez de servir um arquivo errado
+            open(part_path, "wb").close()
+            raise OffsetInvalido("Checksum do arquivo não confere; reenvie o arquivo.", 0)
+        meta.update(sha256=digest, concluido=True)
+        self._save(upload_id, meta)
+        logger.info("Upload %s concluído: %s", upload_id, meta["filename"])
+        return self.status(upload_id)
+
+    def open(self, upload_id: str) -> FileStorage:
+        """Arquivo concluído como `FileStorage` (o chamador fecha o stream)."""
+        meta = self._load(upload_id)
+        if not meta["concluido"]:
+            raise ValueError("Upload ainda não concluído.")
+        part_path = self._paths(upload_id)[1]
+        # Uso conta como atividade para a expiração
+        os.utime(part_path)
+        return FileStorage(stream=open(part_path, "rb"), filename=meta["filename"])
+
+    def delete(self, upload_id: str) -> None:
+        for path in self._paths(upload_id):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def purge(self) -> None:
+        expired_before = time.time() - self.ttl
+        for name in os.listdir(self.folder):
+            if not name.endswith(".part"):
+                continue
+            try:
+                if os.path.getmtime(os.path.join(self.folder, name)) < expired_before:
+                    self.delete(name[:-5])
+            except OSError:
+                logger.warning("Falha ao remover upload expirado %s", name)
+
+
+upload_store = ChunkedUploadStore()
+
+
+def _ids_do_campo(campo: str) -> List[str]:
+    nome = campo[:-2] if campo.endswith("[]") else campo
+    ids = request.form.getlist(f"{nome}_upload_id")
+    return [i.strip() for valor in ids for i in valor.split(",") if i.strip()]
+
+
+def _abrir(upload_id: str) -> FileStorage:
+    # Mesmo upload aberto uma vez por requisição (admissão, cache e endpoint compartilham)
+    abertos = g.setdefault("uploads_abertos", {})
+    if upload_id not in abertos:
+        abertos[upload_id] = upload_store.open(upload_id)
+    arquivo = abertos[upload_id]
+    arquivo.stream.seek(0)
+    return arquivo
+
+
+def arquivos_referenciados() -> List[FileStorage]:
+    """Todos os uploads em blocos referenciados por campos `*_upload_id` do formulário."""
+    campos = [k[:-len("_upload_id")] for k in request.form if k.endswith("_upload_id")]
+    return [_abrir(i) for campo in campos for i in _ids_do_campo(campo)]
+
+
+def arquivos_enviados(campo: str) -> List[FileStorage]:
+    """Arquivos do campo `campo`: enviados no corpo ou referenciados por `<campo>_upload_id`."""
+    arquivos = [f for f in request.files.getlist(campo) if f]
+    return arquivos + [_abrir(i) for i in _ids_do_campo(campo)]
+
+
+def arquivo_enviado(campo: str) -> Optional[FileStorage]:
+    """Primeiro arquivo de `campo` (ver `arquivos_enviados`), ou None."""
+    arquivos = arquivos_enviados(campo)
+    return arquivos[0] if arquivos else None
+
+
+def fechar_uploads_abertos() -> None:
+    for arquivo in g.pop("uploads_abertos", {}).values():
+        try:
+            arquivo.close()
+        except Exception:
+            pass
@@ -0,0 +1,255 @@
+# backend/user_index.py
+"""Índice SQLite de bases de usuários, para consultas pontuais.
+
+A busca da inativação e a localização do aprovador só precisam de algumas
+linhas da base, mas a leitura do Excel inteiro domina o tempo da requisição.
+Na primeira vez que uma base é enviada ela só é lida normalmente (o arquivo
+fica marcado como visto); quando o mesmo arquivo volta, ele é lido e gravado
+num arquivo SQLite (inserção em lote, uma linha por usuário) com índices em:
+
+- `cpf`: CPF em dígitos;
+- `nome_norm`: nome completo em maiúsculas, sem acentos;
+- `email_key`: e-mail sem espaços, em minúsculas;
+- `user_id`: UserId.
+
+O arquivo se chama `<hash>.sqlite`, onde o hash cobre o conteúdo do arquivo
+enviado, as abas escolhidas, o uso (`escopo`) e o formato do índice: o mesmo
+arquivo reaproveita o índice (consultas O(log n), sem pandas) e qualquer
+alteração no conteúdo gera outro índice, de modo que um índice nunca fica
+desatualizado. O id (o próprio hash) volta na resposta e pode ser enviado no
+lugar do arquivo. Os índices (e marcas) menos usados além de
+`USER_INDEX_KEEP` são removidos.
+
+Assim uma consulta avulsa custa o mesmo que sem índice, e a construção
+(alguns segundos em bases grandes) só é paga por arquivos reutilizados.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from .core.config import settings
+from .core.logging import get_logger
+from .processor import chaves_busca
+from .result_cache import hash_upload
+
+logger = get_logger()
+
+# Muda quando a tabela ou a normalização das chaves mudam (índices antigos deixam de casar)
+_FORMATO = "1"
+_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+# Parâmetros por consulta (o limite padrão do SQLite antigo é 999)
+_LOTE_IN = 500
+
+_SCHEMA = """
+CREATE TABLE meta (chave TEXT PRIMARY KEY, valor TEXT NOT NULL);
+CREATE TABLE usuarios (
+    pos INTEGER PRIMARY KEY,
+    user_id TEXT,
+    nome TEXT NOT NULL,
+    nome_norm TEXT,
+    cpf TEXT NOT NULL,
+    email TEXT NOT NULL,
+    email_key TEXT NOT NULL,
+    status_atual TEXT NOT NULL,
+    dados TEXT NOT NULL
+);
+"""
+_INDICES = """
+CREATE INDEX ix_usuarios_cpf ON usuarios (cpf);
+CREATE INDEX ix_usuarios_nome_norm ON usuarios (nome_norm);
+CREATE INDEX ix_usuarios_email_key ON usuarios (email_key);
+CREATE INDEX ix_usuarios_user_id ON usuarios (user_id);
+"""
+_COLUNAS = ["pos", "id", "nome", "nome_norm", "cpf", "email", "email_key", "status_atual", "found"]
+_SELECT = ("SELECT pos, user_id, nome, nome_norm, cpf, email, email_key, status_atual, 1 "
+           "FROM usuarios WHERE {campo} IN ({marcas})")
+
+
+class UserIndex:
+    """Índice de uma base: consultas por CPF, nome, e-mail e UserId."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.id = os.path.basename(path)[:-len(".sqlite")]
+        with closing(self._connect()) as conn:
+            self.meta = {k: json.loads(v) for k, v in conn.execute("SELECT chave, valor FROM meta")}
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+
+    @property
+    def tempos(self) -> List[dict]:
+        return self.meta.get("tempos") or []
+
+    def tem(self, campo: str) -> bool:
+        """Se a base tinha a coluna de `campo` (cpf, nome, email) reconhecida pelo esquema."""
+        return bool(self.meta.get(f"tem_{campo}"))
+
+    def _buscar(self, campo: str, valores: Iterable[str]) -> pd.DataFrame:
+        valores = list(valores)
+        rows: List[tuple] = []
+        with closing(self._connect()) as conn:
+            for i in range(0, len(valores), _LOTE_IN):
+                lote = valores[i:i + _LOTE_IN]
+                sql = _SELECT.format(campo=campo, marcas=",".join("?" * len(lote)))
+                rows.extend(conn.execute(sql, lote))
+        rows.sort(key=lambda r: r[0])
+        df = pd.DataFrame(rows, columns=_COLUNAS, dtype=object)
+        df["found"] = True
+        return df
+
+    def por_cpf(self, cpfs: Iterable[str]) -> pd.DataFrame:
+        """Linhas (na ordem da base) cujo CPF em dígitos está em `cpfs`."""
+        return self._buscar("cpf", cpfs)
+
+    def por_nome(self, nomes_norm: Iterable[str]) -> pd.DataFrame:
+        return self._buscar("nome_norm", nomes_norm)
+
+    def por_email(self, emails: Iterable[str]) -> pd.DataFrame:
+        """`emails` já sem espaços e em minúsculas."""
+        return self._buscar("email_key", emails)
+
+    def por_user_id(self, ids: Iterable[str]) -> pd.DataFrame:
+        return self._buscar("user_id", ids)
+
+    def registro_por_cpf(self, cpf_digits: str) -> Optional[dict]:
+        """Primeira linha da base com o CPF, com todas as colunas originais (ou None)."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT dados FROM usuarios WHERE cpf = ? ORDER BY pos LIMIT 1",
+                               (cpf_digits,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+def _linhas_json(df: pd.DataFrame) -> List[str]:
+    # to_json serializa em C; "\n" dentro dos valores sai escapado, então split é seguro
+    if df.empty:
+        return []
+    texto = df.to_json(orient="records", lines=True, force_ascii=False, date_format="iso")
+    return texto.rstrip("\n").split("\n")
+
+
+class UserIndexStore:
+    """Índices em `USER_INDEX_FOLDER`, um arquivo SQLite por base (hash do conteúdo)."""
+
+    def __init__(self, folder: Optional[str] = None, keep: Optional[int] = None):
+        self.folder = folder or settings.USER_INDEX_FOLDER
+        self.keep = settings.USER_INDEX_KEEP if keep is None else keep
+        os.makedirs(self.folder, exist_ok=True)
+
+    def _path(self, indice_id: str) -> str:
+        if not _ID_RE.match(indice_id or ""):
+            raise ValueError("Id de índice inválido.")
+        return os.path.join(self.folder, f"{indice_id}.sqlite")
+
+    def chave(self, file_storage, escopo: str, abas: Optional[str] = None) -> str:
+        """Id do índice de um upload: hash do conteúdo + escopo + abas + formato."""
+        h = hashlib.sha256()
+        h.update(f"{_FORMATO}\x1f{escopo}\x1f{(abas or '').strip()}\x1f".encode("utf-8"))
+        hash_upload(h, file_storage)
+        return h.hexdigest()
+
+    def abrir(self, indice_id: str) -> UserIndex:
+        """Índice já construído; ValueError se não existir (expirado ou id desconhecido)."""
+        path = self._path(indice_id)
+        if not os.path.exists(path):
+            raise ValueError("Índice da base expirado ou inexistente; envie o arquivo novamente.")
+        # Uso conta como acesso para a limpeza dos menos usados
+        os.utime(path)
+        return UserIndex(path)
+
+    def obter(self, file_storage, escopo: str, abas: Optional[str],
+              carregar: Callable[[], Tuple[pd.DataFrame, List[dict]]],
+              cpf_col: Optional[str] = None) -> Optional[UserIndex]:
+        """Índice do upload, ou None na primeira vez que o arquivo aparece.
+
+        Sem índice, um arquivo já visto é lido por `carregar()` e indexado; um
+        arquivo novo só é marcado e a rota segue pela leitura com pandas.
+        `cpf_col` fixa a coluna de CPF indexada (padrão: a detectada pelo esquema).
+        """
+        indice_id = self.chave(file_storage, escopo, abas)
+        try:
+            return self.abrir(indice_id)
+        except ValueError:
+            pass
+        visto = os.path.join(self.folder, f"{indice_id}.visto")
+        if not os.path.exists(visto):
+            with open(visto, "w"):
+                pass
+            self._evict(".visto")
+            return None
+        df, tempos = carregar()
+        indice = self.construir(indice_id, df, tempos, arquivo=file_storage.filename or "", cpf_col=cpf_col)
+        try:
+            os.remove(visto)
+        except OSError:
+            pass
+        return indice
+
+    def construir(self, indice_id: str, df: pd.DataFrame, tempos: Optional[List[dict]] = None,
+                  arquivo: str = "", cpf_col: Optional[str] = None) -> UserIndex:
+        """Grava o índice de `df` (inserção em lote num arquivo temporário + rename atômico)."""
+        path = self._path(indice_id)
+        t0 = time.perf_counter()
+        chaves = chaves_busca(df, cpf_col=cpf_col)
+        email_key = chaves["email"].str.strip().str.lower()
+        nome_norm = chaves.get("nome_norm", pd.Series(None, index=df.index, dtype=object))
+        meta = {
+            "arquivo": arquivo,
+            "linhas": int(len(df)),
+            "colunas": [str(c) for c in df.columns],
+            "cpf_col": chaves["cpf_col"],
+            "tem_cpf": chaves["tem_cpf"], "tem_nome": chaves["tem_nome"], "tem_email": chaves["tem_email"],
+            "tempos": tempos or [],
+            "criado": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        linhas = zip(range(len(df)), chaves["id"].tolist(), chaves["nome"].tolist(), nome_norm.tolist(),
+                     chaves["cpf"].tolist(), chaves["email"].tolist(), email_key.tolist(),
+                     chaves["status_atual"].tolist(), _linhas_json(df.rename(columns=str)))
+
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with closing(sqlite3.connect(tmp)) as conn:
+                # Arquivo temporário: durabilidade só importa após o rename
+                conn.execute("PRAGMA journal_mode=OFF")
+                conn.execute("PRAGMA synchronous=OFF")
+                conn.executescript(_SCHEMA)
+                conn.executemany("INSERT INTO meta VALUES (?, ?)",
+                                 [(k, json.dumps(v, ensure_ascii=False)) for k, v in meta.items()])
+                conn.executemany("INSERT INTO usuarios VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", linhas)
+                conn.executescript(_INDICES)
+                conn.commit()
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        logger.info("Índice %s construído: %d linhas em %.2fs", indice_id[:12], len(df),
+                    time.perf_counter() - t0)
+        self._evict()
+        return UserIndex(path)
+
+    def _evict(self, sufixo: str = ".sqlite") -> None:
+        entries = []
+        for name in os.listdir(self.folder):
+            if not name.endswith(sufixo):
+                continue
+            try:
+                entries.append((os.path.getmtime(os.path.join(self.folder, name)), name))
+            except OSError:
+                continue
+        entries.sort(reverse=True)
+        for _, name in entries[self.keep:] if self.keep else []:
+            try:
+                os.remove(os.path.join(self.folder, name))
+            except OSError:
+                logger.warning("Falha ao remover índice antigo %s", name)
+
+
+user_index = UserIndexStore() if settings.USER_INDEX_ENABLED else None
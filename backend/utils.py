@@ -1,6 +1,11 @@
 # backend/utils.py
+import os
 import re
 import unicodedata
+import uuid
+from itertools import compress
+
+import numpy as np
 
 def normalize_text(s):
     if s is None:
@@ -19,6 +24,49 @@ def limpar_cpf_raw(cpf):
     s = str(cpf)
     return re.sub(r"\D", "", s)
 
+# Pesos dos dígitos verificadores do CPF (10..2 e 11..2)
+_CPF_W1 = np.arange(10, 1, -1, dtype=np.int16)
+_CPF_W2 = np.arange(11, 1, -1, dtype=np.int16)
+
+
+def cpf_matriz(digitos):
+    """Converte CPFs (apenas dígitos) numa matriz (n, 11) uint8.
+
+    Retorna (matriz, tem_11): `matriz` só com as entradas de exatamente 11
+    caracteres, na ordem original, e a máscara dessas entradas.
+    """
+    values = [str(v) for v in digitos]
+    tamanhos = np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+    tem_11 = tamanhos == 11
+    selecionados = values if tem_11.all() else compress(values, tem_11.tolist())
+    raw = np.frombuffer("".join(selecionados).encode("ascii", "replace"), dtype=np.uint8)
+    return raw.reshape(-1, 11) - np.uint8(ord("0")), tem_11
+
+
+def cpf_validos(digitos) -> np.ndarray:
+    """Máscara de CPFs válidos: 11 dígitos, dígitos verificadores corretos e não repetidos.
+
+    Os dois dígitos verificadores (módulo 11) são calculados em lote sobre a
+    matriz de `cpf_matriz`; sequências como 111.111.111-11 são recusadas.
+    """
+    d, tem_11 = cpf_matriz(digitos)
+    validos = np.zeros(len(tem_11), dtype=bool)
+    if not len(d):
+        return validos
+    numericos = (d <= 9).all(axis=1)
+    d = d.astype(np.int16)
+    dv1 = (d[:, :9] @ _CPF_W1) * 10 % 11 % 10
+    dv2 = (d[:, :10] @ _CPF_W2) * 10 % 11 % 10
+    repetido = (d == d[:, :1]).all(axis=1)
+    validos[tem_11] = numericos & (dv1 == d[:, 9]) & (dv2 == d[:, 10]) & ~repetido
+    return validos
+
+
+def cpf_valido(cpf) -> bool:
+    """Um CPF (com ou sem máscara) é válido?"""
+    return bool(cpf_validos([limpar_cpf_raw(cpf)])[0])
+
+
 def format_cpf_for_output(cpf_digits):
     """formata com traço antes dos 2 ultimos digitos: 12345678901 -> 123456789-01"""
     if not cpf_digits:
@@ -28,13 +76,28 @@ def format_cpf_for_output(cpf_digits):
         return f"{s[:-2]}-{s[-2:]}"
     return s
 
+# Planilhas Excel, CSV/TSV (também com gzip) e Parquet
+EXTENSOES_ENTRADA = {'.xlsx', '.xls', '.xltx', '.csv', '.tsv', '.csv.gz', '.tsv.gz', '.parquet'}
+# Extensões compostas: ".gz" sozinho não diz o formato do conteúdo
+_EXTENSOES_COMPOSTAS = ('.csv.gz', '.tsv.gz')
+
+
+def extensao_arquivo(filename: str) -> str:
+    """Extensão em minúsculas, com o ponto; inclui a anterior em `.csv.gz`/`.tsv.gz`."""
+    nome = os.path.basename(filename or "").lower()
+    for ext in _EXTENSOES_COMPOSTAS:
+        if nome.endswith(ext) and len(nome) > len(ext):
+            return ext
+    return os.path.splitext(nome)[1]
+
+
 def validar_extensao_arquivo(filename: str, allowed_extensions: set = None) -> tuple[bool, str]:
     """Valida se a extensão do arquivo é permitida.
     
     Args:
         filename: Nome do arquivo com extensão
         allowed_extensions: Conjunto de extensões permitidas (ex: {'.xlsx', '.xls'})
-                           Se None, usa padrão {'.xlsx', '.xls', '.xltx'}
+                           Se None, usa `EXTENSOES_ENTRADA` (Excel, CSV/TSV, .csv.gz, Parquet)
     
     Returns:
         (bool, str): (é_válido, mensagem_erro)
@@ -43,17 +106,19 @@ def validar_extensao_arquivo(filename: str, allowed_extensions: set = None) -> t
         >>> validar_extensao_arquivo('dados.xlsx')
         (True, '')
         
+        >>> validar_extensao_arquivo('usuarios.csv.gz')
+        (True, '')
+        
         >>> validar_extensao_arquivo('script.txt')
-        (False, 'Extensão não permitida. Aceitos: .xlsx, .xls, .xltx')
+        (False, 'Extensão não permitida. Aceitos: .csv, .csv.gz, .parquet, .tsv, .tsv.gz, .xls, .xlsx, .xltx')
     """
     if allowed_extensions is None:
-        allowed_extensions = {'.xlsx', '.xls', '.xltx'}
+        allowed_extensions = EXTENSOES_ENTRADA
     
     if not filename:
         return False, "Nenhum arquivo fornecido"
     
-    _, ext = filename.rsplit('.', 1) if '.' in filename else ('', '')
-    ext = f".{ext.lower()}" if ext else ""
+    ext = extensao_arquivo(filename)
     
     if not ext:
         return False, "Arquivo sem extensão"
@@ -63,3 +128,14 @@ def validar_extensao_arquivo(filename: str, allowed_extensions: set = None) -> t
         return False, f"Extensão não permitida. Aceitos: {exts_str}"
     
     return True, ""
+
+
+def gerar_nome_arquivo_temporario(filename: str, folder: str) -> str:
+    """Gera um caminho único dentro de `folder`, preservando a extensão original.
+
+    O nome enviado pelo cliente nunca é usado diretamente no disco, evitando
+    colisões entre uploads simultâneos e caminhos maliciosos.
+    """
+    ext = extensao_arquivo(filename)
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, f"{uuid.uuid4().hex}{ext}")
@@ -1,7 +1,7 @@
 # backend/validators.py
 from typing import List, Dict
-from .utils import limpar_cpf_raw, format_cpf_for_output, upper_no_accents
-from .core.logging import get_logger
+from .utils import cpf_valido, limpar_cpf_raw, format_cpf_for_output, upper_no_accents
+from .core.logging import contar, get_logger
 
 MODEL_COLS = [
     "Operacao","UserId","Login","CodigoCCustoCliente","DescricaoCCustoCliente",
@@ -27,9 +27,15 @@ REQUIRED_OUTPUT_COLS = [
 
 logger = get_logger()
 
-def validar_linha(reg):
+def cpf_da_linha(reg) -> str:
+    """Dígitos do CPF do registro (coluna CPF ou, na falta dela, Login)."""
+    return limpar_cpf_raw(reg.get("CPF", "") or reg.get("Login", ""))
+
+
+def validar_linha(reg, cpf_ok=None):
     """
     reg: dict com campos extraidos
+    cpf_ok: validade do CPF já calculada em lote (utils.cpf_validos); se None, calcula aqui
     retorna lista de mensagens de validação (vazia se ok)
     """
     msgs = []
@@ -40,19 +46,20 @@ def validar_linha(reg):
         msgs.append("Solicitante obrigatório (deve ser S ou N)")
     
     # CPF se existir
-    cpf_raw = reg.get("CPF", "") or reg.get("Login", "")
-    digits = limpar_cpf_raw(cpf_raw)
+    digits = cpf_da_linha(reg)
     if digits and len(digits) != 11:
         msgs.append("CPF deve ter 11 dígitos")
+    elif digits and not (cpf_valido(digits) if cpf_ok is None else cpf_ok):
+        msgs.append("CPF inválido (dígitos verificadores)")
     elif not digits and "CPF" in reg and reg["CPF"]:  # CPF vazio ou inválido
-        logger.warning("CPF ausente ou inválido para registro: %s", reg.get("NomeCompleto", "desconhecido"))
+        contar("cadastro.cpf_ausente")
 
     # Email simples (opcional)
     email = reg.get("Email","").strip()
     if email and ("@" not in email or "." not in email.split("@")[-1]):
         msgs.append("Email inválido")
     elif not email and "Email" in reg:  # Email vazio mas esperado
-        logger.warning("Email ausente para registro: %s", reg.get("NomeCompleto", "desconhecido"))
+        contar("cadastro.email_ausente")
 
     # Nome completo
     nomec = reg.get("NomeCompleto","").strip()
@@ -0,0 +1,44 @@
+"""Ponto de entrada WSGI para produção (gunicorn com múltiplos workers).
+
+Uso:
+    gunicorn -c backend/gunicorn.conf.py backend.wsgi:app
+
+Com `preload_app = True` este módulo é importado uma única vez no processo
+master. Tudo o que for carregado aqui (pandas, openpyxl e a última versão
+das bases registradas) é herdado pelos workers via fork e compartilhado em
+copy-on-write, em vez de ser recarregado por cada worker.
+"""
+import io
+import os
+import sys
+
+PARENT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PARENT not in sys.path:
+    sys.path.insert(0, PARENT)
+
+from backend.app import app  # noqa: E402
+from backend.core.logging import get_logger  # noqa: E402
+
+logger = get_logger()
+
+
+def warm_caches() -> None:
+    """Carrega módulos pesados e caches antes do fork dos workers."""
+    import pandas as pd
+    import openpyxl  # noqa: F401
+    from backend.base_versions import base_store
+    from backend.core.config import settings
+
+    # Snapshots das bases registradas: a última versão de cada cliente, já lida
+    base_store.preload_latest(settings.BASE_PRELOAD_MAX_MB * 1024 * 1024)
+
+    # Uma ida e volta em XLSX força os imports tardios do pandas (writer/reader openpyxl)
+    buf = io.BytesIO()
+    pd.DataFrame({'CPF': ['00000000000']}).to_excel(buf, index=False)
+    buf.seek(0)
+    pd.read_excel(buf, dtype=str)
+
+    logger.info('Caches aquecidos antes do fork dos workers.')
+
+
+warm_caches()
@@ -0,0 +1,226 @@
+/* Worker da aba Análise: leitura da planilha, dados em colunas e índice de busca.
+ *
+ * Mensagens recebidas (todas com `id`, devolvido na resposta):
+ *   {type: "parse", buffer}        -> {headers, sheetName, rowCount}   (buffer transferido)
+ *   {type: "search", term, limit}  -> {term, ids: Uint32Array, limited}
+ *   {type: "rows", ids}            -> {rows: string[][]}
+ *   {type: "csv", ids}             -> {csv}
+ * Durante a leitura e a indexação: {type: "progress", id, percent, label}.
+ * Falhas: {type: "error", id, message}.
+ *
+ * O índice é de trigramas, construído em segmentos de SEGMENT_SIZE linhas
+ * depois da leitura, sem bloquear as mensagens: linhas ainda não indexadas
+ * são varridas diretamente. Termos que estendem o termo anterior refinam o
+ * resultado anterior em vez de buscar de novo.
+ */
+importScripts("https://cdn.jsdelivr.net/npm/xlsx@0.18.5/dist/xlsx.full.min.js");
+
+const SEGMENT_SIZE = 8192;
+const SEP = "\u0001";
+
+const store = {
+  headers: [],
+  columns: [],
+  text: [],
+  rowCount: 0,
+  segments: [],
+  indexedRows: 0,
+  generation: 0,
+  last: null,
+};
+
+function reply(id, type, payload, transfer) {
+  self.postMessage(Object.assign({ id, type }, payload), transfer || []);
+}
+
+function parse(id, buffer) {
+  store.generation += 1;
+  store.segments = [];
+  store.indexedRows = 0;
+  store.last = null;
+
+  reply(id, "progress", { percent: 40, label: "Lendo planilha..." });
+  const workbook = XLSX.read(new Uint8Array(buffer), { type: "array", dense: true });
+  const sheetName = workbook.SheetNames[0];
+  const matrix = XLSX.utils.sheet_to_json(workbook.Sheets[sheetName], {
+    header: 1,
+    raw: false,
+    blankrows: false,
+  });
+  if (!matrix.length) {
+    throw new Error("Planilha vazia");
+  }
+
+  reply(id, "progress", { percent: 70, label: "Normalizando dados..." });
+  const headers = matrix[0].map((value, index) => {
+    const label = String(value ?? "").trim();
+    return label || `Coluna ${index + 1}`;
+  });
+  const columns = headers.map(() => []);
+  const text = [];
+  for (let r = 1; r < matrix.length; r += 1) {
+    const row = matrix[r];
+    const values = headers.map((_, index) => {
+      const cell = row[index];
+      return cell === undefined || cell === null ? "" : String(cell).trim();
+    });
+    if (!values.some((value) => value !== "")) continue;
+    values.forEach((value, index) => columns[index].push(value));
+    text.push(values.join(SEP).toLowerCase());
+  }
+
+  store.headers = headers;
+  store.columns = columns;
+  store.text = text;
+  store.rowCount = text.length;
+  scheduleIndexing(store.generation);
+  return { headers, sheetName, rowCount: store.rowCount };
+}
+
+function trigramKey(value, pos) {
+  return (
+    value.charCodeAt(pos) * 4294967296 +
+    value.charCodeAt(pos + 1) * 65536 +
+    value.charCodeAt(pos + 2)
+  );
+}
+
+function rowTrigrams(value) {
+  const keys = new Set();
+  for (let pos = 0; pos + 3 <= value.length; pos += 1) {
+    keys.add(trigramKey(value, pos));
+  }
+  return keys;
+}
+
+// Segmento: chave do trigrama -> fatia [offsets[slot], offsets[slot + 1]) de `postings`
+function buildSegment(start, end) {
+  const perRow = [];
+  const counts = new Map();
+  for (let r = start; r < end; r += 1) {
+    const keys = rowTrigrams(store.text[r]);
+    perRow.push(keys);
+    keys.forEach((key) => counts.set(key, (counts.get(key) || 0) + 1));
+  }
+  const slots = new Map();
+  const offsets = new Uint32Array(counts.size + 1);
+  let total = 0;
+  let slot = 0;
+  counts.forEach((count, key) => {
+    slots.set(key, slot);
+    offsets[slot] = total;
+    total += count;
+    slot += 1;
+  });
+  offsets[slot] = total;
+  const postings = new Uint32Array(total);
+  const fill = offsets.slice(0, slot);
+  perRow.forEach((keys, i) => {
+    keys.forEach((key) => {
+      const s = slots.get(key);
+      postings[fill[s]] = start + i;
+      fill[s] += 1;
+    });
+  });
+  return { start, end, slots, offsets, postings };
+}
+
+function scheduleIndexing(generation) {
+  const step = () => {
+    if (generation !== store.generation || store.indexedRows >= store.rowCount) return;
+    const start = store.indexedRows;
+    const end = Math.min(start + SEGMENT_SIZE, store.rowCount);
+    store.segments.push(buildSegment(start, end));
+    store.indexedRows = end;
+    setTimeout(step, 0);
+  };
+  setTimeout(step, 0);
+}
+
+// Linhas candidatas de um segmento: lista do trigrama menos frequente do termo
+function segmentCandidates(segment, term) {
+  let best = null;
+  for (let pos = 0; pos + 3 <= term.length; pos += 1) {
+    const slot = segment.slots.get(trigramKey(term, pos));
+    if (slot === undefined) return null;
+    const from = segment.offsets[slot];
+    const to = segment.offsets[slot + 1];
+    if (!best || to - from < best.to - best.from) best = { from, to };
+  }
+  return segment.postings.subarray(best.from, best.to);
+}
+
+function search(term, limit) {
+  const ids = [];
+  let limited = false;
+  const accept = (row) => {
+    if (!store.text[row].includes(term)) return true;
+    ids.push(row);
+    if (ids.length >= limit) {
+      limited = true;
+      return false;
+    }
+    return true;
+  };
+
+  const last = store.last;
+  if (last && !last.limited && term.includes(last.term)) {
+    for (const row of last.ids) {
+      if (!accept(row)) break;
+    }
+  } else {
+    let scanFrom = 0;
+    if (term.length >= 3) {
+      outer: for (const segment of store.segments) {
+        const candidates = segmentCandidates(segment, term);
+        scanFrom = segment.end;
+        if (!candidates) continue;
+        for (let i = 0; i < candidates.length; i += 1) {
+          if (!accept(candidates[i])) break outer;
+        }
+      }
+    }
+    for (let row = scanFrom; row < store.rowCount && !limited; row += 1) {
+      accept(row);
+    }
+  }
+
+  const result = Uint32Array.from(ids);
+  store.last = { term, ids: result, limited };
+  return { term, ids: result, limited };
+}
+
+function rows(ids) {
+  return Array.from(ids, (row) => store.columns.map((column) => column[row]));
+}
+
+function csv(ids) {
+  const escapeValue = (value) => `"${String(value ?? "").replace(/"/g, '""')}"`;
+  const head = store.headers.map(escapeValue).join(",");
+  const body = Array.from(ids, (row) =>
+    store.columns.map((column) => escapeValue(column[row])).join(",")
+  );
+  return [head].concat(body).join("\r\n");
+}
+
+self.onmessage = (event) => {
+  const { id, type } = event.data;
+  try {
+    if (type === "parse") {
+      reply(id, "parsed", parse(id, event.data.buffer));
+    } else if (type === "search") {
+      const result = search(event.data.term, event.data.limit);
+      // store.last guarda o resultado; a resposta leva uma cópia transferida
+      const ids = result.ids.slice();
+      reply(id, "results", { term: result.term, ids, limited: result.limited }, [ids.buffer]);
+    } else if (type === "rows") {
+      reply(id, "rows", { rows: rows(event.data.ids) });
+    } else if (type === "csv") {
+      reply(id, "csv", { csv: csv(event.data.ids) });
+    } else {
+      throw new Error(`Mensagem desconhecida: ${type}`);
+    }
+  } catch (error) {
+    reply(id, "error", { message: error.message || String(error) });
+  }
+};
@@ -31,6 +31,21 @@ document.addEventListener("DOMContentLoaded", function () {
     URL.revokeObjectURL(url);
   }
 
+  // Saída dividida em partes (ZIP): campos "Linhas por arquivo" e formato de cada aba
+  function addSaidaPartes(prefix, extraData) {
+    const maxRows = document.getElementById(`${prefix}_max_rows`);
+    const formato = document.getElementById(`${prefix}_formato_saida`);
+    if (maxRows && maxRows.value.trim()) {
+      extraData.max_rows_per_file = maxRows.value.trim();
+      extraData.formato_saida = formato ? formato.value : "xlsx";
+    }
+    return extraData;
+  }
+
+  function nomeSaida(blob, base) {
+    return blob && blob.type === "application/zip" ? `${base}.zip` : `${base}.xlsx`;
+  }
+
   function applyRasterInvertToUploadZones() {
     try {
       const invert = document.body.classList.contains("dark");
@@ -42,31 +57,19 @@ document.addEventListener("DOMContentLoaded", function () {
     }
   }
 
-  async function ensureXlsx() {
-    if (window.XLSX) return;
-    const script = document.createElement("script");
-    script.src =
-      "https://cdn.jsdelivr.net/npm/xlsx@0.18.5/dist/xlsx.full.min.js";
-    document.head.appendChild(script);
-    await new Promise((resolve, reject) => {
-      script.onload = resolve;
-      script.onerror = reject;
-    });
-  }
-
   async function postFiles(url, filesInput, extra = {}, single = false) {
     const fd = new FormData();
     if (single) {
       if (!filesInput || !filesInput.base || !filesInput.base.files?.[0]) {
         throw new Error("Arquivo base ausente");
       }
-      fd.append("base", filesInput.base.files[0]);
+      await ChunkedUpload.append(fd, "base", filesInput.base.files[0]);
       if (filesInput.lista?.files?.[0]) {
-        fd.append("lista", filesInput.lista.files[0]);
+        await ChunkedUpload.append(fd, "lista", filesInput.lista.files[0]);
       }
     } else {
       for (const file of filesInput.files || []) {
-        fd.append("files[]", file);
+        await ChunkedUpload.append(fd, "files[]", file);
       }
     }
     Object.entries(extra || {}).forEach(([key, value]) =>
@@ -426,6 +429,52 @@ document.addEventListener("DOMContentLoaded", function () {
 
   applyRasterInvertToUploadZones();
 
+  // Cliente do worker da aba Análise (static/js/analise/worker.js): a leitura
+  // da planilha, os dados e a busca ficam fora da thread principal.
+  class AnaliseWorkerClient {
+    constructor(onProgress) {
+      this.onProgress = onProgress;
+      this.seq = 0;
+      this.pending = new Map();
+      this.worker = new Worker("static/js/analise/worker.js");
+      this.worker.onmessage = (event) => this.handleMessage(event.data);
+      this.worker.onerror = (event) => {
+        const error = new Error(event.message || "Falha no processamento da planilha");
+        this.pending.forEach(({ reject }) => reject(error));
+        this.pending.clear();
+      };
+    }
+
+    request(type, payload = {}, transfer = []) {
+      this.seq += 1;
+      const id = this.seq;
+      return new Promise((resolve, reject) => {
+        this.pending.set(id, { resolve, reject });
+        this.worker.postMessage({ ...payload, id, type }, transfer);
+      });
+    }
+
+    handleMessage(message) {
+      if (message.type === "progress") {
+        this.onProgress?.(message.percent, message.label);
+        return;
+      }
+      const entry = this.pending.get(message.id);
+      if (!entry) return;
+      this.pending.delete(message.id);
+      if (message.type === "error") {
+        entry.reject(new Error(message.message));
+      } else {
+        entry.resolve(message);
+      }
+    }
+
+    terminate() {
+      this.worker.terminate();
+      this.pending.clear();
+    }
+  }
+
   class AnaliseWorkspace {
     constructor(root) {
       this.root = root;
@@ -463,9 +512,10 @@ document.addEventListener("DOMContentLoaded", function () {
 
       this.state = {
         headers: [],
-        rows: [],
-        activeRows: [],
+        rowCount: 0,
+        activeIds: new Uint32Array(0),
         renderCursor: 0,
+        renderToken: 0,
         searchTerm: "",
         sheetName: "",
         fileName: "",
@@ -473,6 +523,7 @@ document.addEventListener("DOMContentLoaded", function () {
       };
       this.rowChunkSize = 220;
       this.maxSearchResults = 10000;
+      this.worker = null;
       this.prefs = this.loadPreferences();
       this.handleSearchDebounced = debounce((value) =>
         this.handleSearch(value)
@@ -595,11 +646,10 @@ document.addEventListener("DOMContentLoaded", function () {
             ${escapeHtml(file.name)}`);
         }
         this.setProgress(8, `Preparando ${file.name}`);
-        await ensureXlsx();
-        this.setProgress(35, "Lendo planilha...");
         const buffer = await file.arrayBuffer();
-        this.setProgress(65, "Normalizando dados...");
-        const payload = this.parseBuffer(buffer);
+        this.setProgress(25, "Enviando planilha...");
+        // o ArrayBuffer é transferido para o worker (sem cópia)
+        const payload = await this.getWorker().request("parse", { buffer }, [buffer]);
         this.setProgress(92, "Renderizando");
         this.afterDataLoaded(payload, file);
         this.setProgress(100, "Concluído");
@@ -619,45 +669,33 @@ document.addEventListener("DOMContentLoaded", function () {
       }
     }
 
-    parseBuffer(buffer) {
-      const workbook = XLSX.read(buffer, { type: "array", dense: true });
-      const sheetName = workbook.SheetNames[0];
-      const sheet = workbook.Sheets[sheetName];
-      const matrix = XLSX.utils.sheet_to_json(sheet, {
-        header: 1,
-        raw: false,
-        blankrows: false,
-      });
-      if (!matrix.length) {
-        throw new Error("Planilha vazia");
+    getWorker() {
+      if (!this.worker) {
+        this.worker = new AnaliseWorkerClient((percent, label) =>
+          this.setProgress(percent, label)
+        );
       }
-      const headers = matrix[0].map((value, index) => {
-        const label = String(value ?? "").trim();
-        return label || `Coluna ${index + 1}`;
-      });
-      const rows = matrix.slice(1).map((row) => {
-        const entry = {};
-        headers.forEach((header, index) => {
-          const cell = row[index];
-          entry[header] = cell === undefined || cell === null ? "" : String(cell).trim();
-        });
-        return entry;
-      }).filter((row) => headers.some((header) => row[header] !== ""));
-      return { headers, rows, sheetName };
+      return this.worker;
+    }
+
+    allRowIds() {
+      const ids = new Uint32Array(this.state.rowCount);
+      for (let i = 0; i < ids.length; i += 1) ids[i] = i;
+      return ids;
     }
 
     afterDataLoaded(payload, file) {
-      const { headers, rows, sheetName } = payload;
+      const { headers, rowCount, sheetName } = payload;
       this.state.headers = headers;
-      this.state.rows = rows;
-      this.state.activeRows = rows.slice();
+      this.state.rowCount = rowCount;
+      this.state.activeIds = this.allRowIds();
       this.state.sheetName = sheetName;
       this.state.fileName = file.name;
       this.state.renderCursor = 0;
       this.state.searchTerm = "";
       this.state.searchLimited = false;
 
-      this.updateSummary(rows.length, headers.length, file.name, sheetName);
+      this.updateSummary(rowCount, headers.length, file.name, sheetName);
       this.renderHeaders();
       this.renderRows();
       this.toggleEmptyState(false);
@@ -695,10 +733,11 @@ document.addEventListener("DOMContentLoaded", function () {
     }
 
     renderRows() {
-      const rows = this.state.activeRows;
+      const ids = this.state.activeIds;
       this.refs.tableBody.innerHTML = "";
       this.state.renderCursor = 0;
-      if (!rows.length) {
+      this.state.renderToken += 1;
+      if (!ids.length) {
         if (this.refs.footerText) {
           this.refs.footerText.textContent = "Sem linhas correspondentes";
         }
@@ -710,33 +749,34 @@ document.addEventListener("DOMContentLoaded", function () {
       this.refs.tableViewport?.removeAttribute("hidden");
       if (this.refs.footer) this.refs.footer.hidden = false;
       this.toggleEmptyState(false);
-      this.appendNextChunk();
+      this.appendNextChunk().catch((error) => this.handleError(error));
     }
 
-    appendNextChunk() {
-      const rows = this.state.activeRows;
-      if (this.state.renderCursor >= rows.length) return;
+    async appendNextChunk() {
+      const ids = this.state.activeIds;
+      if (this.state.renderCursor >= ids.length) return;
+      const token = this.state.renderToken;
       const start = this.state.renderCursor;
-      const end = Math.min(start + this.rowChunkSize, rows.length);
-      const slice = rows.slice(start, end);
-      const html = slice
+      const end = Math.min(start + this.rowChunkSize, ids.length);
+      this.state.renderCursor = end;
+      // só as linhas da janela visível saem do worker
+      const { rows } = await this.worker.request("rows", { ids: ids.slice(start, end) });
+      if (token !== this.state.renderToken) return;
+      const html = rows
         .map((row) =>
           "<tr>" +
-            this.state.headers
-              .map((header) => `<td>${escapeHtml(row[header] ?? "")}</td>`)
-              .join("") +
+            row.map((value) => `<td>${escapeHtml(value ?? "")}</td>`).join("") +
             "</tr>"
         )
         .join("");
       this.refs.tableBody.insertAdjacentHTML("beforeend", html);
-      this.state.renderCursor = end;
       this.updateFooter();
     }
 
     updateFooter() {
       if (!this.refs.footerText) return;
       const rendered = this.state.renderCursor;
-      const total = this.state.activeRows.length;
+      const total = this.state.activeIds.length;
       const parts = [`${rendered.toLocaleString("pt-BR")} / ${total.toLocaleString("pt-BR")} linhas visíveis`];
       if (this.state.searchTerm) {
         parts.push(`Filtro ativo: "${escapeHtml(this.state.searchTerm)}"`);
@@ -748,46 +788,50 @@ document.addEventListener("DOMContentLoaded", function () {
     }
 
     handleScroll(event) {
-      if (this.state.renderCursor >= this.state.activeRows.length) return;
+      if (this.state.renderCursor >= this.state.activeIds.length) return;
       const viewport = event.target;
       const nearBottom =
         viewport.scrollTop + viewport.clientHeight >= viewport.scrollHeight - 120;
       if (nearBottom && !this.state.loadingChunk) {
         this.state.loadingChunk = true;
-        requestAnimationFrame(() => {
-          this.appendNextChunk();
-          this.state.loadingChunk = false;
-        });
+        this.appendNextChunk()
+          .catch((error) => this.handleError(error))
+          .finally(() => {
+            this.state.loadingChunk = false;
+          });
       }
     }
 
-    handleSearch(value) {
+    async handleSearch(value) {
       const term = (value || "").trim().toLowerCase();
       this.state.searchTerm = term;
       this.state.searchLimited = false;
       if (!term) {
-        this.state.activeRows = this.state.rows.slice();
+        this.state.activeIds = this.allRowIds();
         this.renderRows();
         this.updateChips();
         return;
       }
-      const filtered = [];
-      for (const row of this.state.rows) {
-        const match = this.state.headers.some((header) =>
-          String(row[header] || "").toLowerCase().includes(term)
-        );
-        if (match) {
-          filtered.push(row);
-          if (filtered.length >= this.maxSearchResults) {
-            this.state.searchLimited = true;
-            break;
-          }
+      let ids = new Uint32Array(0);
+      if (this.worker && this.state.rowCount) {
+        try {
+          const result = await this.worker.request("search", {
+            term,
+            limit: this.maxSearchResults,
+          });
+          // resposta de um termo já substituído por outro
+          if (term !== this.state.searchTerm) return;
+          ids = result.ids;
+          this.state.searchLimited = result.limited;
+        } catch (error) {
+          this.handleError(error);
+          return;
         }
       }
-      this.state.activeRows = filtered;
+      this.state.activeIds = ids;
       this.renderRows();
       this.updateChips();
-      if (!filtered.length) {
+      if (!ids.length) {
         this.refs.footerText.textContent = "Nenhum resultado encontrado";
       }
     }
@@ -801,7 +845,7 @@ document.addEventListener("DOMContentLoaded", function () {
           action: () => {
             this.state.searchTerm = "";
             this.refs.searchInput && (this.refs.searchInput.value = "");
-            this.state.activeRows = this.state.rows.slice();
+            this.state.activeIds = this.allRowIds();
             this.renderRows();
             this.updateChips();
           },
@@ -916,34 +960,30 @@ document.addEventListener("DOMContentLoaded", function () {
       }
     }
 
-    exportCsv() {
-      if (!this.state.headers.length || !this.state.activeRows.length) {
+    async exportCsv() {
+      if (!this.state.headers.length || !this.state.activeIds.length) {
         showToast("Nenhum dado para exportar", "info");
         return;
       }
       const limit = 20000;
-      const slice = this.state.activeRows.slice(0, limit);
-      const csv = this.buildCsv(slice);
+      const ids = this.state.activeIds.slice(0, limit);
+      let csv;
+      try {
+        ({ csv } = await this.worker.request("csv", { ids }));
+      } catch (error) {
+        this.handleError(error);
+        return;
+      }
       const name = this.state.fileName
         ? this.state.fileName.replace(/\.[^.]+$/, "")
         : "analise";
       const blob = new Blob([csv], { type: "text/csv;charset=utf-8;" });
       downloadBlob(blob, `${name}_analise.csv`);
       showToast(
-        slice.length < limit ? "CSV exportado" : `Exportando ${slice.length.toLocaleString("pt-BR")} linhas (limite)`
+        ids.length < limit ? "CSV exportado" : `Exportando ${ids.length.toLocaleString("pt-BR")} linhas (limite)`
       );
     }
 
-    buildCsv(rows) {
-      const escapeValue = (value) =>
-        `"${String(value ?? "").replace(/"/g, '""')}"`;
-      const head = this.state.headers.map(escapeValue).join(",");
-      const body = rows.map((row) =>
-        this.state.headers.map((header) => escapeValue(row[header])).join(",")
-      );
-      return [head].concat(body).join("\r\n");
-    }
-
     setProgress(percent, label) {
       if (!this.refs.progress || !this.refs.progressBar) return;
       this.refs.progress.hidden = false;
@@ -983,9 +1023,14 @@ document.addEventListener("DOMContentLoaded", function () {
 
     reset(showNotice) {
       this.state.headers = [];
-      this.state.rows = [];
-      this.state.activeRows = [];
+      this.state.rowCount = 0;
+      this.state.activeIds = new Uint32Array(0);
       this.state.renderCursor = 0;
+      this.state.renderToken += 1;
+      if (this.worker) {
+        this.worker.terminate();
+        this.worker = null;
+      }
       this.state.searchTerm = "";
       this.state.fileName = "";
       this.state.sheetName = "";
@@ -1147,10 +1192,15 @@ document.addEventListener("DOMContentLoaded", function () {
         }
         // Preview: pedir ao servidor quantas correspondências serão geradas
         const fdPreview = new FormData();
-        fdPreview.append("base", base.files[0]);
-        if (lista.files[0]) fdPreview.append("lista", lista.files[0]);
+        await ChunkedUpload.append(fdPreview, "base", base.files[0]);
+        if (lista.files[0]) await ChunkedUpload.append(fdPreview, "lista", lista.files[0]);
         if (extraData.lista_text)
           fdPreview.append("lista_text", extraData.lista_text);
+        const abasInput = document.getElementById("inativacao_abas");
+        if (abasInput && abasInput.value.trim()) {
+          extraData.abas = abasInput.value.trim();
+          fdPreview.append("abas", extraData.abas);
+        }
         // anexar parâmetros de fuzzy
         const useFuzzyCheckbox = document.getElementById("use_fuzzy");
         const fuzzyCutoffInput = document.getElementById("fuzzy_cutoff");
@@ -1507,6 +1557,7 @@ document.addEventListener("DOMContentLoaded", function () {
         if (fuzzyCutoffInput)
           extraData.fuzzy_cutoff = fuzzyCutoffInput.value || "0.90";
 
+        addSaidaPartes("inativacao", extraData);
         const resp = await postFiles(
           "/api/process_inativacao",
           { base, lista: lista.files[0] ? lista : null },
@@ -1515,7 +1566,7 @@ document.addEventListener("DOMContentLoaded", function () {
         );
         if (!resp.blob || resp.blob.size === 0)
           throw new Error("Arquivo gerado inválido");
-        downloadBlob(resp.blob, "saida_inativacao.xlsx");
+        downloadBlob(resp.blob, nomeSaida(resp.blob, "saida_inativacao"));
         setStatus(status, '<span class="text-success">✔ Concluído</span>');
         showToast("Inativação processada!", "success");
         addToHistory(
@@ -1777,7 +1828,7 @@ document.addEventListener("DOMContentLoaded", function () {
       const html = `
         <div class="text-start">
           <ol class="ps-2 small">
-            <li><strong>1º Passo:</strong> carregue a planilha Excel (<strong>.xlsx/.xls</strong>) já preenchida.</li>
+            <li><strong>1º Passo:</strong> carregue a planilha (<strong>.xlsx/.xls</strong>, <strong>.csv/.tsv</strong> ou <strong>.parquet</strong>) já preenchida.</li>
             <li><strong>2º Passo:</strong> escolha o <strong>tipo de login</strong> (CPF ou e-mail) e o <strong>fluxo</strong> (SELF ou FRONT).</li>
             <li><strong>3º Passo:</strong> clique em <em>Gerar</em> para processar e obter o arquivo pronto para carga.</li>
             <li><strong>4º Passo:</strong> acompanhe e recupere execuções no <strong>Histórico</strong> quando precisar.</li>
@@ -1800,7 +1851,7 @@ document.addEventListener("DOMContentLoaded", function () {
         <div class="text-start">
           <p class="mb-2 fw-semibold">Passos para inativação rápida</p>
           <ol class="ps-2 small">
-            <li><strong>1º Passo:</strong> envie a base de usuários em Excel (.xlsx).</li>
+            <li><strong>1º Passo:</strong> envie a base de usuários (Excel, CSV/TSV ou Parquet).</li>
             <li><strong>2º Passo:</strong> cole <strong>CPFs</strong>, <strong>nomes completos</strong> ou <strong>e-mails</strong>, um por linha.</li>
             <li><strong>3º Passo:</strong> use <em>Buscar</em> para conferir quem será afetado e os status atuais.</li>
             <li><strong>4º Passo:</strong> finalize em <strong>Gerar</strong> para baixar o relatório da inativação.</li>
@@ -1864,6 +1915,7 @@ document.addEventListener("DOMContentLoaded", function () {
         const loading = document.getElementById('cadastro_loading');
         const progress = document.getElementById('cadastro_progress');
         const progressBar = document.getElementById('cadastro_progressBar');
+        const erros = document.getElementById('cadastro_erros');
         try { if (files) files.value = ''; } catch(_) {}
         try { if (names) names.innerHTML = ''; } catch(_) {}
         try { if (status) status.innerHTML = ''; } catch(_) {}
@@ -1871,11 +1923,39 @@ document.addEventListener("DOMContentLoaded", function () {
         try { if (loading) loading.classList.add('d-none'); } catch(_) {}
         try { if (progress) progress.classList.add('d-none'); } catch(_) {}
         try { if (progressBar) { progressBar.style.width = '0%'; progressBar.textContent = ''; progressBar.setAttribute('aria-valuenow','0'); } } catch(_) {}
+        try { if (erros) { erros.innerHTML = ''; erros.classList.add('d-none'); } } catch(_) {}
         clearCadastroFeedback();
         showToast('Seleção de cadastro limpa.', 'info');
       });
     }
 
+    // Campos do formulário de cadastro (os mesmos para "Gerar" e "Validar")
+    function cadastroExtraData() {
+      const loginChoiceEl = document.getElementById('cadastro_login_choice');
+      const fluxoEl = document.getElementById('cadastro_fluxo');
+      const loginChoice = loginChoiceEl ? loginChoiceEl.value : 'CPF';
+      const fluxo = fluxoEl ? fluxoEl.value : 'SELF';
+      const extraData = { login_choice: loginChoice, fluxo };
+      const abasEl = document.getElementById('cadastro_abas');
+      if (abasEl && abasEl.value.trim()) extraData.abas = abasEl.value.trim();
+      if (fluxo === 'SELF') {
+        extraData.vip = 'N';
+        extraData.viajanteMasterNacional = 'N';
+        extraData.viajanteMasterInternacional = 'N';
+        extraData.solicitanteMaster = 'N';
+        extraData.masterAdiantamento = 'N';
+        extraData.masterReembolso = 'N';
+      } else if (fluxo === 'FRONT') {
+        extraData.vip = 'N';
+        extraData.viajanteMasterNacional = 'S';
+        extraData.viajanteMasterInternacional = 'S';
+        extraData.solicitanteMaster = 'N';
+        extraData.masterAdiantamento = 'N';
+        extraData.masterReembolso = 'N';
+      }
+      return extraData;
+    }
+
     // Cadastro: processar planilha (ativar botão "Gerar")
     const cadastroBtn = document.getElementById('cadastro_btn');
     let cadastroInProgress = false;
@@ -1890,8 +1970,6 @@ document.addEventListener("DOMContentLoaded", function () {
         const debug = document.getElementById('cadastro_debug');
         const loading = document.getElementById('cadastro_loading');
         const progress = document.getElementById('cadastro_progress');
-        const loginChoiceEl = document.getElementById('cadastro_login_choice');
-        const fluxoEl = document.getElementById('cadastro_fluxo');
 
         try {
           if (!status || !debug || !loading || !progress) {
@@ -1906,28 +1984,13 @@ document.addEventListener("DOMContentLoaded", function () {
             throw new Error('Selecione pelo menos um arquivo');
           }
 
-          const loginChoice = loginChoiceEl ? loginChoiceEl.value : 'CPF';
-          const fluxo = fluxoEl ? fluxoEl.value : 'SELF';
-          const extraData = { login_choice: loginChoice, fluxo };
-          if (fluxo === 'SELF') {
-            extraData.vip = 'N';
-            extraData.viajanteMasterNacional = 'N';
-            extraData.viajanteMasterInternacional = 'N';
-            extraData.solicitanteMaster = 'N';
-            extraData.masterAdiantamento = 'N';
-            extraData.masterReembolso = 'N';
-          } else if (fluxo === 'FRONT') {
-            extraData.vip = 'N';
-            extraData.viajanteMasterNacional = 'S';
-            extraData.viajanteMasterInternacional = 'S';
-            extraData.solicitanteMaster = 'N';
-            extraData.masterAdiantamento = 'N';
-            extraData.masterReembolso = 'N';
-          }
+          const extraData = cadastroExtraData();
+          const { login_choice: loginChoice, fluxo } = extraData;
 
+          addSaidaPartes('cadastro', extraData);
           const resp = await postFiles('/api/process_cadastro', files, extraData);
           if (!resp.blob || resp.blob.size === 0) throw new Error('Arquivo gerado inválido');
-          downloadBlob(resp.blob, 'saida_cadastro.xlsx');
+          downloadBlob(resp.blob, nomeSaida(resp.blob, 'saida_cadastro'));
           setStatus(status, '<span class="text-success">✔ Concluído</span>');
           showToast(`Cadastro processado! Opções: ${loginChoice}, ${fluxo}.`, 'success');
           try { addToHistory(`Cadastro gerado: ${files.files[0].name} - ${new Date().toLocaleString('pt-BR')}`); } catch(_) {}
@@ -1946,6 +2009,95 @@ document.addEventListener("DOMContentLoaded", function () {
       });
     }
 
+    // Cadastro: validar sem gerar o arquivo (botão "Validar").
+    // A resposta é NDJSON: cada linha é um evento e os erros aparecem enquanto chegam.
+    const CADASTRO_MAX_ERROS = 500;
+    const cadastroValidarBtn = document.getElementById('cadastro_validar_btn');
+    let cadastroValidando = null;
+    if (cadastroValidarBtn) {
+      cadastroValidarBtn.addEventListener('click', async () => {
+        // Segundo clique durante a validação: interrompe (o servidor encerra ao perder a conexão)
+        if (cadastroValidando) { cadastroValidando.abort(); return; }
+        const files = document.getElementById('cadastro_files');
+        const status = document.getElementById('cadastro_status');
+        const debug = document.getElementById('cadastro_debug');
+        const lista = document.getElementById('cadastro_erros');
+        if (!files || !files.files || !files.files.length) {
+          showToast('Selecione pelo menos um arquivo', 'warning');
+          return;
+        }
+        cadastroValidando = new AbortController();
+        cadastroValidarBtn.textContent = 'Parar';
+        if (debug) debug.textContent = '';
+        lista.innerHTML = '';
+        lista.classList.add('d-none');
+        setStatus(status, '<span class="spinner-border spinner-border-sm text-primary me-2" role="status"></span>Enviando...');
+
+        let comErro = 0;
+        let resumo = null;
+        const mostrarEvento = (ev) => {
+          if (ev.tipo === 'arquivo') {
+            setStatus(status, `<span class="spinner-border spinner-border-sm text-primary me-2" role="status"></span>Validando ${escapeHtml(ev.arquivo)} (${ev.registros} registros)...`);
+          } else if (ev.tipo === 'erro' || ev.tipo === 'geral' || ev.tipo === 'falha') {
+            let texto;
+            if (ev.tipo === 'erro') {
+              comErro += 1;
+              const onde = [ev.arquivo, ev.aba, ev.linha ? `linha ${ev.linha}` : ''].filter(Boolean).join(' · ');
+              texto = `<strong>${escapeHtml(onde)}</strong> ${escapeHtml(ev.nome || ev.login || '')}: ${escapeHtml(ev.mensagens.join('; '))}`;
+            } else if (ev.tipo === 'geral') {
+              texto = `<strong>Geral:</strong> ${escapeHtml(ev.mensagens.join('; '))}`;
+            } else {
+              texto = `<strong>${escapeHtml(ev.arquivo || 'Falha')}:</strong> ${escapeHtml(ev.erro)}`;
+            }
+            lista.insertAdjacentHTML('beforeend', `<li class="list-group-item text-danger py-1">${texto}</li>`);
+            lista.classList.remove('d-none');
+          } else if (ev.tipo === 'resumo') {
+            resumo = ev;
+          }
+        };
+
+        try {
+          const fd = new FormData();
+          for (const file of files.files) await ChunkedUpload.append(fd, 'files[]', file);
+          for (const [key, value] of Object.entries(cadastroExtraData())) fd.append(key, value);
+          fd.append('max_erros', String(CADASTRO_MAX_ERROS));
+          const resp = await fetch('/api/process_cadastro/validar', { method: 'POST', body: fd, signal: cadastroValidando.signal });
+          if (!resp.ok) {
+            const body = await resp.json().catch(() => ({}));
+            throw new Error(body.error || `HTTP ${resp.status}`);
+          }
+          const reader = resp.body.getReader();
+          const decoder = new TextDecoder();
+          let pendente = '';
+          for (;;) {
+            const { value, done } = await reader.read();
+            pendente += decoder.decode(value || new Uint8Array(), { stream: !done });
+            const linhas = pendente.split('\n');
+            pendente = linhas.pop();
+            for (const linha of linhas) if (linha.trim()) mostrarEvento(JSON.parse(linha));
+            if (done) break;
+          }
+          if (resumo) {
+            const parcial = resumo.interrompido ? ` (interrompida após ${CADASTRO_MAX_ERROS} registros com erro)` : '';
+            const cls = resumo.com_erro ? 'text-danger' : 'text-success';
+            setStatus(status, `<span class="${cls}">${resumo.com_erro ? '✖' : '✔'} ${resumo.validados} de ${resumo.registros} registros validados, ${resumo.com_erro} com erro${parcial}.</span>`);
+          } else {
+            setStatus(status, `<span class="text-warning">Validação incompleta: ${comErro} registros com erro até aqui.</span>`);
+          }
+        } catch (err) {
+          if (err?.name === 'AbortError') {
+            setStatus(status, `<span class="text-warning">Validação interrompida: ${comErro} registros com erro até aqui.</span>`);
+          } else {
+            setStatus(status, '');
+            if (debug) debug.textContent = 'Erro: ' + (err?.message || err);
+            showToast('Erro ao validar cadastro: ' + (err?.message || err), 'danger');
+          }
+        }
+        cadastroValidando = null;
+        cadastroValidarBtn.textContent = 'Validar';
+      });
+    }
+
     // Estruturas de aprovação: Remover aprovador por CPF
     const aprovUsersInput = document.getElementById('aprovacao_users_file');
     const aprovUsersPickBtn = document.getElementById('aprovacao_users_pick');
@@ -1981,6 +2133,14 @@ document.addEventListener("DOMContentLoaded", function () {
     const aprovSelectedCount = document.getElementById('aprovacao_selected_count');
 
     let aprovCurrentItems = [];
+    // Índice da base de usuários devolvido pelo preview: o export consulta o índice sem reenviar o arquivo
+    let aprovUsersIndice = null;
+
+    // Abas da base de usuários (vazio = primeira aba)
+    function appendAprovAbas(formData) {
+      const abasEl = document.getElementById('aprovacao_abas');
+      if (abasEl && abasEl.value.trim()) formData.append('abas', abasEl.value.trim());
+    }
 
     function setAprovStatus(message, isError = false) {
       if (!aprovStatus) return;
@@ -2320,9 +2480,16 @@ document.addEventListener("DOMContentLoaded", function () {
       }
 
       const formData = new FormData();
-      formData.append('users_file', usersFile);
-      formData.append('base_file', baseFile);
+      try {
+        await ChunkedUpload.append(formData, 'users_file', usersFile);
+        await ChunkedUpload.append(formData, 'base_file', baseFile);
+      } catch (err) {
+        setAprovStatus(err.message || 'Falha no envio dos arquivos.', true);
+        showToast(err.message || 'Falha no envio dos arquivos.', 'danger');
+        return;
+      }
       formData.append('cpf', rawCpf);
+      appendAprovAbas(formData);
 
       if (aprovPreviewBtn) aprovPreviewBtn.disabled = true;
       if (aprovRemoveAllBtn) aprovRemoveAllBtn.disabled = true;
@@ -2343,6 +2510,7 @@ document.addEventListener("DOMContentLoaded", function () {
         }
 
         aprovCurrentItems = data.items || [];
+        aprovUsersIndice = data.usersIndice ? { file: usersFile, id: data.usersIndice } : null;
         if (!aprovCurrentItems.length) {
           setAprovStatus('Nenhuma estrutura encontrada para o CPF informado.', true);
           showToast('Nenhuma estrutura encontrada para o CPF informado.', 'info');
@@ -2404,11 +2572,23 @@ document.addEventListener("DOMContentLoaded", function () {
         return;
       }
 
+      const usersIndice = aprovUsersIndice && aprovUsersIndice.file === usersFile ? aprovUsersIndice.id : null;
       const formData = new FormData();
-      formData.append('users_file', usersFile);
-      formData.append('base_file', baseFile);
+      try {
+        if (usersIndice) {
+          formData.append('users_indice', usersIndice);
+        } else {
+          await ChunkedUpload.append(formData, 'users_file', usersFile);
+        }
+        await ChunkedUpload.append(formData, 'base_file', baseFile);
+      } catch (err) {
+        setAprovStatus(err.message || 'Falha no envio dos arquivos.', true);
+        showToast(err.message || 'Falha no envio dos arquivos.', 'danger');
+        return;
+      }
       formData.append('cpf', rawCpf);
       formData.append('mode', mode);
+      appendAprovAbas(formData);
 
       if (aprovRemoveSecondLevel && aprovRemoveSecondLevel.checked) {
         formData.append('remove_second_level', '1');
@@ -2473,6 +2653,15 @@ document.addEventListener("DOMContentLoaded", function () {
             }
           }
           
+          if (usersIndice && /índice/i.test(errData?.error || '')) {
+            // Índice expirado no servidor: repete enviando o arquivo
+            aprovUsersIndice = null;
+            if (aprovRemoveAllBtn) aprovRemoveAllBtn.disabled = false;
+            if (aprovRemoveSelectedBtn) aprovRemoveSelectedBtn.disabled = false;
+            if (aprovPreviewBtn) aprovPreviewBtn.disabled = false;
+            return callAprovExport(mode, ignoreEmptyWarning);
+          }
+
           const msg = errData?.error || 'Erro ao gerar base de aprovação atualizada.';
           setAprovStatus(msg, true);
           showToast(msg, 'danger');
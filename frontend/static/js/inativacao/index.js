@@ -56,6 +56,71 @@
     return parts.length >= 2 && norm.trim().length >= 3;
   };
 
+  // Abas da base (vazio = primeira aba)
+  function appendAbas(fd){
+    const abas = ($('inativacao_abas')?.value || '').trim();
+    if(abas) fd.append('abas', abas);
+  }
+
+  // Projeção da base no navegador (static/js/inativacao/worker.js): com a opção
+  // marcada e sem escolha de abas, a planilha é lida num Web Worker e só as
+  // colunas usadas pelo servidor (/api/inativacao/colunas) sobem, em TSV gzip.
+  // O arquivo projetado fica guardado por arquivo escolhido (busca e geração).
+  const projecoes = new WeakMap();
+  const fmtMb = (bytes)=> (bytes / (1024 * 1024)).toFixed(1).replace('.', ',') + ' MB';
+
+  function podeProjetar(file){
+    return !!(file && window.Worker && $('inativacao_projetar')?.checked
+      && !($('inativacao_abas')?.value || '').trim() && /\.(xlsx|xlsm|xls)$/i.test(file.name));
+  }
+
+  function chamarWorker(worker, type, payload = {}, transfer = []){
+    return new Promise((resolve, reject)=>{
+      worker.onmessage = (event)=> event.data.type === 'error' ? reject(new Error(event.data.message)) : resolve(event.data);
+      worker.onerror = (event)=> reject(new Error(event.message || 'Falha na leitura da base'));
+      worker.postMessage({ ...payload, id: 1, type }, transfer);
+    });
+  }
+
+  async function baseParaEnvio(file, statusEl){
+    if(!podeProjetar(file)) return file;
+    if(projecoes.has(file)) return projecoes.get(file);
+    const worker = new Worker('static/js/inativacao/worker.js');
+    try {
+      if (statusEl) statusEl.innerHTML = '<span class="spinner-border spinner-border-sm me-2 text-primary"></span>Lendo a base no navegador...';
+      const buffer = await file.arrayBuffer();
+      const { amostra } = await chamarWorker(worker, 'ler', { buffer }, [buffer]);
+      const resp = await fetch('/api/inativacao/colunas', {
+        method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ amostra }),
+      });
+      const plano = await resp.json();
+      if(!resp.ok) throw new Error(plano.error || 'Falha ao consultar as colunas da base');
+      if(!plano.posicoes.length) return file;
+      const out = await chamarWorker(worker, 'projetar', {
+        linhaCabecalho: plano.linha_cabecalho, posicoes: plano.posicoes, colunas: plano.colunas,
+      });
+      const nome = file.name.replace(/\.[^.]+$/, '') + (out.gzip ? '.tsv.gz' : '.tsv');
+      // mesma data do original: o upload em blocos retoma pelo nome + tamanho + data
+      const projetado = new File([out.buffer], nome, { type: out.gzip ? 'application/gzip' : 'text/tab-separated-values', lastModified: file.lastModified });
+      projecoes.set(file, projetado);
+      showToast(`Base reduzida para ${plano.colunas.length} colunas: ${fmtMb(file.size)} → ${fmtMb(projetado.size)}.`, 'info');
+      return projetado;
+    } catch(err){
+      console.debug('Projeção da base indisponível; enviando o arquivo original', err);
+      return file;
+    } finally {
+      worker.terminate();
+    }
+  }
+
+  // Saída em partes de até N linhas (ZIP)
+  function appendSaidaPartes(fd){
+    const maxRows = ($('inativacao_max_rows')?.value || '').trim();
+    if(!maxRows) return;
+    fd.append('max_rows_per_file', maxRows);
+    fd.append('formato_saida', $('inativacao_formato_saida')?.value || 'xlsx');
+  }
+
   function parseTextarea(text){
     const lines = (text||'').split(/\r?\n/).map(l=>l.trim()).filter(Boolean);
     state.rawItems = lines;
@@ -189,8 +254,11 @@
       } catch(_){}
 
       try {
+        const base = await baseParaEnvio(baseInput.files[0], statusEl);
+        statusEl.innerHTML = '<span class="spinner-border spinner-border-sm me-2 text-primary"></span>Buscando usuários na base...';
         const fd = new FormData();
-        fd.append('base', baseInput.files[0]);
+        await ChunkedUpload.append(fd, 'base', base);
+        appendAbas(fd);
         fd.append('itens', JSON.stringify(state.validCpfs.concat(state.validNames).concat(state.validEmails)));
         const resp = await fetch('/api/inativacao/buscar', { method: 'POST', body: fd });
         const data = await resp.json();
@@ -203,6 +271,12 @@
         resultsControls.classList.remove('d-none');
         pagination.classList.remove('d-none');
         generateBtn?.classList.remove('d-none');
+        const invalid = Array.isArray(data.invalid_cpfs) ? data.invalid_cpfs : [];
+        const dupWarnEl = $('lista_duplicates_warning');
+        if (dupWarnEl && invalid.length) {
+          const dupText = state.duplicates.length ? `CPFs duplicados: ${state.duplicates.join(', ')}. ` : '';
+          dupWarnEl.textContent = `${dupText}CPFs inválidos (dígitos verificadores): ${invalid.map(formatCpf).join(', ')}`;
+        }
         showToast(`Busca concluída: ${state.results.length} itens.`, 'success');
       } catch(err){
         debugEl.textContent = 'Erro: ' + (err.message||err);
@@ -238,7 +312,7 @@
       xhr.onload = ()=>{
         if(xhr.status>=200 && xhr.status<300){
           const blob = xhr.response; if(!blob || blob.size===0){ showToast('Arquivo gerado inválido.','danger'); return; }
-          const url = URL.createObjectURL(blob); const a=document.createElement('a'); a.href=url; a.download='saida_inativacao.xlsx'; document.body.appendChild(a); a.click(); a.remove(); URL.revokeObjectURL(url);
+          const url = URL.createObjectURL(blob); const a=document.createElement('a'); a.href=url; a.download=blob.type==='application/zip'?'saida_inativacao.zip':'saida_inativacao.xlsx'; document.body.appendChild(a); a.click(); a.remove(); URL.revokeObjectURL(url);
           showToast('Inativação processada.','success');
         } else {
           try{ const reader=new FileReader(); reader.onload=()=>{ try{ const obj=JSON.parse(reader.result||'{}'); showToast(obj.error||('Erro '+xhr.status),'danger'); }catch(_){ showToast(reader.result||('Erro '+xhr.status),'danger'); } }; reader.readAsText(xhr.response); } catch(_){ showToast('Erro ao gerar inativação.','danger'); }
@@ -246,7 +320,10 @@
         progressWrap.classList.add('d-none'); progressBar.style.width='0%'; progressBar.textContent='';
       };
       xhr.onerror = ()=>{ showToast('Erro de rede ao gerar inativação.','danger'); progressWrap.classList.add('d-none'); };
-      const fd = new FormData(); fd.append('base', baseInput.files[0]); fd.append('lista_text', listaText);
+      const fd = new FormData();
+      try { await ChunkedUpload.append(fd, 'base', await baseParaEnvio(baseInput.files[0])); }
+      catch(err){ showToast(err.message || 'Falha no envio da base.','danger'); progressWrap.classList.add('d-none'); return; }
+      fd.append('lista_text', listaText); appendAbas(fd); appendSaidaPartes(fd);
       xhr.send(fd);
     });
   }
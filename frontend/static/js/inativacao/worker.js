@@ -0,0 +1,88 @@
+/* Worker da inativação: projeção da base no navegador antes do upload.
+ *
+ * Mensagens recebidas (todas com `id`, devolvido na resposta):
+ *   {type: "ler", buffer}                                -> {amostra, linhas}   (buffer transferido)
+ *   {type: "projetar", linhaCabecalho, posicoes, colunas} -> {buffer, gzip, linhas}
+ * Falhas: {type: "error", id, message}.
+ *
+ * "ler" abre a primeira aba com o SheetJS e devolve as primeiras linhas como
+ * texto; o servidor (/api/inativacao/colunas) responde com a linha de
+ * cabeçalho e as colunas que a inativação usa. "projetar" gera um TSV só com
+ * essas colunas (cabeçalho com os nomes devolvidos pelo servidor), em UTF-8
+ * e comprimido com gzip quando o navegador tem CompressionStream.
+ *
+ * Os valores viram texto como na leitura do servidor: números inteiros sem
+ * ".0", booleanos "True"/"False" e datas "AAAA-MM-DD HH:MM:SS".
+ */
+importScripts("https://cdn.jsdelivr.net/npm/xlsx@0.18.5/dist/xlsx.full.min.js");
+
+const AMOSTRA_LINHAS = 15;
+
+let matriz = null;
+
+function reply(id, type, payload, transfer) {
+  self.postMessage(Object.assign({ id, type }, payload), transfer || []);
+}
+
+const dois = (n) => String(n).padStart(2, "0");
+
+function texto(value) {
+  if (value === null || value === undefined) return "";
+  if (typeof value === "boolean") return value ? "True" : "False";
+  if (typeof value === "number") return Number.isNaN(value) ? "" : String(value);
+  if (value instanceof Date) {
+    return (
+      `${value.getFullYear()}-${dois(value.getMonth() + 1)}-${dois(value.getDate())} ` +
+      `${dois(value.getHours())}:${dois(value.getMinutes())}:${dois(value.getSeconds())}`
+    );
+  }
+  return String(value);
+}
+
+// Aspas como no CSV (o servidor lê com pandas, quotechar '"')
+function campo(value) {
+  return /[\t\n\r"]/.test(value) ? `"${value.replace(/"/g, '""')}"` : value;
+}
+
+function ler(buffer) {
+  const workbook = XLSX.read(new Uint8Array(buffer), { type: "array", dense: true, cellDates: true });
+  const sheet = workbook.Sheets[workbook.SheetNames[0]];
+  matriz = XLSX.utils.sheet_to_json(sheet, { header: 1, raw: true, defval: "", blankrows: false });
+  if (!matriz.length) throw new Error("Planilha vazia");
+  return {
+    amostra: matriz.slice(0, AMOSTRA_LINHAS).map((row) => row.map(texto)),
+    linhas: matriz.length,
+  };
+}
+
+async function projetar(linhaCabecalho, posicoes, colunas) {
+  if (!matriz) throw new Error("Planilha não lida");
+  const linhas = [colunas.map(campo).join("\t")];
+  for (let i = linhaCabecalho + 1; i < matriz.length; i += 1) {
+    const row = matriz[i];
+    linhas.push(posicoes.map((pos) => campo(texto(row[pos]))).join("\t"));
+  }
+  matriz = null;
+  const blob = new Blob([linhas.join("\n"), "\n"], { type: "text/tab-separated-values" });
+  const gzip = typeof CompressionStream === "function";
+  const stream = gzip ? blob.stream().pipeThrough(new CompressionStream("gzip")) : blob.stream();
+  const buffer = await new Response(stream).arrayBuffer();
+  return { buffer, gzip, linhas: linhas.length - 1 };
+}
+
+self.onmessage = async (event) => {
+  const { id, type } = event.data;
+  try {
+    if (type === "ler") {
+      reply(id, "lido", ler(event.data.buffer));
+    } else if (type === "projetar") {
+      const { linhaCabecalho, posicoes, colunas } = event.data;
+      const result = await projetar(linhaCabecalho, posicoes, colunas);
+      reply(id, "projetado", result, [result.buffer]);
+    } else {
+      throw new Error(`Mensagem desconhecida: ${type}`);
+    }
+  } catch (error) {
+    reply(id, "error", { message: error.message || String(error) });
+  }
+};
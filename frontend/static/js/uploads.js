@@ -0,0 +1,107 @@
+/* Upload em blocos para arquivos acima do limite de uma requisição (16 MB).
+ *
+ * ChunkedUpload.append(fd, campo, arquivo, onProgress) anexa o arquivo ao
+ * FormData: pequenos vão direto; grandes são enviados antes em blocos
+ * (/api/uploads) e entram como `<campo>_upload_id`.
+ *
+ * O id de cada arquivo fica no localStorage (nome + tamanho + data): se a
+ * rede cair ou a página for recarregada, o envio continua do último byte
+ * recebido pelo servidor. Cada bloco leva o SHA-256 no cabeçalho
+ * X-Chunk-Sha256.
+ */
+(function () {
+  const LIMITE_DIRETO = 15 * 1024 * 1024;
+  const TAMANHO_BLOCO = 8 * 1024 * 1024;
+  const TENTATIVAS = 5;
+
+  const api = (url) =>
+    window.API_BASE && url.startsWith("/") ? `${window.API_BASE}${url}` : url;
+  const chaveLocal = (file) =>
+    `upload:${file.name}:${file.size}:${file.lastModified}`;
+  const esperar = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+  async function hex(buffer) {
+    const digest = await crypto.subtle.digest("SHA-256", buffer);
+    return Array.from(new Uint8Array(digest), (b) =>
+      b.toString(16).padStart(2, "0")
+    ).join("");
+  }
+
+  async function json(resp) {
+    const data = await resp.json().catch(() => ({}));
+    if (!resp.ok && resp.status !== 409) {
+      throw new Error(data.error || `Falha no upload (HTTP ${resp.status})`);
+    }
+    return data;
+  }
+
+  async function iniciar(file) {
+    const salvo = localStorage.getItem(chaveLocal(file));
+    if (salvo) {
+      const resp = await fetch(api(`/api/uploads/${salvo}`));
+      if (resp.ok) return resp.json();
+      localStorage.removeItem(chaveLocal(file));
+    }
+    const status = await json(
+      await fetch(api("/api/uploads"), {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ filename: file.name, size: file.size }),
+      })
+    );
+    localStorage.setItem(chaveLocal(file), status.id);
+    return status;
+  }
+
+  async function enviarBloco(id, file, offset, tamanho) {
+    const blob = file.slice(offset, offset + tamanho);
+    const buffer = await blob.arrayBuffer();
+    const sha = await hex(buffer);
+    for (let tentativa = 1; ; tentativa += 1) {
+      try {
+        const data = await json(
+          await fetch(api(`/api/uploads/${id}?offset=${offset}`), {
+            method: "PUT",
+            headers: { "X-Chunk-Sha256": sha },
+            body: buffer,
+          })
+        );
+        return data.recebido;
+      } catch (error) {
+        if (tentativa >= TENTATIVAS) throw error;
+        await esperar(500 * 2 ** tentativa);
+      }
+    }
+  }
+
+  async function enviar(file, onProgress) {
+    let status = await iniciar(file);
+    const id = status.id;
+    const tamanho = Math.min(TAMANHO_BLOCO, status.chunk_max || TAMANHO_BLOCO);
+    let recebido = status.recebido || 0;
+    while (!status.concluido) {
+      while (recebido < file.size) {
+        recebido = await enviarBloco(id, file, recebido, tamanho);
+        if (onProgress) onProgress((recebido / file.size) * 100);
+      }
+      status = await json(
+        await fetch(api(`/api/uploads/${id}/complete`), { method: "POST" })
+      );
+      // 409: faltam bytes ou o checksum não conferiu; continua de onde o servidor indicar
+      if (!status.concluido) recebido = status.recebido || 0;
+    }
+    return id;
+  }
+
+  async function append(fd, campo, file, onProgress) {
+    if (!file) return;
+    if (file.size <= LIMITE_DIRETO) {
+      fd.append(campo, file);
+      return;
+    }
+    const id = await enviar(file, onProgress);
+    fd.append(`${campo.replace(/\[\]$/, "")}_upload_id`, id);
+  }
+
+  window.ChunkedUpload = { append, enviar };
+})();